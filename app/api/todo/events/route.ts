@@ -0,0 +1,47 @@
+import { NextRequest, NextResponse } from 'next/server';
+
+// Proxy the backend's todo change feed (server-sent events) without buffering
+export async function GET(req: NextRequest) {
+  try {
+    const backendUrl = process.env.NEXT_PUBLIC_BACKEND_URL || 'https://personal-ai-agent-0wsk.onrender.com';
+
+    const authHeader = req.headers.get('authorization');
+    const token = authHeader ? authHeader.replace('Bearer ', '') : null;
+
+    if (!token) {
+      return NextResponse.json({ error: "Not authenticated" }, { status: 401 });
+    }
+
+    const after = req.nextUrl.searchParams.get('after');
+    const url = after ? `${backendUrl}/todos/events?after=${encodeURIComponent(after)}` : `${backendUrl}/todos/events`;
+
+    const response = await fetch(url, {
+      method: 'GET',
+      headers: {
+        'Authorization': `Bearer ${token}`,
+        'Accept': 'text/event-stream',
+      },
+      cache: 'no-store',
+      signal: req.signal,
+    });
+
+    if (!response.ok || !response.body) {
+      const errorText = await response.text();
+      throw new Error(`Failed to open todo events: ${response.status} - ${errorText}`);
+    }
+
+    return new Response(response.body, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+      },
+    });
+  } catch (error: any) {
+    console.error('Error opening todo events:', error);
+    return NextResponse.json(
+      { error: error.message || 'Failed to open todo events' },
+      { status: 500 }
+    );
+  }
+}
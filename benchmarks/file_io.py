@@ -0,0 +1,97 @@
+"""
+Benchmark FileHandler JSON I/O under concurrency: blocking calls on the event
+loop (the previous implementation) vs the thread-offloaded, orjson-based one.
+
+Reports per-operation p50/p99 latency and the worst event-loop stall seen by a
+1ms ticker while the operations run.
+
+Usage: python -m benchmarks.file_io [--ops 2000] [--concurrency 64] [--items 500]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from utils.file_handler import FileHandler
+
+
+class BlockingFileHandler:
+    """The previous FileHandler JSON methods: async signatures, blocking bodies"""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = Path(data_dir)
+
+    async def save_json(self, data: dict, filename: str) -> None:
+        with open(self.data_dir / filename, 'w') as f:
+            json.dump(data, f, indent=2, default=str)
+
+    async def load_json(self, filename: str) -> dict:
+        try:
+            with open(self.data_dir / filename, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(handler, ops: int, concurrency: int, payload: dict):
+    latencies = []
+    worst_stall = 0.0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ticker():
+        nonlocal worst_stall
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            worst_stall = max(worst_stall, now - last)
+            last = now
+
+    async def op(n):
+        async with semaphore:
+            start = time.perf_counter()
+            filename = f"user_{n % concurrency}.json"
+            if n % 2:
+                await handler.save_json(payload, filename)
+            else:
+                await handler.load_json(filename)
+            latencies.append(time.perf_counter() - start)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.005)
+    start = time.perf_counter()
+    await asyncio.gather(*(op(n) for n in range(ops)))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.005)
+    task.cancel()
+    return elapsed, latencies, worst_stall
+
+
+async def main(ops: int, concurrency: int, items: int) -> None:
+    payload = {"tasks": [{"id": i, "title": f"Task {i}", "completed": False, "tags": ["work"]} for i in range(items)]}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, handler in (("blocking", BlockingFileHandler(tmp)), ("offloaded", FileHandler(tmp))):
+            elapsed, latencies, stall = await run(handler, ops, concurrency, payload)
+            print(
+                f"{label:>9}: {ops / elapsed:8.0f} ops/s  p50 {statistics.median(latencies) * 1000:6.2f}ms  "
+                f"p99 {percentile(latencies, 99) * 1000:6.2f}ms  worst loop stall {stall * 1000:6.2f}ms"
+            )
+            if isinstance(handler, FileHandler):
+                handler.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--items", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.ops, args.concurrency, args.items))
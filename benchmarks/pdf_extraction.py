@@ -0,0 +1,93 @@
+"""
+Benchmark PDF text extraction: the old sequential loop vs PdfExtractor.
+
+Usage: python -m benchmarks.pdf_extraction [--pages 300] [--workers N]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+from utils.pdf_extractor import PdfExtractor
+
+FILLER = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3
+
+
+def build_pdf(path: Path, pages: int) -> None:
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), f"Page {number}\n" + FILLER * 30, fontsize=8)
+    doc.save(str(path))
+    doc.close()
+
+
+def sequential(path: Path) -> str:
+    # The previous FileHandler.read_pdf implementation
+    doc = fitz.open(path)
+    text = ""
+    for page in doc:
+        text += page.get_text()
+    doc.close()
+    return text
+
+
+async def measure_loop_stall(coro) -> float:
+    """Run coro while a 1ms ticker measures the worst event-loop stall"""
+    worst = 0.0
+
+    async def ticker():
+        nonlocal worst
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            worst = max(worst, now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.005)
+    await coro
+    # Let the ticker observe a stall caused by the tail of coro
+    await asyncio.sleep(0.005)
+    task.cancel()
+    return worst
+
+
+async def main(pages: int, workers: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.pdf"
+        build_pdf(path, pages)
+        extractor = PdfExtractor(max_workers=workers)
+
+        async def run_sequential():
+            sequential(path)
+
+        start = time.perf_counter()
+        stall = await measure_loop_stall(run_sequential())
+        print(f"sequential on loop: {time.perf_counter() - start:.3f}s, worst loop stall {stall * 1000:.1f}ms")
+
+        # Warm the worker pool so process start-up is not counted
+        await extractor.extract_pages(path, 0, 1)
+        start = time.perf_counter()
+        stall = await measure_loop_stall(extractor.extract_pages(path))
+        print(f"PdfExtractor ({extractor.max_workers} workers): {time.perf_counter() - start:.3f}s, worst loop stall {stall * 1000:.1f}ms")
+
+        start = time.perf_counter()
+        first_page = None
+        async for _ in extractor.iter_pages(path):
+            if first_page is None:
+                first_page = time.perf_counter() - start
+        print(f"iter_pages: first page after {first_page * 1000:.1f}ms, all pages {time.perf_counter() - start:.3f}s")
+        extractor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.pages, args.workers))
@@ -0,0 +1,73 @@
+"""
+Microbenchmark the per-add cost of TodoManager.add_task (duplicate-title check
+plus ID allocation) as a user's list grows.
+
+"scan" is the previous approach: a linear scan over every normalized title
+and ``max(tasks) + 1`` per add, in memory. "sqlite" is the deployed default,
+a TodoManager built with its default SQLite engine and no cache, so each add
+is an indexed title lookup, a counter read and a committed insert. "cached"
+is the same engine with the optional write-back cache (TODO_CACHE=true),
+which checks its in-memory title index and counter and defers the write.
+
+Usage: python -m benchmarks.todo_add [--sizes 10,100,1000,10000,100000] [--adds 200]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from typing import Dict, List
+
+from services.todo_manager import TodoManager
+from utils.todo_store import title_key
+
+
+def make_tasks(count: int) -> Dict[int, dict]:
+    return {
+        i: {"id": i, "title": f"Existing task {i}", "description": None, "created_at": "2024-01-01T00:00:00",
+            "due_date": None, "completed": False, "tags": [], "priority": None}
+        for i in range(1, count + 1)
+    }
+
+
+def scan_add(tasks: Dict[int, dict], title: str) -> bool:
+    key = title_key(title)
+    if any(title_key(task["title"]) == key for task in tasks.values()):
+        return False
+    task_id = max(tasks.keys(), default=0) + 1
+    tasks[task_id] = {"id": task_id, "title": title}
+    return True
+
+
+async def manager_adds(size: int, adds: int, cache: bool) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = TodoManager(base_dir=tmp, cache=cache)
+        manager.store.apply_changes("bench", list(make_tasks(size).values()), [])
+        # Warm up the user (and, with the cache, load their list) outside the timed loop
+        await manager.backend.load_tasks("bench")
+        start = time.perf_counter()
+        for i in range(adds):
+            await manager.add_task("bench", f"New task {i}")
+        elapsed = time.perf_counter() - start
+        await manager.close()
+    return elapsed
+
+
+def main(sizes: List[int], adds: int) -> None:
+    print(f"{'tasks':>8}  {'scan us/add':>12}  {'sqlite us/add':>14}  {'cached us/add':>14}")
+    for size in sizes:
+        tasks = make_tasks(size)
+        start = time.perf_counter()
+        for i in range(adds):
+            scan_add(tasks, f"New task {i}")
+        scan = time.perf_counter() - start
+        sqlite = asyncio.run(manager_adds(size, adds, cache=False))
+        cached = asyncio.run(manager_adds(size, adds, cache=True))
+        print(f"{size:>8}  {scan / adds * 1e6:12.1f}  {sqlite / adds * 1e6:14.1f}  {cached / adds * 1e6:14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000")
+    parser.add_argument("--adds", type=int, default=200)
+    args = parser.parse_args()
+    main([int(size) for size in args.sizes.split(",")], args.adds)
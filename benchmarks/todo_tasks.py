@@ -0,0 +1,151 @@
+"""
+Benchmark loading, mutating and saving a large todo list: the previous Task
+class and stdlib ``indent=2`` JSON vs the slotted, lazily-parsed Task and the
+orjson-based JsonTodoStore.
+
+Reports wall time per phase, the memory retained by the loaded Task objects
+(measured with tracemalloc in a separate, untimed load) and the size of the
+saved file.
+
+Usage: python -m benchmarks.todo_tasks [--tasks 100000] [--mutations 1000]
+"""
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from services.todo_manager import Task
+from utils.todo_store import JsonTodoStore
+
+
+class LegacyTask:
+    """The previous Task: per-instance __dict__ and eager datetime parsing"""
+
+    def __init__(self, title: str, description: Optional[str] = None, due_date: Optional[datetime] = None,
+                 completed: bool = False, tags: Optional[list] = None, priority: Optional[str] = None):
+        self.id = None
+        self.title = title
+        self.description = description
+        self.created_at = datetime.now()
+        self.due_date = due_date
+        self.completed = completed
+        self.tags = tags or []
+        self.priority = priority
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "created_at": self.created_at.isoformat(),
+            "due_date": self.due_date.isoformat() if self.due_date else None,
+            "completed": self.completed,
+            "tags": self.tags,
+            "priority": self.priority
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LegacyTask':
+        task = cls(
+            title=data["title"],
+            description=data.get("description"),
+            due_date=datetime.fromisoformat(data["due_date"]) if data.get("due_date") else None,
+            completed=data.get("completed", False),
+            tags=data.get("tags", []),
+            priority=data.get("priority")
+        )
+        task.id = data["id"]
+        task.created_at = datetime.fromisoformat(data["created_at"])
+        return task
+
+
+class LegacyJsonStore:
+    """The previous JSON engine encoding: stdlib json with indent=2"""
+
+    def __init__(self, base_dir: str):
+        self.base_dir = Path(base_dir)
+
+    def load_tasks(self, username: str) -> dict:
+        with open(self.base_dir / f"{username}.json", 'r') as f:
+            return {int(task_id): task for task_id, task in json.load(f).items()}
+
+    def _save_tasks(self, username: str, tasks: dict, next_id: int = None) -> None:
+        # The legacy format has no ID counter
+        with open(self.base_dir / f"{username}.json", 'w') as f:
+            json.dump({str(task_id): task for task_id, task in tasks.items()}, f, indent=2)
+
+
+def make_tasks(count: int) -> dict:
+    now = datetime.now()
+    return {
+        i: {
+            "id": i,
+            "title": f"Task {i} #work !{('low', 'medium', 'high')[i % 3]}",
+            "description": None if i % 4 else f"Details for task {i}",
+            "created_at": (now - timedelta(minutes=i)).isoformat(),
+            "due_date": (now + timedelta(days=i % 30)).isoformat() if i % 2 else None,
+            "completed": i % 5 == 0,
+            "tags": ["work"],
+            "priority": ("low", "medium", "high")[i % 3],
+        }
+        for i in range(1, count + 1)
+    }
+
+
+def load(store, task_cls) -> dict:
+    return {task_id: task_cls.from_dict(item) for task_id, item in store.load_tasks("bench").items()}
+
+
+def retained_memory(store, task_cls) -> int:
+    tracemalloc.start()
+    tasks = load(store, task_cls)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tasks
+    return retained
+
+
+def run(label: str, store, task_cls, mutations: int) -> None:
+    memory = retained_memory(store, task_cls)
+    start = time.perf_counter()
+    tasks = load(store, task_cls)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for task_id in range(1, mutations + 1):
+        tasks[task_id].completed = not tasks[task_id].completed
+    mutate_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store._save_tasks("bench", {task_id: task.to_dict() for task_id, task in tasks.items()}, max(tasks) + 1)
+    save_time = time.perf_counter() - start
+
+    size = (Path(store.base_dir) / "bench.json").stat().st_size
+    print(
+        f"{label:>7}: load {load_time * 1000:8.1f}ms  mutate {mutate_time * 1000:6.2f}ms  "
+        f"save {save_time * 1000:8.1f}ms  retained {memory / 2**20:7.1f}MiB  file {size / 2**20:6.1f}MiB"
+    )
+
+
+def main(count: int, mutations: int) -> None:
+    data = make_tasks(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, store, task_cls in (
+            ("legacy", LegacyJsonStore(tmp), LegacyTask),
+            ("compact", JsonTodoStore(tmp), Task),
+        ):
+            # Each run starts from the legacy indented file, as after an upgrade
+            LegacyJsonStore(tmp)._save_tasks("bench", data)
+            run(label, store, task_cls, mutations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--mutations", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.tasks, args.mutations)
@@ -16,13 +16,14 @@ from services.translator import TranslatorService
 from services.code_helper import CodeHelperService
 
 # Import utilities
-from utils.llm_client import LLMClient
+from utils.llm_client import build_default_router
 from utils.file_handler import FileHandler
 from utils.logger import logger # Use the same logger
 
 # Initialize services (similar to main.py, but without FastAPI context)
-# Note: Ensure env variables (OPENROUTER_API_KEY, etc.) are loaded
-llm_client = LLMClient() 
+# Note: Ensure env variables (GOOGLE_GEMINI_API_KEY, OPENROUTER_API_KEY, etc.) are loaded
+# Same provider routing as the API: Gemini, then OpenRouter, then the local Ollama fallback
+llm_client = build_default_router()
 file_handler = FileHandler()
 
 # Pass LLMClient back to ChatService
@@ -30,7 +31,8 @@ chat_service = ChatService(llm_client)
 # Inject LLMClient into SummarizeService
 summarize_service = SummarizeService(llm_client, file_handler)
 email_service = EmailDraftService(llm_client)
-todo_service = TodoManager()
+# One-shot process: write through instead of caching
+todo_service = TodoManager(cache=False)
 translator_service = TranslatorService(llm_client)
 code_service = CodeHelperService(llm_client)
 
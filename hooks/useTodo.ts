@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import useSWR from 'swr';
 import { toast } from 'react-hot-toast';
 
@@ -8,6 +8,40 @@ interface Todo {
   completed: boolean;
 }
 
+// One event from the backend's todo change feed (GET /todos/events)
+interface TodoEvent {
+  seq: number;
+  type: 'add' | 'update' | 'complete' | 'delete' | 'reminder' | 'ready' | 'reset';
+  id?: number;
+  task?: { id: number; title: string; completed: boolean };
+}
+
+const toTodo = (task: NonNullable<TodoEvent['task']>): Todo => ({
+  id: task.id,
+  text: task.title,
+  completed: task.completed,
+});
+
+// Apply one change event to the cached list instead of re-fetching it
+function applyEvent(todos: Todo[], event: TodoEvent): Todo[] {
+  switch (event.type) {
+    case 'add':
+    case 'update': {
+      if (!event.task) return todos;
+      const todo = toTodo(event.task);
+      return todos.some(t => t.id === todo.id)
+        ? todos.map(t => (t.id === todo.id ? todo : t))
+        : [...todos, todo];
+    }
+    case 'complete':
+      return todos.map(t => (t.id === event.id ? { ...t, completed: true } : t));
+    case 'delete':
+      return todos.filter(t => t.id !== event.id);
+    default:
+      return todos;
+  }
+}
+
 export function useTodo() {
   const [token, setToken] = useState<string | null>(null);
   const [isLoading, setIsLoading] = useState(false);
@@ -43,6 +77,69 @@ export function useTodo() {
     fetcher
   );
 
+  // While the change feed is connected, changes arrive as events and the list is not re-fetched
+  const feedConnected = useRef(false);
+  const refreshUnlessLive = () => (feedConnected.current ? Promise.resolve() : mutate());
+
+  useEffect(() => {
+    if (!token) return;
+    const controller = new AbortController();
+    let lastSeq: number | null = null;
+    let retryDelay = 1000;
+
+    const handle = (event: TodoEvent) => {
+      lastSeq = event.seq;
+      if (event.type === 'ready') {
+        feedConnected.current = true;
+        retryDelay = 1000;
+      } else if (event.type === 'reset') {
+        // Missed events are gone; fall back to one full reload
+        mutate();
+      } else {
+        mutate(todos => applyEvent(todos || [], event), false);
+      }
+    };
+
+    const connect = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const url = lastSeq === null ? '/api/todo/events' : `/api/todo/events?after=${lastSeq}`;
+          const res = await fetch(url, {
+            headers: { 'Authorization': `Bearer ${token}` },
+            signal: controller.signal,
+          });
+          if (!res.ok || !res.body) throw new Error('Failed to open todo events');
+          const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+          let buffer = '';
+          for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value;
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+              const block = buffer.slice(0, boundary);
+              buffer = buffer.slice(boundary + 2);
+              const data = block.split('\n').filter(line => line.startsWith('data: ')).map(line => line.slice(6)).join('\n');
+              if (data) handle(JSON.parse(data));
+            }
+          }
+        } catch (err) {
+          if (controller.signal.aborted) return;
+        }
+        // Disconnected: re-fetch on writes until the feed is back, then resume from lastSeq
+        feedConnected.current = false;
+        await new Promise(resolve => setTimeout(resolve, retryDelay));
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      }
+    };
+
+    connect();
+    return () => {
+      controller.abort();
+      feedConnected.current = false;
+    };
+  }, [token]);
+
   const addTodo = async (task: string) => {
     if (!token) {
       toast.error('You must be logged in');
@@ -65,7 +162,7 @@ export function useTodo() {
         throw new Error(errorData.error || 'Failed to add todo');
       }
 
-      await mutate();
+      await refreshUnlessLive();
       toast.success('Todo added!');
     } catch (err: any) {
       toast.error(err.message || 'Error adding todo');
@@ -96,7 +193,7 @@ export function useTodo() {
         throw new Error(errorData.error || 'Failed to update todo');
       }
 
-      await mutate();
+      await refreshUnlessLive();
       toast.success('Todo updated!');
     } catch (err: any) {
       toast.error(err.message || 'Error updating todo');
@@ -125,7 +222,7 @@ export function useTodo() {
         throw new Error(errorData.error || 'Failed to delete todo');
       }
 
-      await mutate();
+      await refreshUnlessLive();
       toast.success('Todo deleted!');
     } catch (err: any) {
       toast.error(err.message || 'Error deleting todo');
@@ -164,8 +261,8 @@ export function useTodo() {
         throw new Error(errorData.error || 'Failed to toggle todo');
       }
 
-      // Update with actual server data
-      mutate();
+      // Update with actual server data, unless the change feed delivers it
+      refreshUnlessLive();
     } catch (err: any) {
       // Revert to previous data on error
       mutate(prevData);
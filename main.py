@@ -12,20 +12,21 @@ Version: 1.0.0
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, Depends, status, Body, File, UploadFile, Request, Response
+from fastapi import FastAPI, HTTPException, Depends, status, Body, File, UploadFile, Request, Response, Query, Header
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.gzip import GZipMiddleware
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any, Union
+from pydantic import BaseModel, Field, validator, ValidationError
+from typing import List, Optional, Dict, Any, Union, AsyncIterator, Literal
 import uvicorn
 from datetime import datetime, timedelta
 from pathlib import Path
 import time
 import os
 import json
+import asyncio
 import fitz  # PyMuPDF
 
 # Import services
@@ -38,7 +39,18 @@ from services.code_helper import CodeHelperService
 
 # Import utilities
 from utils.gemini_client import GeminiClient
+from utils.llm_client import build_default_router
+from utils.llm_cache import LLMResponseCache, CachedLLMClient
+from utils.single_flight import SingleFlightClient
+from utils.concurrency_limiter import (
+    AdaptiveConcurrencyLimiter, ConcurrencyLimitedClient, request_priority,
+    PRIORITY_INTERACTIVE, PRIORITY_DEFAULT, PRIORITY_BULK
+)
 from utils.file_handler import FileHandler
+from utils.document_cache import DocumentTextCache
+from utils.summary_store import ChunkSummaryStore
+from utils.upload_store import ContentAddressedStore, UploadTooLargeError, upload_owner
+from utils.todo_search import SearchUnavailableError
 from utils.logger import logger, log_request, log_response, log_error
 from utils.auth import (
     Token, User, authenticate_user, create_access_token,
@@ -130,6 +142,68 @@ class Response(BaseModel):
         example={"model": "gpt-3.5-turbo", "usage": {"total_tokens": 150}}
     )
 
+MAX_BATCH_SIZE = 100
+
+class BatchRequest(BaseModel):
+    """
+    A batch of assistant requests processed in one call.
+    Items are validated individually so one bad item does not reject the batch.
+    """
+    requests: List[Dict[str, Any]] = Field(...,
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description="Assistant requests, each in the same format as the /assist body",
+        examples=[[
+            {"type": "translate", "content": "Good morning", "parameters": {"target_language": "French"}},
+            {"type": "translate", "content": "Good night", "parameters": {"target_language": "French"}}
+        ]]
+    )
+    max_concurrency: int = Field(8,
+        ge=1,
+        le=32,
+        description="Maximum number of items processed at the same time"
+    )
+
+class BatchItemResult(BaseModel):
+    """
+    Result for one batch item; `index` is its position in the request list.
+    """
+    index: int
+    status: str = Field(..., examples=["success", "error"])
+    content: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+MAX_TODO_OPERATIONS = 1000
+
+class TodoOperation(BaseModel):
+    """
+    One operation of a bulk todo update. `id` is required except for `add`;
+    `title` is required for `add`. Other fields are optional overrides.
+    """
+    op: Literal["add", "update", "complete", "delete"]
+    id: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    due_date: Optional[datetime] = None
+    tags: Optional[List[str]] = None
+    priority: Optional[Literal["high", "medium", "low"]] = None
+    completed: Optional[bool] = None
+
+class TodoBulkRequest(BaseModel):
+    """
+    Todo operations applied in order as one all-or-nothing write.
+    """
+    operations: List[TodoOperation] = Field(...,
+        min_length=1,
+        max_length=MAX_TODO_OPERATIONS,
+        examples=[[
+            {"op": "add", "title": "Plan sprint #work !high"},
+            {"op": "complete", "id": 3},
+            {"op": "delete", "id": 4}
+        ]]
+    )
+
 class ErrorResponse(BaseModel):
     """
     Standardized error response model.
@@ -211,13 +285,38 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 app.mount("/ui", StaticFiles(directory=static_dir, html=True), name="ui_root")
 
 # --- Service Initialization ---
-gemini_client = GeminiClient()
-file_handler = FileHandler()
+llm_cache = LLMResponseCache(db_path=os.getenv("LLM_CACHE_DB", "data/llm_cache.db"))
+gemini_backend = GeminiClient()
+llm_limiter = AdaptiveConcurrencyLimiter(
+    initial_limit=int(os.getenv("LLM_INITIAL_CONCURRENCY", "4")),
+    max_limit=int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+)
+# Gemini first, then OpenRouter (if configured), then the local Ollama endpoint
+llm_router = build_default_router(ConcurrencyLimitedClient(gemini_backend, llm_limiter))
+# Cache hits return immediately; concurrent identical misses share one upstream request
+gemini_client = CachedLLMClient(SingleFlightClient(llm_router), llm_cache)
+# Uploads are stored once per distinct content and referenced by name
+upload_store = ContentAddressedStore(
+    root=os.getenv("UPLOAD_DIR", "data/uploads"),
+    max_upload_bytes=int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+)
+# Extracted document text is cached by content hash, so repeat documents skip re-parsing
+file_handler = FileHandler(
+    text_cache=DocumentTextCache(db_path=os.getenv("DOCUMENT_CACHE_DB", "data/document_cache.db")),
+    upload_store=upload_store
+)
 
 chat_service = ChatService(gemini_client)
-summarize_service = SummarizeService(gemini_client, file_handler)
+summarize_service = SummarizeService(
+    gemini_client,
+    file_handler,
+    summary_store=ChunkSummaryStore(db_path=os.getenv("CHUNK_SUMMARY_DB", "data/chunk_summaries.db"))
+)
 email_service = EmailDraftService(gemini_client)
-todo_service = TodoManager()
+todo_service = TodoManager(
+    storage=os.getenv("TODO_STORAGE", "sqlite"),
+    cache=os.getenv("TODO_CACHE", "false").lower() == "true"
+)
 translator_service = TranslatorService(gemini_client)
 code_service = CodeHelperService(gemini_client)
 
@@ -226,6 +325,10 @@ code_service = CodeHelperService(gemini_client)
 async def startup_event():
     """Initialize resources on application startup."""
     logger.info("🚀 Starting LLM Assistant API")
+    # Reclaim blobs orphaned by deleted uploads without delaying startup
+    asyncio.get_running_loop().run_in_executor(None, upload_store.collect_garbage)
+    # Schedule due-soon/overdue reminders for stored todos
+    await todo_service.start()
     # Could initialize database connections, caches, etc.
 
 @app.on_event("shutdown")
@@ -233,6 +336,9 @@ async def shutdown_event():
     """Clean up resources on application shutdown."""
     logger.info("Closing LLM client...")
     await gemini_client.close()
+    file_handler.close()
+    # Write back any todo changes still waiting for their debounced flush
+    await todo_service.close()
     logger.info("LLM client closed. Application shutting down.")
 
 # --- Error Handlers ---
@@ -326,6 +432,67 @@ async def read_root():
     return RedirectResponse(url="/ui")
 
 # --- Assistant Routes ---
+# Queue position of LLM calls when the concurrency limit is reached; interactive work goes first
+REQUEST_PRIORITIES = {
+    "chat": PRIORITY_INTERACTIVE,
+    "code": PRIORITY_DEFAULT,
+    "email": PRIORITY_DEFAULT,
+    "summarize": PRIORITY_BULK,
+    "translate": PRIORITY_BULK,
+}
+
+def build_chat_request(message: Message) -> ChatRequest:
+    """Build a ChatRequest object from an assistant message"""
+    return ChatRequest(
+        message=message.content,
+        conversation_history=message.parameters.get("conversation_history", []) if message.parameters else [],
+        temperature=message.parameters.get("temperature", 0.7) if message.parameters else 0.7
+    )
+
+async def dispatch_message(message: Message, username: str, action: str = "process") -> Response:
+    """Run a message through the matching service and normalize the result; raises on failure"""
+    request_priority.set(REQUEST_PRIORITIES.get(message.type, PRIORITY_DEFAULT))
+    upload_owner.set(username)
+    if message.type == "chat":
+        response = await chat_service.process(build_chat_request(message))
+    elif message.type == "summarize":
+        response = await summarize_service.process(message.content, message.parameters)
+    elif message.type == "email":
+        response = await email_service.process(message.content, message.parameters)
+    elif message.type == "todo":
+        response = await todo_service.process(username, message.content, message.parameters)
+    elif message.type == "translate":
+        response = await translator_service.process(message.content, message.parameters)
+    elif message.type == "code":
+        response = await code_service.process(message.content, message.parameters)
+    else:
+        logger.warning(f"Invalid request type received: {message.type}")
+        raise HTTPException(status_code=400, detail=f"Invalid request type: {message.type}")
+    
+    # Post-process and return
+    if isinstance(response, dict):
+        if "metadata" not in response:
+            response["metadata"] = {}
+        response["metadata"]["request_type"] = message.type
+        response["metadata"]["timestamp"] = datetime.now().isoformat()
+        content = response.get("content", "")
+        metadata = response.get("metadata", {})
+    else:
+        if not getattr(response, "metadata", None):
+            response.metadata = {}
+        response.metadata["request_type"] = message.type
+        response.metadata["timestamp"] = datetime.now().isoformat()
+        content = getattr(response, "content", "")
+        metadata = getattr(response, "metadata", {})
+
+    log_response(
+        service=message.type,
+        action=action,
+        status="success",
+        metadata=metadata
+    )
+    return Response(content=content, metadata=metadata)
+
 @app.post(
     "/assist", 
     response_model=Response, 
@@ -357,52 +524,7 @@ async def process_request(
     - **code**: Programming assistance
     """
     try:
-        if message.type == "chat":
-            # Build ChatRequest object from message
-            chat_request = ChatRequest(
-                message=message.content,
-                conversation_history=message.parameters.get("conversation_history", []) if message.parameters else [],
-                temperature=message.parameters.get("temperature", 0.7) if message.parameters else 0.7
-            )
-            response = await chat_service.process(chat_request)
-        elif message.type == "summarize":
-            response = await summarize_service.process(message.content, message.parameters)
-        elif message.type == "email":
-            response = await email_service.process(message.content, message.parameters)
-        elif message.type == "todo":
-            response = await todo_service.process(current_user.username, message.content, message.parameters)
-        elif message.type == "translate":
-            response = await translator_service.process(message.content, message.parameters)
-        elif message.type == "code":
-            response = await code_service.process(message.content, message.parameters)
-        else:
-            logger.warning(f"Invalid request type received: {message.type}")
-            raise HTTPException(status_code=400, detail=f"Invalid request type: {message.type}")
-        
-        # Post-process and return
-        if isinstance(response, dict):
-            if "metadata" not in response:
-                response["metadata"] = {}
-            response["metadata"]["request_type"] = message.type
-            response["metadata"]["timestamp"] = datetime.now().isoformat()
-            content = response.get("content", "")
-            metadata = response.get("metadata", {})
-        else:
-            if not getattr(response, "metadata", None):
-                response.metadata = {}
-            response.metadata["request_type"] = message.type
-            response.metadata["timestamp"] = datetime.now().isoformat()
-            content = getattr(response, "content", "")
-            metadata = getattr(response, "metadata", {})
-
-        log_response(
-            service=message.type,
-            action="process",
-            status="success",
-            metadata=metadata
-        )
-        return Response(content=content, metadata=metadata)
-
+        return await dispatch_message(message, current_user.username)
     except Exception as e:
         error_id = log_error(
             service=message.type,
@@ -430,20 +552,304 @@ async def process_request_alt(
 ):
     return await process_request(message, current_user)
 
+# --- Batch Assistant Routes ---
+async def run_batch_item(index: int, raw: Dict[str, Any], username: str, semaphore: asyncio.Semaphore) -> BatchItemResult:
+    """Validate and dispatch one batch item, converting failures into an error result"""
+    try:
+        message = Message.model_validate(raw)
+    except ValidationError as e:
+        return BatchItemResult(index=index, status="error", error=f"Invalid request: {e.errors()[0]['msg']}")
+    async with semaphore:
+        try:
+            response = await dispatch_message(message, username, action="batch")
+        except Exception as e:
+            error_id = log_error(
+                service=message.type,
+                action="batch",
+                error=e,
+                context={"index": index, "content": message.content, "parameters": message.parameters}
+            )
+            return BatchItemResult(
+                index=index,
+                status="error",
+                error=f"An error occurred processing your {message.type} request (Error ID: {error_id})"
+            )
+    return BatchItemResult(index=index, status="success", content=response.content, metadata=response.metadata)
+
+async def stream_batch_results(batch: BatchRequest, username: str) -> AsyncIterator[str]:
+    """Yield one NDJSON line per item as it completes, then a summary line"""
+    semaphore = asyncio.Semaphore(batch.max_concurrency)
+    tasks = [
+        asyncio.create_task(run_batch_item(index, raw, username, semaphore))
+        for index, raw in enumerate(batch.requests)
+    ]
+    errors = 0
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            errors += result.status == "error"
+            yield result.model_dump_json(exclude_none=True) + "\n"
+        yield json.dumps({"done": True, "count": len(tasks), "errors": errors}) + "\n"
+    finally:
+        # The client may disconnect mid-batch; don't keep spending LLM calls on it
+        for task in tasks:
+            task.cancel()
+
+@app.post(
+    "/assist/batch",
+    tags=["Assistant"],
+    summary="Process many assistant requests at once",
+    description="Runs a list of assistant requests concurrently in a single HTTP call",
+    response_description="NDJSON stream of per-item results, or an ordered JSON list when stream=false"
+)
+async def process_batch(
+    batch: BatchRequest,
+    stream: bool = True,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Batch variant of `/assist`.
+
+    - Each item of `requests` uses the `/assist` body format
+    - Items run concurrently, at most `max_concurrency` at a time
+    - Failures are reported per item and never fail the whole batch
+    - By default results are streamed as NDJSON **as they complete**; each line has the
+      item's `index`, and a final `{"done": true, ...}` line ends the stream
+    - With `stream=false` the response is `{"results": [...]}` in the original order
+    """
+    if stream:
+        return StreamingResponse(
+            stream_batch_results(batch, current_user.username),
+            media_type="application/x-ndjson"
+        )
+    semaphore = asyncio.Semaphore(batch.max_concurrency)
+    results = await asyncio.gather(*(
+        run_batch_item(index, raw, current_user.username, semaphore)
+        for index, raw in enumerate(batch.requests)
+    ))
+    return {"results": [result.model_dump(exclude_none=True) for result in results]}
+
+# Add a second route for /api/assist/batch for compatibility
+@app.post(
+    "/api/assist/batch",
+    tags=["Assistant"],
+    summary="Process many assistant requests at once (alt route)",
+    description="Runs a list of assistant requests concurrently in a single HTTP call (alt)",
+    response_description="NDJSON stream of per-item results, or an ordered JSON list when stream=false"
+)
+async def process_batch_alt(
+    batch: BatchRequest,
+    stream: bool = True,
+    current_user: User = Depends(get_current_active_user)
+):
+    return await process_batch(batch, stream, current_user)
+
+# --- Streaming Assistant Routes ---
+def sse_event(data: Dict[str, Any], event: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    """Format a single server-sent event"""
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    prefix += f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def stream_message_chunks(message: Message, username: str) -> AsyncIterator[str]:
+    """Yield text chunks for a message from the matching service"""
+    request_priority.set(REQUEST_PRIORITIES.get(message.type, PRIORITY_DEFAULT))
+    upload_owner.set(username)
+    if message.type == "chat":
+        stream = chat_service.stream(build_chat_request(message))
+    elif message.type == "summarize":
+        stream = summarize_service.stream(message.content, message.parameters)
+    elif message.type == "email":
+        stream = email_service.stream(message.content, message.parameters)
+    elif message.type == "translate":
+        stream = translator_service.stream(message.content, message.parameters)
+    elif message.type == "code":
+        stream = code_service.stream(message.content, message.parameters)
+    else:
+        # Todo commands are local and fast; send the same text /assist returns as a single chunk
+        response = await todo_service.process(username, message.content, message.parameters)
+        yield response.get("content", "")
+        return
+    async for chunk in stream:
+        yield chunk
+
+async def stream_assistant_events(message: Message, username: str) -> AsyncIterator[str]:
+    """Wrap service chunks into SSE events, ending with a `done` or `error` event"""
+    start_time = time.time()
+    first_chunk_time = None
+    length = 0
+    try:
+        async for chunk in stream_message_chunks(message, username):
+            if first_chunk_time is None:
+                first_chunk_time = time.time() - start_time
+            length += len(chunk)
+            yield sse_event({"content": chunk})
+        metadata = {
+            "request_type": message.type,
+            "timestamp": datetime.now().isoformat(),
+            "content_length": length,
+            "time_to_first_chunk": first_chunk_time,
+        }
+        log_response(
+            service=message.type,
+            action="stream",
+            status="success",
+            metadata=metadata
+        )
+        yield sse_event({"metadata": metadata}, event="done")
+    except Exception as e:
+        error_id = log_error(
+            service=message.type,
+            action="stream",
+            error=e,
+            context={"content": message.content, "parameters": message.parameters}
+        )
+        yield sse_event(
+            {"message": f"An error occurred processing your {message.type} request (Error ID: {error_id})"},
+            event="error"
+        )
+
+@app.post(
+    "/assist/stream",
+    tags=["Assistant"],
+    summary="Stream any assistant request",
+    description="Unified endpoint that streams assistant output as server-sent events",
+    response_description="A text/event-stream of content chunks followed by a `done` event"
+)
+async def process_request_stream(
+    message: Message,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Streaming variant of `/assist`.
+
+    Each `data:` event carries a JSON object with a partial `content` chunk as soon
+    as the model produces it. The stream ends with an `event: done` carrying the
+    response metadata, or an `event: error` if generation fails midway.
+    """
+    return StreamingResponse(
+        stream_assistant_events(message, current_user.username),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Add a second route for /api/assist/stream for compatibility
+@app.post(
+    "/api/assist/stream",
+    tags=["Assistant"],
+    summary="Stream any assistant request (alt route)",
+    description="Unified endpoint that streams assistant output as server-sent events (alt)",
+    response_description="A text/event-stream of content chunks followed by a `done` event"
+)
+async def process_request_stream_alt(
+    message: Message,
+    current_user: User = Depends(get_current_active_user)
+):
+    return await process_request_stream(message, current_user)
+
+# --- File Upload Routes ---
+@app.post(
+    "/upload",
+    tags=["Files"],
+    summary="Upload a file",
+    response_description="The stored file name, content hash and size"
+)
+async def upload_file(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Upload a PDF or text file as multipart form data.
+
+    - The file is copied to storage in fixed-size chunks while it is hashed
+    - Identical content is stored only once (`deduplicated` is true for repeats)
+    - Pass the returned `filename` as `parameters.filename` to `/assist` summarize requests
+    """
+    try:
+        return await file_handler.save_file(file, file.filename, file.content_type, owner=current_user.username)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    finally:
+        await file.close()
+
+# Add a second route for /api/upload for compatibility
+@app.post(
+    "/api/upload",
+    tags=["Files"],
+    summary="Upload a file (alt route)",
+    response_description="The stored file name, content hash and size"
+)
+async def upload_file_alt(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user)
+):
+    return await upload_file(file, current_user)
+
+@app.put(
+    "/upload/{filename}",
+    tags=["Files"],
+    summary="Upload a file as the raw request body",
+    response_description="The stored file name, content hash and size"
+)
+async def upload_file_raw(
+    filename: str,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Upload a file by streaming it as the request body, without multipart encoding.
+
+    The body goes straight into the content-addressed store as it arrives, so it
+    is never buffered in memory or spooled to a temporary file first.
+    """
+    try:
+        return await upload_store.save_stream(request.stream(), filename, request.headers.get("content-type"), owner=current_user.username)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
 # --- Todo Management Routes ---
 @app.get(
     "/todos", 
     tags=["Todo Management"],
-    summary="List all todos",
-    response_description="List of user's todo items"
+    summary="List and query todos",
+    response_description="A page of the user's todo items"
 )
-async def list_todos(current_user: User = Depends(get_current_active_user)):
+async def list_todos(
+    completed: Optional[bool] = Query(None, description="Only completed (true) or open (false) tasks"),
+    priority: Optional[Literal["high", "medium", "low"]] = Query(None),
+    tag: Optional[str] = Query(None, description="Only tasks with this tag"),
+    due_before: Optional[datetime] = Query(None, description="Only tasks due before this time"),
+    due_after: Optional[datetime] = Query(None, description="Only tasks due at or after this time"),
+    status_filter: Optional[Literal["completed", "overdue", "due_soon", "pending"]] = Query(None, alias="status"),
+    sort: Literal["id", "created_at", "due_date", "priority"] = Query("id"),
+    order: Literal["asc", "desc"] = Query("asc"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; all matching tasks if omitted"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: User = Depends(get_current_active_user)
+):
     """
-    Retrieve all todo items for the authenticated user.
+    Retrieve the authenticated user's todo items, filtered and sorted.
     
-    Returns a list of todo items with their IDs, text content, and completion status.
+    - Filters combine with AND; tasks without a due date sort last by due_date
+    - Pass a `limit` to paginate and send back `next_cursor` as `cursor` for the next page
+    - Returns `tasks` (with their computed status), `next_cursor` and the page as text in `content`
     """
-    return await todo_service.list_tasks(current_user.username)
+    try:
+        return await todo_service.query_tasks(
+            current_user.username,
+            limit=limit,
+            cursor=cursor,
+            completed=completed,
+            priority=priority,
+            tag=tag,
+            due_before=due_before,
+            due_after=due_after,
+            status=status_filter,
+            sort=sort,
+            descending=order == "desc"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @app.post(
     "/todos", 
@@ -465,6 +871,138 @@ async def add_todo(
     """
     return await todo_service.add_task(current_user.username, task)
 
+@app.get(
+    "/todos/search",
+    tags=["Todo Management"],
+    summary="Search todos",
+    response_description="Matching todo items, best match first"
+)
+async def search_todos(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find; end a word with * to match it as a prefix"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Full-text search over the authenticated user's todo titles, descriptions and tags.
+    
+    - Every word must match; `plan*` also matches "planning"
+    - Each result has the task, a `snippet` with matches wrapped in `<mark>` tags
+      (the task text is HTML-escaped) and a relevance `score`
+    """
+    try:
+        return await todo_service.search_tasks(current_user.username, q, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except SearchUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+
+@app.get(
+    "/todos/due",
+    tags=["Todo Management"],
+    summary="Todos due soon",
+    response_description="Open todo items due within the window, soonest first"
+)
+async def due_todos(
+    hours: float = Query(24, gt=0, le=24 * 365, description="Window length in hours, starting now"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Retrieve the authenticated user's open todos due in the next `hours`.
+    
+    - Already overdue tasks are not included; use `GET /todos?status=overdue`
+    - Paginates like `GET /todos`
+    """
+    try:
+        return await todo_service.due_within(current_user.username, hours, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@app.get(
+    "/todos/reminders",
+    tags=["Todo Management"],
+    summary="Due-date reminders",
+    response_description="Reminders raised since the given sequence number"
+)
+async def todo_reminders(
+    after: int = Query(0, ge=0, description="metadata.last_seq from the previous call"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Reminders raised when the authenticated user's open todos became due soon or overdue.
+    
+    - Each reminder has a `seq`; pass the last one seen as `after` to poll for new ones
+    - Only the most recent reminders are kept, and none survive a restart
+    """
+    return todo_service.get_reminders(current_user.username, after)
+
+# Seconds between keep-alive comments on an idle change feed
+TODO_EVENTS_HEARTBEAT = 15
+
+async def stream_todo_events(username: str, after: Optional[int]) -> AsyncIterator[str]:
+    """Format the user's todo change feed as SSE events, with keep-alive comments while idle"""
+    async for event in todo_service.feed.subscribe(username, after, heartbeat=TODO_EVENTS_HEARTBEAT):
+        if event is None:
+            yield ": keep-alive\n\n"
+        else:
+            yield sse_event(event, event=event["type"], event_id=event["seq"])
+
+@app.get(
+    "/todos/events",
+    tags=["Todo Management"],
+    summary="Stream todo changes",
+    response_description="A text/event-stream of todo change events"
+)
+async def todo_events(
+    after: Optional[int] = Query(None, description="Resume after this sequence number"),
+    last_event_id: Optional[str] = Header(None, description="Set by EventSource on reconnect; used when `after` is omitted"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Server-sent events for every change to the authenticated user's todos, so
+    clients can apply deltas instead of re-fetching the list.
+    
+    - Events are `add`, `update` and `complete` (with `id` and, except for
+      single completes, the full `task`), `delete` (with `id`) and `reminder`
+    - Every event has an increasing `seq`, also sent as the SSE `id`
+    - Resume with `after` (or `Last-Event-ID`) to receive only missed events;
+      an `event: ready` marks the switch to live events
+    - `event: reset` means missed events are no longer available: re-fetch
+      `GET /todos` and apply only later events (its `metadata.seq` is the
+      sequence the list reflects)
+    """
+    if after is None and last_event_id:
+        try:
+            after = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Last-Event-ID")
+    return StreamingResponse(
+        stream_todo_events(current_user.username, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post(
+    "/todos/bulk",
+    tags=["Todo Management"],
+    summary="Apply many todo operations at once",
+    response_description="Per-operation results"
+)
+async def bulk_todos(
+    request: TodoBulkRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Apply a list of add/update/complete/delete operations in one write.
+    
+    - Operations run in order; each sees the effect of the ones before it
+    - If any operation is invalid, none are applied and `success` is false
+    - `results` holds one entry per operation, with the task or the error
+    """
+    operations = [operation.model_dump(exclude_none=True) for operation in request.operations]
+    return await todo_service.bulk_update(current_user.username, operations)
+
 @app.put(
     "/todos/{task_id}", 
     tags=["Todo Management"],
@@ -483,7 +1021,6 @@ async def update_todo(
     - Provide the new task text in the request body
     - Returns the updated task
     """
-    # Assume update_task is updated to per-user as well
     return await todo_service.update_task(current_user.username, task_id, task)
 
 @app.delete(
@@ -537,9 +1074,19 @@ async def health_check():
         "version": "1.0.0",
         "timestamp": datetime.now().isoformat(),
         "services": {
-            "gemini_client": "ok",
+            "gemini_client": "ok" if gemini_backend.transport.breaker.state == "closed" else "degraded",
             "file_handler": "ok"
-        }
+        },
+        "gemini_transport": gemini_backend.transport.stats(),
+        "gemini_quota": gemini_backend.pacer.stats(),
+        "llm_limiter": llm_limiter.stats(),
+        "llm_router": llm_router.stats(),
+        "llm_cache": llm_cache.stats(),
+        "document_cache": file_handler.text_cache.stats(),
+        "upload_store": upload_store.stats(),
+        "todo_cache": todo_service.backend.stats() if hasattr(todo_service.backend, "stats") else None,
+        "todo_scheduler": todo_service.scheduler.stats(),
+        "todo_feed": todo_service.feed.stats()
     }
 
 # --- Application Entry Point ---
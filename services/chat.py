@@ -1,6 +1,6 @@
 from fastapi import Depends, HTTPException, status
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
 import logging
 from utils.gemini_client import GeminiClient
 
@@ -28,16 +28,19 @@ class ChatService:
             "You are a helpful conversational AI assistant. Engage in dialogue and answer questions concisely."
         )
 
+    @staticmethod
+    def _build_prompt(request: ChatRequest) -> str:
+        """Flatten the conversation history and the new message into one prompt"""
+        context = "\n".join(
+            [f"{msg['role']}: {msg['content']}" 
+             for msg in request.conversation_history]
+        )
+        return f"{context}\nuser: {request.message}"
+
     async def process(self, request: ChatRequest) -> ChatResponse:
         """Process a chat request with conversation history"""
         try:
-            # Build context from conversation history
-            context = "\n".join(
-                [f"{msg['role']}: {msg['content']}" 
-                 for msg in request.conversation_history]
-            )
-            
-            full_prompt = f"{context}\nuser: {request.message}"
+            full_prompt = self._build_prompt(request)
             
             response = await self.gemini_client.generate_response(
                 prompt=full_prompt,
@@ -57,7 +60,8 @@ class ChatService:
                 content=response["content"],
                 metadata={
                     "usage": response.get("usage"),
-                    "conversation_id": response.get("conversation_id")
+                    "conversation_id": response.get("conversation_id"),
+                    "cache": response.get("cache")
                 }
             )
             
@@ -68,6 +72,14 @@ class ChatService:
                 metadata={"error": str(e)}
             )
 
+    async def stream(self, request: ChatRequest) -> AsyncIterator[str]:
+        """Stream a chat reply chunk by chunk as Gemini generates it"""
+        async for chunk in self.gemini_client.stream_response(
+            prompt=self._build_prompt(request),
+            temperature=request.temperature
+        ):
+            yield chunk
+
 if __name__ == "__main__":
     import uvicorn
     # Removed
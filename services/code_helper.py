@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 from utils.gemini_client import GeminiClient
 import logging
 import time
@@ -33,27 +33,35 @@ class CodeHelperService:
             return f"\nConvert this code from {language} to {target_lang}."
         return mapping.get(action, "")
 
+    @staticmethod
+    def _early_response(content: str) -> Optional[Dict[str, Any]]:
+        """Return a canned response for invalid input or greetings, or None if the LLM is needed"""
+        if not content or not content.strip():
+            return {
+                "content": "Please paste code or describe your coding problem.",
+                "metadata": {"error": "Empty input"}
+            }
+        if len(content.strip()) < 5:
+            return {
+                "content": "Please provide a more detailed code snippet or question.",
+                "metadata": {"error": "Input too short"}
+            }
+        # Quick greeting check: if the user says hello, respond with a friendly overview
+        greeting = content.strip().lower()
+        if greeting in {"hello", "hi", "hey", "good morning", "good afternoon", "good evening"}:
+            return {
+                "content": "Hello! 👋 I'm CodeHelperService. I can explain code, debug issues, suggest improvements, add documentation, or convert between languages. What would you like to do today?",
+                "metadata": {"action": "greeting"}
+            }
+        return None
+
     async def process(self, content: str, parameters: Optional[dict] = None) -> Dict[str, Any]:
         """Process code-related requests"""
         try:
-            # Input validation
-            if not content or not content.strip():
-                return {
-                    "content": "Please paste code or describe your coding problem.",
-                    "metadata": {"error": "Empty input"}
-                }
-            if len(content.strip()) < 5:
-                return {
-                    "content": "Please provide a more detailed code snippet or question.",
-                    "metadata": {"error": "Input too short"}
-                }
-            # Quick greeting check: if the user says hello, respond with a friendly overview
-            greeting = content.strip().lower()
-            if greeting in {"hello", "hi", "hey", "good morning", "good afternoon", "good evening"}:
-                return {
-                    "content": "Hello! 👋 I'm CodeHelperService. I can explain code, debug issues, suggest improvements, add documentation, or convert between languages. What would you like to do today?",
-                    "metadata": {"action": "greeting"}
-                }
+            # Input validation and greeting shortcut
+            early_response = self._early_response(content)
+            if early_response:
+                return early_response
             # Get parameters or use defaults
             action = parameters.get("action", "explain") if parameters else "explain"
             language = parameters.get("language", "python") if parameters else "python"
@@ -92,7 +100,8 @@ class CodeHelperService:
                     "action": action,
                     "language": language,
                     "model": response.get("model"),
-                    "elapsed": elapsed
+                    "elapsed": elapsed,
+                    "cache": response.get("cache")
                 }
             }
         except Exception as e:
@@ -102,6 +111,23 @@ class CodeHelperService:
                 "metadata": {"error": str(e)}
             }
 
+    async def stream(self, content: str, parameters: Optional[dict] = None) -> AsyncIterator[str]:
+        """Stream a code answer chunk by chunk; canned responses are yielded as a single chunk"""
+        early_response = self._early_response(content)
+        if early_response:
+            yield early_response["content"]
+            return
+        action = parameters.get("action", "explain") if parameters else "explain"
+        language = parameters.get("language", "python") if parameters else "python"
+        action_prompt = self.build_action_prompt(action, language, parameters)
+        # Black formatting needs the full answer, so streamed responses are passed through as-is
+        async for chunk in self.gemini_client.stream_response(
+            prompt=content,
+            system_prompt=f"{self.system_prompt}{action_prompt}\nLanguage: {language}",
+            temperature=0.3
+        ):
+            yield chunk
+
     @staticmethod
     def _format_python_code(code: str) -> str:
         """Format Python code with proper indentation and style"""
@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 from utils.gemini_client import GeminiClient
 
 class EmailDraftService:
@@ -13,11 +13,9 @@ class EmailDraftService:
 
 Format the email properly with line breaks and standard email structure."""
 
-    async def process(self, content: str, parameters: Optional[dict] = None) -> dict:
-        """Process email drafting requests"""
-        import logging
-        logger = logging.getLogger("EmailDraftService")
-        # Input validation
+    @staticmethod
+    def _validate(content: str) -> Optional[dict]:
+        """Return an error response for unusable prompts, or None if the prompt is valid"""
         if not content or not content.strip():
             return {
                 "content": "Please describe the email you want to draft.",
@@ -28,22 +26,34 @@ Format the email properly with line breaks and standard email structure."""
                 "content": "Please provide a more detailed description for the email.",
                 "metadata": {"error": "Prompt too short"}
             }
+        return None
+
+    def _build_system_prompt(self, tone: str, format_type: str) -> str:
+        """Adjust the system prompt for the requested tone and format"""
+        style_instruction = f"\nUse a {tone} tone."
+        if format_type == "reply":
+            style_instruction += "\nFormat this as a reply to a previous email."
+        elif format_type == "forward":
+            style_instruction += "\nFormat this as a forwarded email with appropriate context."
+        return f"{self.system_prompt}{style_instruction}"
+
+    async def process(self, content: str, parameters: Optional[dict] = None) -> dict:
+        """Process email drafting requests"""
+        import logging
+        logger = logging.getLogger("EmailDraftService")
+        # Input validation
+        error = self._validate(content)
+        if error:
+            return error
         try:
             # Get parameters or use defaults
             tone = parameters.get("tone", "professional") if parameters else "professional"
             format_type = parameters.get("format", "full") if parameters else "full"
             
-            # Adjust system prompt based on parameters
-            style_instruction = f"\nUse a {tone} tone."
-            if format_type == "reply":
-                style_instruction += "\nFormat this as a reply to a previous email."
-            elif format_type == "forward":
-                style_instruction += "\nFormat this as a forwarded email with appropriate context."
-            
             # Generate email
             response = await self.gemini_client.generate_response(
                 prompt=content.strip(),
-                system_prompt=f"{self.system_prompt}{style_instruction}",
+                system_prompt=self._build_system_prompt(tone, format_type),
                 temperature=0.7  # Balanced temperature for creativity and professionalism
             )
             if not response or not response.get("content"):
@@ -57,7 +67,8 @@ Format the email properly with line breaks and standard email structure."""
                 "metadata": {
                     "tone": tone,
                     "format": format_type,
-                    "model": response["model"]
+                    "model": response["model"],
+                    "cache": response.get("cache")
                 }
             }
         except Exception as e:
@@ -67,6 +78,21 @@ Format the email properly with line breaks and standard email structure."""
                 "metadata": {"error": str(e)}
             }
 
+    async def stream(self, content: str, parameters: Optional[dict] = None) -> AsyncIterator[str]:
+        """Stream an email draft chunk by chunk; validation errors are yielded as a single chunk"""
+        error = self._validate(content)
+        if error:
+            yield error["content"]
+            return
+        tone = parameters.get("tone", "professional") if parameters else "professional"
+        format_type = parameters.get("format", "full") if parameters else "full"
+        async for chunk in self.gemini_client.stream_response(
+            prompt=content.strip(),
+            system_prompt=self._build_system_prompt(tone, format_type),
+            temperature=0.7
+        ):
+            yield chunk
+
     @staticmethod
     def _extract_email_parts(email_text: str) -> Dict[str, str]:
         """Helper method to extract different parts of an email"""
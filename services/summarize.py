@@ -1,102 +1,213 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Tuple, List
 from utils.file_handler import FileHandler
 from utils.logger import logger
 from utils.gemini_client import GeminiClient
+from utils.text_chunker import split_into_chunks
+from utils.summary_store import ChunkSummaryStore
+from utils.llm_router import is_fallback_response
+import asyncio
 import os
 
+# Texts up to this size are summarized in one LLM call; longer ones use map-reduce
+SINGLE_PASS_MAX_CHARS = 10000
+MAX_INPUT_CHARS = 2_000_000
+MAX_REDUCE_DEPTH = 5
+
 class SummarizeService:
-    def __init__(self, gemini_client: GeminiClient, file_handler: FileHandler = FileHandler()):
+    def __init__(self, gemini_client: GeminiClient, file_handler: FileHandler = FileHandler(), chunk_tokens: int = 2000, max_parallel_chunks: int = 4, summary_store: Optional[ChunkSummaryStore] = None):
         self.gemini_client = gemini_client
         self.file_handler = file_handler
+        # Per-chunk summaries of long documents; re-summarizing an edited document only pays for changed chunks
+        self.summary_store = summary_store
+        self.chunk_tokens = chunk_tokens
+        self.max_parallel_chunks = max_parallel_chunks
         # System prompt for basic summarization
         self.system_prompt_base = """You are a text summarization expert. Please provide a clear and concise summary of the following text:"""
+        # System prompt for the map phase of long documents
+        self.partial_prompt = """You are summarizing one section of a longer document. Summarize this section concisely, preserving key facts, names, figures and conclusions. Do not add an introduction or refer to "this section"."""
 
-    async def process(self, content: Optional[str] = None, parameters: Optional[dict] = None) -> dict:
-        """Process summarization requests using LLMClient"""
+    async def _read_file(self, filename: str, parameters: dict, metadata: dict) -> Optional[str]:
+        """Read a whole file, or only the page/line range given in the parameters"""
+        for unit, read_range in (("page", self.file_handler.read_pdf), ("line", self.file_handler.read_file_lines)):
+            start, end = parameters.get(f"start_{unit}"), parameters.get(f"end_{unit}")
+            if start is not None or end is not None:
+                start = int(start or 0)
+                end = int(end) if end is not None else None
+                metadata[f"{unit}_range"] = [start, end]
+                return await read_range(filename, start, end)
+        return await self.file_handler.read_document(filename)
+
+    async def _load_input(self, content: Optional[str], parameters: Optional[dict]) -> Tuple[Optional[str], dict, Optional[dict]]:
+        """
+        Resolve and validate the text to summarize.
+
+        Returns a ``(text, metadata, error_response)`` tuple; ``error_response`` is
+        set (and ``text`` is None) when the input cannot be summarized.
+        """
         text_to_summarize = None
-        source_type = "text"
-        filename = None
-        metadata = {}
+        metadata = {"source_type": "text"}
 
         if parameters and "filename" in parameters:
             filename = parameters["filename"]
-            source_type = "file"
+            metadata["source_type"] = "file"
             metadata["filename"] = filename
             logger.info(f"Attempting to read file for summarization: {filename}")
-            text_to_summarize = await self.file_handler.read_pdf(filename) or await self.file_handler.read_file(filename)
-            
+            text_to_summarize = await self._read_file(filename, parameters, metadata)
+
             if text_to_summarize is None:
                 logger.error(f"Failed to read file: {filename}")
-                return {
+                return None, metadata, {
                     "content": f"Error: Could not read file '{filename}'. Ensure it exists in the data directory and is a supported format (text or PDF).",
-                    "metadata": {"error": "File read error", **metadata}
+                    "metadata": {"error": "File read error", "filename": filename}
                 }
             logger.info(f"Successfully read file: {filename}, length: {len(text_to_summarize)}")
         elif content:
             text_to_summarize = content
         else:
-            return {
+            return None, metadata, {
                 "content": "Please provide text or upload a file to summarize.",
                 "metadata": {"error": "Missing input"}
             }
 
         # Input validation
         if not text_to_summarize or not text_to_summarize.strip():
-            return {
+            return None, metadata, {
                 "content": "Cannot summarize empty content. Please enter or upload text.",
                 "metadata": {"error": "Empty content"}
             }
         if len(text_to_summarize) < 20:
-            return {
+            return None, metadata, {
                 "content": "Input is too short to summarize. Please provide more text.",
                 "metadata": {"error": "Input too short"}
             }
-        if len(text_to_summarize) > 10000:
-            return {
-                "content": "Input is too long. Please provide less than 10,000 characters.",
+        if len(text_to_summarize) > MAX_INPUT_CHARS:
+            return None, metadata, {
+                "content": f"Input is too long. Please provide less than {MAX_INPUT_CHARS:,} characters.",
                 "metadata": {"error": "Input too long"}
             }
+        return text_to_summarize, metadata, None
+
+    def _build_system_prompt(self, parameters: Optional[dict]) -> str:
+        """Build the summarization system prompt for the requested length and format"""
+        max_length = parameters.get("max_length", 500) if parameters else 500
+        format_type = parameters.get("format", "paragraph") if parameters else "paragraph"
+
+        # Adjust system prompt based on format
+        format_instruction = f"\nAim for a summary length of approximately {max_length} characters."
+        if format_type == "bullets":
+            format_instruction += "\nFormat the summary as bullet points. Highlight key points using bold text."
+        elif format_type == "outline":
+            format_instruction += "\nFormat the summary as a hierarchical outline. Use indentation for subpoints."
+        else:
+            format_instruction += "\nFormat the summary as a concise paragraph."
+
+        return f"{self.system_prompt_base}{format_instruction}"
+
+    def _build_partial_prompt(self, parameters: Optional[dict]) -> str:
+        """Map-phase prompt; bullet and outline summaries keep their structure from the first pass"""
+        format_type = parameters.get("format", "paragraph") if parameters else "paragraph"
+        if format_type in ("bullets", "outline"):
+            return f"{self.partial_prompt}\nWrite the section summary as bullet points."
+        return self.partial_prompt
+
+    async def _summarize_chunk(self, chunk: str, system_prompt: str, semaphore: asyncio.Semaphore) -> dict:
+        async with semaphore:
+            return await self.gemini_client.generate_response(
+                prompt=chunk,
+                system_prompt=system_prompt,
+                temperature=0.3,
+                max_tokens=512
+            )
+
+    async def _summarize_chunks(self, chunks: List[str], system_prompt: str, semaphore: asyncio.Semaphore) -> Tuple[List[str], int]:
+        """Summarize chunks, reusing stored summaries; returns (partials, reused count)"""
+        stored: Dict[str, str] = {}
+        keys: List[str] = []
+        if self.summary_store is not None:
+            model = getattr(self.gemini_client, "model", "")
+            keys = [ChunkSummaryStore.make_key(chunk, model, system_prompt) for chunk in chunks]
+            stored = await self.summary_store.get_many(keys)
+        partials = [stored.get(key) for key in keys] if keys else [None] * len(chunks)
+        missing = [i for i, partial in enumerate(partials) if partial is None]
+        fresh = await asyncio.gather(*(self._summarize_chunk(chunks[i], system_prompt, semaphore) for i in missing))
+        for i, response in zip(missing, fresh):
+            partials[i] = response["content"]
+        if self.summary_store is not None:
+            # Keys name the primary model; summaries from the local fallback are not kept
+            await self.summary_store.set_many({
+                keys[i]: response["content"] for i, response in zip(missing, fresh) if not is_fallback_response(response)
+            })
+        return partials, len(chunks) - len(missing)
+
+    async def _condense(self, text: str, parameters: Optional[dict]) -> Tuple[str, dict]:
+        """
+        Map-reduce phase for long inputs: summarize chunks concurrently, then
+        summarize the joined partials again until they fit in a single chunk.
+        Returns the condensed text and stats for the response metadata.
+        """
+        stats = {"chunks": 0, "reused_chunks": 0, "depth": 0}
+        system_prompt = self._build_partial_prompt(parameters)
+        semaphore = asyncio.Semaphore(self.max_parallel_chunks)
+        while len(text) > SINGLE_PASS_MAX_CHARS and stats["depth"] < MAX_REDUCE_DEPTH:
+            chunks: List[str] = split_into_chunks(text, self.chunk_tokens)
+            partials, reused = await self._summarize_chunks(chunks, system_prompt, semaphore)
+            if stats["depth"] == 0:
+                stats["chunks"] = len(chunks)
+            stats["reused_chunks"] += reused
+            condensed = "\n\n".join(partials)
+            stats["depth"] += 1
+            logger.info(f"Map-reduce level {stats['depth']}: {len(chunks)} chunks ({reused} reused), {len(text)} -> {len(condensed)} chars")
+            if len(condensed) >= len(text):
+                # Summaries are not shrinking the text; stop instead of looping
+                break
+            text = condensed
+        return text, stats
+
+    async def _prepare_final_input(self, text: str, parameters: Optional[dict]) -> Tuple[str, str, dict]:
+        """Return (prompt, system_prompt, map-reduce stats) for the final summarization call"""
+        system_prompt = self._build_system_prompt(parameters)
+        if len(text) <= SINGLE_PASS_MAX_CHARS:
+            return text, system_prompt, {}
+        condensed, stats = await self._condense(text, parameters)
+        system_prompt += "\nThe text consists of summaries of consecutive sections of a longer document; combine them into one coherent summary."
+        return condensed, system_prompt, {"map_reduce": stats}
+
+    async def process(self, content: Optional[str] = None, parameters: Optional[dict] = None) -> dict:
+        """Process summarization requests using LLMClient"""
+        text_to_summarize, metadata, error = await self._load_input(content, parameters)
+        if error:
+            return error
 
         try:
-            # Get parameters or use defaults
-            max_length = parameters.get("max_length", 500) if parameters else 500
             format_type = parameters.get("format", "paragraph") if parameters else "paragraph"
             # model = parameters.get("model", self.llm_client.model) if parameters else self.llm_client.model
 
-            # Adjust system prompt based on format
-            format_instruction = f"\nAim for a summary length of approximately {max_length} characters."
-            if format_type == "bullets":
-                format_instruction += "\nFormat the summary as bullet points. Highlight key points using bold text."
-            elif format_type == "outline":
-                format_instruction += "\nFormat the summary as a hierarchical outline. Use indentation for subpoints."
-            else:
-                format_instruction += "\nFormat the summary as a concise paragraph."
-            
-            system_prompt = f"{self.system_prompt_base}{format_instruction}"
+            prompt, system_prompt, map_reduce_stats = await self._prepare_final_input(text_to_summarize, parameters)
 
             # Generate summary using LLMClient
             response = await self.gemini_client.generate_response(
-                prompt=text_to_summarize,
+                prompt=prompt,
                 system_prompt=system_prompt,
-                temperature=0.3, 
+                temperature=0.3,
                 max_tokens=1000,
 
             )
-            
+
             logger.info("Summary generated via LLMClient.")
 
             metadata.update({
-                "source_type": source_type,
                 "original_length": len(text_to_summarize),
                 "summary_length": len(response["content"]),
                 "format": format_type,
                 # 'model' key omitted because 'model' variable is not defined without the argument
-                "usage": response.get("usage")
+                "usage": response.get("usage"),
+                "cache": response.get("cache"),
+                **map_reduce_stats
             })
-            
+
             # Remove None values from metadata
             metadata = {k: v for k, v in metadata.items() if v is not None}
-            
+
             return {
                 "content": response["content"],
                 "metadata": metadata
@@ -106,4 +217,20 @@ class SummarizeService:
             return {
                 "content": f"I apologize, but I encountered an error while summarizing: {str(e)}",
                 "metadata": {"error": str(e), **metadata}
-            } 
\ No newline at end of file
+            }
+
+    async def stream(self, content: Optional[str] = None, parameters: Optional[dict] = None) -> AsyncIterator[str]:
+        """Stream a summary chunk by chunk; validation errors are yielded as a single chunk"""
+        text_to_summarize, _, error = await self._load_input(content, parameters)
+        if error:
+            yield error["content"]
+            return
+        # The map phase must finish first; only the final reduce is streamed
+        prompt, system_prompt, _ = await self._prepare_final_input(text_to_summarize, parameters)
+        async for chunk in self.gemini_client.stream_response(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            temperature=0.3,
+            max_tokens=1000
+        ):
+            yield chunk
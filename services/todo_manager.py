@@ -1,9 +1,26 @@
 from typing import List, Optional, Dict
-from datetime import datetime
-import json
+from collections import deque
+from datetime import datetime, timedelta
 from pathlib import Path
+import asyncio
+import logging
+
+from utils.todo_store import AsyncTodoStore, JournalTodoStore, JsonTodoStore, SqliteTodoStore, title_key
+from utils.todo_cache import WriteBackTodoCache
+from utils.due_scheduler import DueDateScheduler
+from utils.todo_feed import TodoChangeFeed
+from utils.todo_query import DUE_SOON, TaskQuery, _local_iso, task_status
+
+logger = logging.getLogger("TodoManager")
+
+BULK_OPERATIONS = ("add", "update", "complete", "delete")
+# Recent reminders kept per user for GET /todos/reminders
+MAX_REMINDERS = 100
 
 class Task:
+    # No per-instance __dict__: large task lists stay compact in memory
+    __slots__ = ("id", "title", "description", "_created_at", "_due_date", "completed", "tags", "priority")
+
     def __init__(
         self,
         title: str,
@@ -16,18 +33,45 @@ class Task:
         self.id = None  # Will be set when added to TodoManager
         self.title = title
         self.description = description
-        self.created_at = datetime.now()
-        self.due_date = due_date
+        self._created_at = datetime.now()
+        self._due_date = due_date
         self.completed = completed
         self.tags = tags or []
         self.priority = priority
+
+    # Dates loaded from storage stay ISO strings until first accessed
+    @property
+    def created_at(self) -> datetime:
+        if isinstance(self._created_at, str):
+            self._created_at = datetime.fromisoformat(self._created_at)
+        return self._created_at
+
+    @created_at.setter
+    def created_at(self, value: datetime) -> None:
+        self._created_at = value
+
+    @property
+    def due_date(self) -> Optional[datetime]:
+        if isinstance(self._due_date, str):
+            self._due_date = datetime.fromisoformat(self._due_date)
+        return self._due_date
+
+    @due_date.setter
+    def due_date(self, value: Optional[datetime]) -> None:
+        self._due_date = value
+
+    @staticmethod
+    def _isoformat(value) -> Optional[str]:
+        # Aware datetimes are stored as naive local time, like every other stored date
+        return _local_iso(value) if isinstance(value, datetime) else value
+
     def to_dict(self) -> dict:
         return {
             "id": self.id,
             "title": self.title,
             "description": self.description,
-            "created_at": self.created_at.isoformat(),
-            "due_date": self.due_date.isoformat() if self.due_date else None,
+            "created_at": self._isoformat(self._created_at),
+            "due_date": self._isoformat(self._due_date),
             "completed": self.completed,
             "tags": self.tags,
             "priority": self.priority
@@ -35,31 +79,33 @@ class Task:
 
     @classmethod
     def from_dict(cls, data: dict) -> 'Task':
-        task = cls(
-            title=data["title"],
-            description=data.get("description"),
-            due_date=datetime.fromisoformat(data["due_date"]) if data.get("due_date") else None,
-            completed=data.get("completed", False),
-            tags=data.get("tags", []),
-            priority=data.get("priority")
-        )
+        task = cls.__new__(cls)
         task.id = data["id"]
-        task.created_at = datetime.fromisoformat(data["created_at"])
+        task.title = data["title"]
+        task.description = data.get("description")
+        task._created_at = data["created_at"]
+        task._due_date = data.get("due_date") or None
+        task.completed = data.get("completed", False)
+        task.tags = data.get("tags") or []
+        task.priority = data.get("priority")
         return task
 
     # Utility methods for smart parsing
-    def _parse_tags(self, text: str) -> list:
+    @staticmethod
+    def _parse_tags(text: str) -> list:
         # Extract hashtags as tags
         return [part[1:] for part in text.split() if part.startswith('#')]
 
-    def _parse_priority(self, text: str) -> Optional[str]:
+    @staticmethod
+    def _parse_priority(text: str) -> Optional[str]:
         # Simple priority parsing (e.g., !high, !medium, !low)
         for word in text.split():
             if word.lower() in ['!high', '!medium', '!low']:
                 return word[1:].lower()
         return None
 
-    def _parse_due_date(self, text: str) -> Optional[datetime]:
+    @staticmethod
+    def _parse_due_date(text: str) -> Optional[datetime]:
         # Very basic due date parsing (e.g., 'tomorrow', 'today')
         from datetime import timedelta
         lower = text.lower()
@@ -70,35 +116,54 @@ class Task:
         return None
 
 class TodoManager:
-    def __init__(self, base_dir: str = "data/todos"):
+    def __init__(self, base_dir: str = "data/todos", storage: str = "sqlite", cache: bool = False, flush_delay: float = 0.5):
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        if storage == "json":
+            self.store = JsonTodoStore(str(self.base_dir))
+        elif storage == "journal":
+            self.store = JournalTodoStore(str(self.base_dir / "journal"))
+        else:
+            self.store = SqliteTodoStore(str(self.base_dir / "todos.db"))
+            # One-time import of per-user JSON files left by the json engine
+            self.store.import_json_dir(str(self.base_dir))
+        # All reads and writes go through the backend: a write-back cache (single worker only), or the engine directly
+        self.backend = WriteBackTodoCache(self.store, flush_delay=flush_delay) if cache else AsyncTodoStore(self.store)
+        # Due-soon/overdue reminders; mutations below keep it in step with the tasks
+        self.scheduler = DueDateScheduler()
+        self.scheduler.add_listener(self._remember)
+        self._reminders: Dict[str, deque] = {}
+        self._reminder_seq = 0
+        # Change events for live clients (GET /todos/events)
+        self.feed = TodoChangeFeed()
+
+    async def _load_tasks(self, username: str) -> Dict[int, Task]:
+        """Load tasks for a user"""
+        return {task_id: Task.from_dict(data) for task_id, data in (await self.backend.load_tasks(username)).items()}
+
+    async def start(self) -> None:
+        """Schedule reminders for the stored tasks and start the scheduler; call on startup"""
+        self.scheduler.load(await asyncio.to_thread(lambda: list(self.store.open_due_tasks())))
+        self.scheduler.start()
+        logger.info(f"Due-date scheduler tracking {self.scheduler.stats()['tracked']} tasks")
 
-    def _get_user_file(self, username: str) -> Path:
-        return self.base_dir / f"{username}.json"
-
-    def _load_tasks(self, username: str) -> Dict[int, Task]:
-        """Load tasks for a user from their storage file"""
-        user_file = self._get_user_file(username)
-        if not user_file.exists():
-            return {}
-        with open(user_file, 'r') as f:
-            data = json.load(f)
-            return {int(task_id): Task.from_dict(task_data) for task_id, task_data in data.items()}
-
-    def _save_tasks(self, username: str, tasks: Dict[int, Task]) -> None:
-        """Save a user's tasks to storage file"""
-        user_file = self._get_user_file(username)
-        with open(user_file, 'w') as f:
-            data = {str(task_id): task.to_dict() for task_id, task in tasks.items()}
-            json.dump(data, f, indent=2)
+    async def close(self) -> None:
+        """Flush pending writes; call on shutdown"""
+        await self.scheduler.close()
+        await self.backend.close()
+        if hasattr(self.store, "close"):
+            await asyncio.to_thread(self.store.close)
 
     async def process(self, username: str, content: str, parameters: Optional[dict] = None) -> dict:
         """Process todo-related commands for a user"""
         command = content.lower().strip()
         if command.startswith("add"):
             title = content[3:].strip()
-            return await self.add_task(username, title)
+            result = await self.add_task(username, title)
+            # Assistant replies show `content`; the structured result stays alongside it
+            if result["success"]:
+                return {**result, "content": f"Added task {result['task']['id']}: {result['task']['title']}"}
+            return {**result, "content": result["error"]}
         elif command.startswith("list"):
             return await self.list_tasks(username)
         elif command.startswith("complete"):
@@ -110,37 +175,34 @@ class TodoManager:
         elif command.startswith("delete"):
             try:
                 task_id = int(command.split()[1])
-                return await self.delete_task(username, task_id)
             except (IndexError, ValueError):
                 return {"content": "Please specify a valid task ID to delete"}
+            result = await self.delete_task(username, task_id)
+            return {**result, "content": f"Deleted task {task_id}" if result["success"] else result["error"]}
         else:
             return {"content": "Unknown command. Available commands: add, list, complete, delete"}
 
     async def add_task(self, username: str, title: str, description: Optional[str] = None, due_date: Optional[datetime] = None, tags: Optional[list] = None, priority: Optional[str] = None) -> dict:
-        import logging
-        logger = logging.getLogger("TodoManager")
-        tasks = self._load_tasks(username)
         # Input validation
         if not title or not title.strip():
             return {"success": False, "error": "Task title cannot be empty."}
-        if any(task.title.strip().lower() == title.strip().lower() for task in tasks.values()):
-            return {"success": False, "error": "Duplicate task title."}
         # Smart parsing for tags and priority
         tags = tags or Task._parse_tags(title)
         priority = priority or Task._parse_priority(title)
         due_date = due_date or Task._parse_due_date(title)
-        # Assign next available ID
-        next_id = max(tasks.keys(), default=0) + 1
         task = Task(title=title, description=description, due_date=due_date, tags=tags, priority=priority)
-        task.id = next_id
-        tasks[next_id] = task
-        self._save_tasks(username, tasks)
+        # The store assigns the next available ID and re-checks the title in the same write
+        stored = await self.backend.add_task(username, task.to_dict())
+        if stored is None:
+            return {"success": False, "error": "Duplicate task title."}
+        self.scheduler.track(username, stored)
+        self.feed.publish(username, "add", id=stored["id"], task=dict(stored))
         logger.info(f"Added task: {title} for user {username}")
-        return {"success": True, "task": task.to_dict()}
+        return {"success": True, "task": stored}
 
     async def list_tasks(self, username: str) -> dict:
         """List all tasks for a user"""
-        tasks = self._load_tasks(username)
+        tasks = await self._load_tasks(username)
         if not tasks:
             return {"content": "No tasks found"}
         task_list = []
@@ -153,41 +215,187 @@ class TodoManager:
         }
 
     def get_tasks(self, username: str) -> List[dict]:
-        tasks = self._load_tasks(username)
+        # Synchronous: served from the cache when the user is loaded, else straight from the engine
+        data = self.backend.peek(username)
+        if data is None:
+            data = self.store.load_tasks(username)
         now = datetime.now()
+        now_iso, soon_iso = now.isoformat(), (now + DUE_SOON).isoformat()
         result = []
-        for task in tasks.values():
-            meta = task.to_dict()
+        for task in data.values():
+            meta = Task.from_dict(task).to_dict()
             # Add status: overdue, due_soon, completed
-            if task.completed:
-                meta["status"] = "completed"
-            elif task.due_date:
-                if task.due_date < now:
-                    meta["status"] = "overdue"
-                elif (task.due_date - now).days < 2:
-                    meta["status"] = "due_soon"
-                else:
-                    meta["status"] = "pending"
-            else:
-                meta["status"] = "pending"
+            meta["status"] = task_status(meta, now_iso, soon_iso)
             result.append(meta)
         return result
 
+    async def query_tasks(self, username: str, limit: Optional[int] = None, cursor: Optional[str] = None, **filters) -> dict:
+        """
+        One page of a user's tasks matching ``filters`` (see TaskQuery), plus the
+        cursor for the next page. Raises ValueError for an invalid cursor.
+        """
+        query = TaskQuery(limit=limit, cursor=cursor, **filters)
+        # Read before querying, so every change-feed event up to seq is reflected in the page
+        seq = self.feed.latest_seq(username)
+        page = await self.backend.query_tasks(username, query)
+        lines = [f"{'✓' if task['completed'] else '○'} {task['id']}. {task['title']}" for task in page["tasks"]]
+        return {
+            "content": "\n".join(lines) if lines else "No tasks found",
+            "tasks": page["tasks"],
+            "next_cursor": page["next_cursor"],
+            "metadata": {"task_count": len(lines), "seq": seq}
+        }
+
+    async def search_tasks(self, username: str, text: str, limit: int = 20) -> dict:
+        """
+        Full-text search over title, description and tags, best match first.
+        Raises ValueError for a query without terms and SearchUnavailableError
+        when the storage engine has no search index.
+        """
+        results = await self.backend.search_tasks(username, text, limit)
+        now = datetime.now()
+        now_iso, soon_iso = now.isoformat(), (now + DUE_SOON).isoformat()
+        for result in results:
+            result["task"]["status"] = task_status(result["task"], now_iso, soon_iso)
+        return {
+            "content": "\n".join(f"{result['task']['id']}. {result['snippet']}" for result in results) or "No tasks found",
+            "results": results,
+            "metadata": {"result_count": len(results)}
+        }
+
+    async def due_within(self, username: str, hours: float, limit: Optional[int] = None, cursor: Optional[str] = None) -> dict:
+        """Open tasks due in the next ``hours``, soonest first, read from the due-date index"""
+        now = datetime.now()
+        return await self.query_tasks(
+            username, limit=limit, cursor=cursor, completed=False,
+            due_after=now, due_before=now + timedelta(hours=hours), sort="due_date", now=now
+        )
+
+    def _remember(self, event: dict) -> None:
+        self._reminder_seq += 1
+        reminders = self._reminders.setdefault(event["username"], deque(maxlen=MAX_REMINDERS))
+        reminders.append({"seq": self._reminder_seq, **event})
+        self.feed.publish(event["username"], "reminder", id=event["task_id"], reminder=event["type"], due_date=event["due_date"])
+        logger.info(f"Reminder for user {event['username']}: task {event['task_id']} is {event['type']}")
+
+    def get_reminders(self, username: str, after: int = 0) -> dict:
+        """Reminders raised since ``after`` (the last ``seq`` seen), oldest first"""
+        reminders = [reminder for reminder in self._reminders.get(username, ()) if reminder["seq"] > after]
+        lines = [f"Task {r['task_id']}. {r['title']} is {'overdue' if r['type'] == 'overdue' else 'due soon'}" for r in reminders]
+        return {
+            "content": "\n".join(lines) if lines else "No reminders",
+            "reminders": reminders,
+            "metadata": {"reminder_count": len(reminders), "last_seq": reminders[-1]["seq"] if reminders else after}
+        }
+
     async def complete_task(self, username: str, task_id: int) -> dict:
-        tasks = self._load_tasks(username)
-        if task_id not in tasks:
+        if not await self.backend.set_completed(username, task_id):
             return {"content": f"Task {task_id} not found"}
-        tasks[task_id].completed = True
-        self._save_tasks(username, tasks)
+        self.scheduler.untrack(username, task_id)
+        self.feed.publish(username, "complete", id=task_id)
         return {"content": f"Marked task {task_id} as completed"}
 
     async def delete_task(self, username: str, task_id: int) -> dict:
-        import logging
-        logger = logging.getLogger("TodoManager")
-        tasks = self._load_tasks(username)
-        if task_id not in tasks:
+        if not await self.backend.delete_task(username, task_id):
             return {"success": False, "error": "Task not found."}
-        del tasks[task_id]
-        self._save_tasks(username, tasks)
+        self.scheduler.untrack(username, task_id)
+        self.feed.publish(username, "delete", id=task_id)
         logger.info(f"Deleted task {task_id} for user {username}")
-        return {"success": True}
\ No newline at end of file
+        return {"success": True}
+
+    async def update_task(self, username: str, task_id: int, title: str) -> dict:
+        """Replace a task's title, re-deriving its tags and priority"""
+        response = await self.bulk_update(username, [{"op": "update", "id": task_id, "title": title}])
+        result = response["results"][0]
+        return {"success": True, "task": result["task"]} if result["success"] else {"success": False, "error": result["error"]}
+
+    async def bulk_update(self, username: str, operations: List[dict]) -> dict:
+        """
+        Apply add/update/complete/delete operations in order, all or none, with
+        one load and one write. Each operation is validated against the state
+        left by the ones before it; if any fails, nothing is stored.
+        """
+        response = await self.backend.transact(username, lambda tasks, next_id: self._plan_operations(tasks, next_id, operations))
+        if response["success"]:
+            for result in response["results"]:
+                if result["op"] == "delete":
+                    self.scheduler.untrack(username, result["id"])
+                    self.feed.publish(username, "delete", id=result["id"])
+                else:
+                    self.scheduler.track(username, result["task"])
+                    self.feed.publish(username, result["op"], id=result["task"]["id"], task=dict(result["task"]))
+        logger.info(f"Bulk update for user {username}: {len(operations)} operations, applied={response['success']}")
+        return response
+
+    @staticmethod
+    def _plan_operations(tasks: Dict[int, dict], next_id: int, operations: List[dict]):
+        titles = {title_key(task["title"]): task_id for task_id, task in tasks.items()}
+        changed: Dict[int, dict] = {}
+        deleted = set()
+        results = []
+        for index, operation in enumerate(operations):
+            op = operation.get("op")
+            task_id = operation.get("id")
+            title = operation.get("title")
+            error = None
+            if op not in BULK_OPERATIONS:
+                error = "Unknown operation."
+            elif op != "add" and task_id not in tasks:
+                error = "Task not found."
+            elif (op == "add" or title is not None) and (not title or not title.strip()):
+                error = "Task title cannot be empty."
+            elif title is not None and titles.get(title_key(title), task_id) != task_id:
+                error = "Duplicate task title."
+            else:
+                due_date = operation.get("due_date")
+                if isinstance(due_date, str):
+                    try:
+                        due_date = datetime.fromisoformat(due_date)
+                    except ValueError:
+                        error = "Invalid due date."
+            if error:
+                results.append({"index": index, "op": op, "success": False, "error": error})
+                continue
+
+            if op == "delete":
+                del titles[title_key(tasks.pop(task_id)["title"])]
+                changed.pop(task_id, None)
+                deleted.add(task_id)
+                results.append({"index": index, "op": op, "success": True, "id": task_id})
+                continue
+            if op == "add":
+                task = Task(
+                    title=title,
+                    description=operation.get("description"),
+                    due_date=due_date or Task._parse_due_date(title),
+                    completed=bool(operation.get("completed")),
+                    tags=operation.get("tags") or Task._parse_tags(title),
+                    priority=operation.get("priority") or Task._parse_priority(title)
+                ).to_dict()
+                task["id"] = task_id = next_id
+                next_id += 1
+            else:
+                task = dict(tasks[task_id])
+                if op == "complete":
+                    task["completed"] = True
+                else:
+                    if title is not None:
+                        del titles[title_key(task["title"])]
+                        task["title"] = title
+                        task["tags"] = Task._parse_tags(title)
+                        task["priority"] = Task._parse_priority(title)
+                    for field in ("description", "tags", "priority", "completed"):
+                        if operation.get(field) is not None:
+                            task[field] = operation[field]
+                    if due_date is not None:
+                        task["due_date"] = Task._isoformat(due_date)
+            tasks[task_id] = changed[task_id] = task
+            titles[title_key(task["title"])] = task_id
+            deleted.discard(task_id)
+            results.append({"index": index, "op": op, "success": True, "task": task})
+
+        success = all(result["success"] for result in results)
+        response = {"success": success, "results": results, "metadata": {"operation_count": len(operations)}}
+        if not success:
+            return [], [], response
+        return list(changed.values()), list(deleted), response
@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 # from utils.gemini_client import GeminiClient
 
 class TranslatorService:
@@ -13,38 +13,44 @@ class TranslatorService:
 
 If specific terms should not be translated (like names or technical terms), preserve them as is."""
 
+    @staticmethod
+    def _validate(content: str, parameters: Optional[dict]) -> Optional[dict]:
+        """Return an error response for unusable input, or None if the request is valid"""
+        if not content or not content.strip():
+            return {
+                "content": "Please enter text to translate.",
+                "metadata": {"error": "Empty input"}
+            }
+        if len(content.strip()) < 2:
+            return {
+                "content": "Please provide a longer text to translate.",
+                "metadata": {"error": "Input too short"}
+            }
+        if not parameters or "target_language" not in parameters:
+            return {
+                "content": "Please specify a target language for translation.",
+                "metadata": {"error": "Missing target language"}
+            }
+        return None
+
+    @staticmethod
+    def _build_prompt(content: str, target_language: str) -> str:
+        return f"Translate the following text to {target_language} (preserve formatting and context):\n{content}"
+
     async def process(self, content: str, parameters: Optional[dict] = None) -> dict:
         """Process translation requests"""
         import logging
         logger = logging.getLogger("TranslatorService")
         try:
             # Input validation
-            if not content or not content.strip():
-                return {
-                    "content": "Please enter text to translate.",
-                    "metadata": {"error": "Empty input"}
-                }
-            if len(content.strip()) < 2:
-                return {
-                    "content": "Please provide a longer text to translate.",
-                    "metadata": {"error": "Input too short"}
-                }
-            if not parameters or "target_language" not in parameters:
-                return {
-                    "content": "Please specify a target language for translation.",
-                    "metadata": {"error": "Missing target language"}
-                }
+            error = self._validate(content, parameters)
+            if error:
+                return error
             
             target_language = parameters["target_language"]
-            preserve_format = parameters.get("preserve_format", True)
-            
-            # Adjust system prompt based on parameters
-            format_instruction = ""
-            if preserve_format:
-                format_instruction = "\nMaintain the original text's formatting, including line breaks and special characters."
             
             # Generate translation
-            translation_prompt = f"Translate the following text to {target_language} (preserve formatting and context):\n{content}"
+            translation_prompt = self._build_prompt(content, target_language)
             response = await self.gemini_client.generate_response(
                 prompt=translation_prompt,
                 system_prompt=None,
@@ -63,6 +69,7 @@ If specific terms should not be translated (like names or technical terms), pres
                     "target_length": len(response.get("content", "")),
                     "target_language": target_language,
                         # 'model' key omitted because generate_response does not return it
+                    "cache": response.get("cache")
                 }
             }
         except Exception as e:
@@ -72,6 +79,19 @@ If specific terms should not be translated (like names or technical terms), pres
                 "metadata": {"error": str(e)}
             }
 
+    async def stream(self, content: str, parameters: Optional[dict] = None) -> AsyncIterator[str]:
+        """Stream a translation chunk by chunk; validation errors are yielded as a single chunk"""
+        error = self._validate(content, parameters)
+        if error:
+            yield error["content"]
+            return
+        async for chunk in self.gemini_client.stream_response(
+            prompt=self._build_prompt(content, parameters["target_language"]),
+            system_prompt=None,
+            temperature=0.3
+        ):
+            yield chunk
+
     @staticmethod
     def detect_language(text: str) -> str:
         """
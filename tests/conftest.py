@@ -1,4 +1,5 @@
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
 from unittest.mock import Mock
 import os
@@ -8,6 +9,8 @@ from pathlib import Path
 from main import app
 from utils.llm_client import LLMClient
 from utils.file_handler import FileHandler
+from services.todo_manager import TodoManager
+from utils.todo_store import SqliteTodoStore
 
 @pytest.fixture
 def test_client():
@@ -36,4 +39,55 @@ def test_file_handler():
     # Cleanup after tests
     for file in test_data_dir.glob("*"):
         file.unlink()
-    test_data_dir.rmdir() 
\ No newline at end of file
+    test_data_dir.rmdir() 
+
+# --- Todo fixtures shared by the tests/test_todo_*.py and scheduler tests ---
+
+# (storage engine, write-back cache) pairs that TodoManager supports
+TODO_BACKENDS = [("sqlite", True), ("sqlite", False), ("json", False), ("journal", False)]
+
+class CountingStore(SqliteTodoStore):
+    """SQLite engine that counts loads and writes, and records batch sizes"""
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.loads = 0
+        self.writes = 0
+        self.batches = []
+
+    def load_tasks(self, username):
+        self.loads += 1
+        return super().load_tasks(username)
+
+    def add_task(self, username, task):
+        self.writes += 1
+        return super().add_task(username, task)
+
+    def apply_changes(self, username, upserts, deleted_ids):
+        self.writes += 1
+        self.batches.append((username, len(upserts), len(deleted_ids)))
+        super().apply_changes(username, upserts, deleted_ids)
+
+    def transact(self, username, plan):
+        self.writes += 1
+        return super().transact(username, plan)
+
+def make_task(title):
+    """A stored task dict without an ID, as passed to the engines' add_task"""
+    return {"title": title, "description": None, "created_at": "2024-01-01T00:00:00",
+            "due_date": None, "completed": False, "tags": [], "priority": None}
+
+@pytest_asyncio.fixture(params=TODO_BACKENDS, ids=lambda param: f"{param[0]}{'-cache' if param[1] else ''}")
+async def manager(request, tmp_path):
+    """TodoManager over a temporary directory, once per supported backend"""
+    storage, cache = request.param
+    manager = TodoManager(base_dir=str(tmp_path / "todos"), storage=storage, cache=cache)
+    yield manager
+    await manager.close()
+
+@pytest_asyncio.fixture(params=[True, False], ids=["cache", "no-cache"])
+async def sqlite_manager(request, tmp_path):
+    """TodoManager on the SQLite engine, for features only it provides (e.g. search)"""
+    manager = TodoManager(base_dir=str(tmp_path / "todos"), cache=request.param)
+    yield manager
+    await manager.close()
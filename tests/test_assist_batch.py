@@ -0,0 +1,53 @@
+import pytest
+import json
+import asyncio
+
+import main
+from utils.auth import get_current_active_user, User
+
+@pytest.fixture
+def authed_client(test_client, monkeypatch):
+    async def fake_generate_response(prompt, system_prompt=None, temperature=0.7, max_tokens=1024):
+        # Earlier items finish later, so completion order differs from request order
+        await asyncio.sleep(0.05 if "first" in prompt else 0)
+        return {"content": f"translated {prompt.splitlines()[-1]}", "model": "mock-model"}
+
+    monkeypatch.setattr(main.gemini_client, "generate_response", fake_generate_response)
+    main.app.dependency_overrides[get_current_active_user] = lambda: User(username="batch_user")
+    yield test_client
+    main.app.dependency_overrides.clear()
+
+BATCH = {"requests": [
+    {"type": "translate", "content": "first", "parameters": {"target_language": "French"}},
+    {"type": "translate", "content": "second", "parameters": {"target_language": "French"}},
+    {"type": "not-a-type", "content": "third"},
+]}
+
+def test_batch_streams_ndjson_as_items_complete(authed_client):
+    """Test that results stream as NDJSON lines with their original index"""
+    response = authed_client.post("/assist/batch", json=BATCH)
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    results, summary = lines[:-1], lines[-1]
+    assert summary == {"done": True, "count": 3, "errors": 1}
+    assert results[-1]["index"] == 0  # slowest item arrives last
+    by_index = {result["index"]: result for result in results}
+    assert by_index[1]["content"] == "translated second"
+    assert by_index[2]["status"] == "error"
+    assert "Type must be one of" in by_index[2]["error"]
+
+def test_batch_ordered_results(authed_client):
+    """Test that stream=false returns every result in request order"""
+    response = authed_client.post("/assist/batch?stream=false", json=BATCH)
+
+    results = response.json()["results"]
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert [result["status"] for result in results] == ["success", "success", "error"]
+    assert results[0]["content"] == "translated first"
+
+def test_batch_rejects_oversized_batches(authed_client):
+    """Test that batches above the size limit are rejected up front"""
+    items = [{"type": "chat", "content": "hi"}] * (main.MAX_BATCH_SIZE + 1)
+    response = authed_client.post("/assist/batch", json={"requests": items})
+    assert response.status_code == 422
@@ -0,0 +1,37 @@
+import pytest
+import json
+
+import main
+from services.todo_manager import TodoManager
+from utils.auth import get_current_active_user, User
+
+@pytest.fixture
+def authed_client(test_client, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "todo_service", TodoManager(base_dir=str(tmp_path / "todos")))
+    main.app.dependency_overrides[get_current_active_user] = lambda: User(username="stream_user")
+    yield test_client
+    main.app.dependency_overrides.clear()
+
+def read_events(response):
+    """(event, data) pairs of a server-sent event stream"""
+    events = []
+    for block in response.text.split("\n\n"):
+        if not block.strip():
+            continue
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+def test_todo_commands_stream_their_reply(authed_client):
+    """Test that a todo command streams the same text /assist returns"""
+    response = authed_client.post("/assist/stream", json={"type": "todo", "content": "add Buy milk"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = read_events(response)
+    assert events[0] == ("message", {"content": "Added task 1: Buy milk"})
+    assert events[-1][0] == "done"
+
+    duplicate = authed_client.post("/assist", json={"type": "todo", "content": "add buy MILK"}).json()
+    assert duplicate["content"] == "Duplicate task title."
+    streamed = read_events(authed_client.post("/assist/stream", json={"type": "todo", "content": "delete 1"}))
+    assert streamed[0] == ("message", {"content": "Deleted task 1"})
@@ -0,0 +1,138 @@
+import pytest
+import asyncio
+import httpx
+
+from utils.concurrency_limiter import (
+    AdaptiveConcurrencyLimiter, ConcurrencyLimitedClient, request_priority,
+    is_overload_error, PRIORITY_INTERACTIVE, PRIORITY_BULK
+)
+
+@pytest.mark.asyncio
+async def test_limit_bounds_concurrency():
+    """Test that no more than `limit` calls run at once"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+    running = 0
+    peak = 0
+
+    async def work():
+        nonlocal running, peak
+        async with limiter.acquire():
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(work() for _ in range(6)))
+    assert peak == 2
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.stats()["queue_depth"] == 0
+
+@pytest.mark.asyncio
+async def test_queued_callers_admitted_by_priority():
+    """Test that interactive waiters are admitted before earlier bulk waiters"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+    order = []
+    release = asyncio.Event()
+
+    async def holder():
+        async with limiter.acquire():
+            await release.wait()
+
+    async def waiter(name, priority):
+        async with limiter.acquire(priority):
+            order.append(name)
+
+    tasks = [asyncio.create_task(holder())]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(waiter("bulk-1", PRIORITY_BULK)))
+    tasks.append(asyncio.create_task(waiter("bulk-2", PRIORITY_BULK)))
+    tasks.append(asyncio.create_task(waiter("chat", PRIORITY_INTERACTIVE)))
+    await asyncio.sleep(0)
+    assert limiter.stats()["queue_depth"] == 3
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ["chat", "bulk-1", "bulk-2"]
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    """Test that a caller cancelled while queued leaves the limiter consistent"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+    release = asyncio.Event()
+
+    async def holder():
+        async with limiter.acquire():
+            await release.wait()
+
+    async def waiter():
+        async with limiter.acquire():
+            pass
+
+    held = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(waiter())
+    await asyncio.sleep(0)
+    queued.cancel()
+    release.set()
+    await held
+    await asyncio.gather(queued, return_exceptions=True)
+
+    assert limiter.stats()["in_flight"] == 0
+    async with limiter.acquire():
+        assert limiter.stats()["in_flight"] == 1
+
+def test_aimd_increase_and_decrease():
+    """Test additive increase on healthy latency and multiplicative decrease on overload/spikes"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=32, decrease_cooldown=0)
+    for _ in range(4):
+        limiter.record_success(0.1)
+    assert limiter.current_limit == 4
+    assert limiter.limit > 4.9
+
+    limiter.record_overload()
+    assert limiter.current_limit == 2
+
+    limiter.record_success(5.0)  # far above the ~0.1s baseline
+    assert limiter.current_limit == 1
+
+def test_spikes_are_judged_against_comparable_calls():
+    """Test that long bulk generations do not count as spikes against short interactive calls"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, decrease_cooldown=0)
+    for _ in range(5):
+        limiter.record_success(0.2, PRIORITY_INTERACTIVE, output_tokens=20)
+    # Ten times slower overall, but the same time per token
+    limiter.record_success(2.0, PRIORITY_BULK, output_tokens=200)
+    limiter.record_success(2.0, PRIORITY_INTERACTIVE, output_tokens=200)
+    limiter.record_success(5.0, PRIORITY_BULK)
+    assert limiter.counters["decreases"] == 0
+
+    limiter.record_success(2.0, PRIORITY_INTERACTIVE, output_tokens=20)
+    assert limiter.counters["decreases"] == 1
+
+def test_is_overload_error_follows_cause_chain():
+    """Test that wrapped HTTP 429 errors are recognised as overload"""
+    request = httpx.Request("POST", "https://fake")
+    status_error = httpx.HTTPStatusError("429", request=request, response=httpx.Response(429, request=request))
+    try:
+        raise Exception("GeminiClient error") from status_error
+    except Exception as wrapped:
+        assert is_overload_error(wrapped)
+    assert not is_overload_error(ValueError("bad input"))
+
+@pytest.mark.asyncio
+async def test_limited_client_reports_overload():
+    """Test that the wrapper shrinks the limit when the upstream returns 429"""
+    request = httpx.Request("POST", "https://fake")
+
+    class ThrottledClient:
+        async def generate_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024):
+            raise Exception("GeminiClient error") from httpx.HTTPStatusError(
+                "429", request=request, response=httpx.Response(429, request=request))
+
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+    client = ConcurrencyLimitedClient(ThrottledClient(), limiter)
+    request_priority.set(PRIORITY_BULK)
+
+    with pytest.raises(Exception):
+        await client.generate_response("Hello")
+    assert limiter.current_limit == 4
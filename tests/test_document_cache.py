@@ -0,0 +1,73 @@
+import pytest
+
+from utils.document_cache import DocumentTextCache
+from utils.file_handler import FileHandler
+
+class CountingExtractor:
+    """Stand-in PDF extractor that counts extractions"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def extract_pages(self, path, start=0, stop=None):
+        self.calls += 1
+        return ["First page\r\n", "Second page"]
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def handler(tmp_path):
+    data_dir = tmp_path / "files"
+    data_dir.mkdir()
+    cache = DocumentTextCache(db_path=str(tmp_path / "cache.db"))
+    return FileHandler(data_dir=str(data_dir), pdf_extractor=CountingExtractor(), text_cache=cache)
+
+@pytest.mark.asyncio
+async def test_repeat_document_is_served_from_cache(handler):
+    """Test that the second read of the same file skips extraction"""
+    (handler.data_dir / "report.pdf").write_bytes(b"%PDF fake")
+    first = await handler.read_document("report.pdf")
+    second = await handler.read_document("report.pdf")
+    assert first == second == "First page\n\fSecond page"
+    assert handler.pdf_extractor.calls == 1
+    assert handler.text_cache.counters["memory_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_cache_is_keyed_by_content_not_name(handler):
+    """Test that a renamed copy hits the cache and an edited file misses it"""
+    (handler.data_dir / "a.pdf").write_bytes(b"%PDF same")
+    (handler.data_dir / "b.pdf").write_bytes(b"%PDF same")
+    (handler.data_dir / "c.pdf").write_bytes(b"%PDF different")
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        await handler.read_document(name)
+    assert handler.pdf_extractor.calls == 2
+
+@pytest.mark.asyncio
+async def test_page_offsets_and_disk_tier(tmp_path):
+    """Test that entries survive a restart with their page offsets"""
+    cache = DocumentTextCache(db_path=str(tmp_path / "cache.db"))
+    await cache.set("abc", ["one", "two"], separator="\f")
+    reopened = DocumentTextCache(db_path=str(tmp_path / "cache.db"))
+    entry = await reopened.get("abc")
+    assert entry == {"text": "one\ftwo", "page_offsets": [0, 4]}
+    assert reopened.counters["disk_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_disk_tier_evicts_least_recently_used(tmp_path):
+    """Test that the disk tier stays under its size bound"""
+    cache = DocumentTextCache(db_path=str(tmp_path / "cache.db"), max_disk_bytes=25)
+    for key in ("a", "b", "c"):
+        await cache.set(key, ["x" * 10])
+    cache._memory.clear()
+    assert await cache.get("a") is None
+    assert await cache.get("c") is not None
+    assert cache.counters["disk_evictions"] == 1
+
+@pytest.mark.asyncio
+async def test_text_files_are_cached(handler):
+    """Test that plain text files go through the cache too"""
+    (handler.data_dir / "notes.txt").write_text("Plain text notes")
+    assert await handler.read_document("notes.txt") == "Plain text notes"
+    assert await handler.read_document("notes.txt") == "Plain text notes"
+    assert handler.text_cache.counters["hits"] == 1
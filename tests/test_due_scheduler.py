@@ -0,0 +1,162 @@
+import pytest
+import asyncio
+from datetime import datetime, timedelta
+
+from services.todo_manager import TodoManager
+from utils.due_scheduler import DueDateScheduler
+
+START = datetime(2024, 6, 1, 9, 0)
+
+class FakeClock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+def make_task(task_id, hours, completed=False):
+    return {"id": task_id, "title": f"task {task_id}", "due_date": (START + timedelta(hours=hours)).isoformat(), "completed": completed}
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def scheduler(clock):
+    return DueDateScheduler(clock=clock)
+
+def test_reminders_fire_in_due_order(scheduler, clock):
+    """Test that due-soon and overdue reminders fire once each, when their thresholds pass"""
+    scheduler.track("alice", make_task(1, 72))
+    scheduler.track("alice", make_task(2, 60))
+    assert scheduler.fire_due() == []
+
+    clock.now = START + timedelta(hours=24)
+    assert [(e["task_id"], e["type"]) for e in scheduler.fire_due()] == [(2, "due_soon"), (1, "due_soon")]
+    assert scheduler.fire_due() == []
+
+    clock.now = START + timedelta(hours=80)
+    assert [(e["task_id"], e["type"]) for e in scheduler.fire_due()] == [(2, "overdue"), (1, "overdue")]
+    assert scheduler.stats()["tracked"] == 0
+
+def test_changed_tasks_are_rescheduled(scheduler, clock):
+    """Test that completed, deleted and rescheduled tasks do not raise stale reminders"""
+    listener = []
+    scheduler.add_listener(listener.append)
+    for task_id in (1, 2, 3):
+        scheduler.track("alice", make_task(task_id, 72))
+    scheduler.track("alice", make_task(1, 72, completed=True))
+    scheduler.untrack("alice", 2)
+    scheduler.track("alice", make_task(3, 200))
+
+    clock.now = START + timedelta(hours=100)
+    assert scheduler.fire_due() == []
+    clock.now = START + timedelta(hours=160)
+    scheduler.fire_due()
+    assert [(e["task_id"], e["type"]) for e in listener] == [(3, "due_soon")]
+    assert scheduler.stats()["stale_skipped"] >= 4
+
+def test_thresholds_before_start_are_not_announced(clock):
+    """Test that a restart does not repeat reminders for thresholds that already passed"""
+    clock.now = START + timedelta(hours=30)
+    scheduler = DueDateScheduler(clock=clock)
+    scheduler.load([("alice", make_task(1, 40)), ("alice", make_task(2, 10))])
+    clock.now = START + timedelta(hours=41)
+    assert [(e["task_id"], e["type"]) for e in scheduler.fire_due()] == [(1, "overdue")]
+
+def test_tasks_added_inside_the_window_are_announced(scheduler, clock):
+    """Test that a task added or re-dated inside the due-soon window gets due_soon straight away, once"""
+    clock.now = START + timedelta(hours=30)
+    scheduler.track("alice", make_task(1, 40))
+    scheduler.track("alice", make_task(2, 200))
+    scheduler.track("alice", make_task(3, 20))
+    assert [(e["task_id"], e["type"]) for e in scheduler.fire_due()] == [(3, "overdue"), (1, "due_soon")]
+
+    scheduler.track("alice", {**make_task(1, 40), "title": "renamed"})
+    scheduler.track("alice", make_task(2, 50))
+    assert [(e["task_id"], e["type"]) for e in scheduler.fire_due()] == [(2, "due_soon")]
+    clock.now = START + timedelta(hours=41)
+    assert [(e["task_id"], e["type"]) for e in scheduler.fire_due()] == [(1, "overdue")]
+
+def test_retracked_tasks_are_not_announced_again(scheduler, clock):
+    """Test that renaming an overdue task or reopening a completed one does not repeat reminders"""
+    scheduler.track("alice", make_task(1, 72))
+    clock.now = START + timedelta(hours=80)
+    assert [e["type"] for e in scheduler.fire_due()] == ["due_soon", "overdue"]
+
+    scheduler.track("alice", {**make_task(1, 72), "title": "renamed"})
+    scheduler.track("alice", make_task(1, 72, completed=True))
+    scheduler.track("alice", make_task(1, 72))
+    assert scheduler.fire_due() == []
+    assert scheduler.stats()["repeats_skipped"] >= 2
+
+    scheduler.track("alice", make_task(1, 81))
+    clock.now = START + timedelta(hours=82)
+    assert [e["type"] for e in scheduler.fire_due()] == ["due_soon", "overdue"]
+
+@pytest.mark.asyncio
+async def test_loop_survives_errors(clock):
+    """Test that a failing pass of the background loop is logged and later reminders still fire"""
+    failures = [RuntimeError("clock unavailable")]
+
+    def flaky_clock():
+        if failures:
+            raise failures.pop()
+        return clock()
+
+    scheduler = DueDateScheduler(clock=clock)
+    scheduler.clock = flaky_clock
+    listener = []
+    scheduler.add_listener(listener.append)
+    scheduler.start()
+    await asyncio.sleep(0.01)
+    assert scheduler.stats()["loop_errors"] == 1
+
+    clock.now = START + timedelta(hours=1)
+    scheduler.track("alice", make_task(1, 0))
+    await asyncio.sleep(0.01)
+    assert [(e["task_id"], e["type"]) for e in listener] == [(1, "overdue")]
+    await scheduler.close()
+
+def test_heap_is_rebuilt_when_mostly_stale(scheduler):
+    """Test that repeated rescheduling does not grow the heap without bound"""
+    for hours in range(2000):
+        scheduler.track("alice", make_task(1, hours + 1))
+    assert scheduler.stats()["heap"] < 1100
+    assert scheduler.stats()["rebuilds"] >= 1
+
+@pytest.mark.asyncio
+async def test_manager_reminders_and_due_window(manager):
+    """Test that the background loop records reminders and due_within returns the window in due order"""
+    now = datetime.now()
+    await manager.bulk_update("alice", [
+        {"op": "add", "title": "Later", "due_date": (now + timedelta(hours=30)).isoformat()},
+        {"op": "add", "title": "Now", "due_date": (now + timedelta(seconds=0.2)).isoformat()},
+        {"op": "add", "title": "Next week", "due_date": (now + timedelta(days=7)).isoformat()},
+        {"op": "add", "title": "Already done", "due_date": (now + timedelta(hours=1)).isoformat(), "completed": True},
+    ])
+    await manager.start()
+    due = await manager.due_within("alice", 48)
+    assert [task["title"] for task in due["tasks"]] == ["Now", "Later"]
+
+    await asyncio.sleep(0.5)
+    reminders = manager.get_reminders("alice")["reminders"]
+    # Both were added inside the due-soon window, so due_soon fires straight away
+    assert [(r["title"], r["type"]) for r in reminders] == [("Later", "due_soon"), ("Now", "due_soon"), ("Now", "overdue")]
+    assert manager.get_reminders("alice", after=reminders[-1]["seq"])["reminders"] == []
+    assert manager.get_reminders("bob")["reminders"] == []
+
+@pytest.mark.asyncio
+async def test_start_loads_stored_tasks(tmp_path):
+    """Test that tasks stored before startup are scheduled"""
+    first = TodoManager(base_dir=str(tmp_path / "todos"))
+    await first.bulk_update("alice", [
+        {"op": "add", "title": "Open", "due_date": (datetime.now() + timedelta(days=5)).isoformat()},
+        {"op": "add", "title": "No date"},
+    ])
+    await first.close()
+
+    reopened = TodoManager(base_dir=str(tmp_path / "todos"))
+    await reopened.start()
+    assert reopened.scheduler.stats()["tracked"] == 1
+    await reopened.close()
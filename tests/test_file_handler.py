@@ -0,0 +1,46 @@
+import pytest
+import asyncio
+import os
+from datetime import datetime
+
+from utils.file_handler import FileHandler
+
+@pytest.fixture
+def handler(tmp_path):
+    handler = FileHandler(data_dir=str(tmp_path), io_workers=4)
+    yield handler
+    handler.close()
+
+@pytest.mark.asyncio
+async def test_json_round_trip(handler):
+    """Test that JSON saved with orjson loads back, including non-string keys and datetimes"""
+    await handler.save_json({"tasks": [{"id": 1}], 2: "two", "at": datetime(2024, 1, 2, 3, 4)}, "state.json")
+    data = await handler.load_json("state.json")
+    assert data == {"tasks": [{"id": 1}], "2": "two", "at": "2024-01-02T03:04:00"}
+    assert await handler.load_json("missing.json") == {}
+
+@pytest.mark.asyncio
+async def test_save_json_is_atomic(handler, monkeypatch):
+    """Test that a failed write leaves the previous file intact and no temp files behind"""
+    await handler.save_json({"version": 1}, "state.json")
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        await handler.save_json({"version": 2}, "state.json")
+    monkeypatch.undo()
+
+    assert await handler.load_json("state.json") == {"version": 1}
+    assert os.listdir(handler.data_dir) == ["state.json"]
+
+@pytest.mark.asyncio
+async def test_concurrent_file_operations(handler):
+    """Test that many concurrent reads, writes and deletes complete correctly"""
+    await asyncio.gather(*(handler.save_json({"n": n}, f"{n}.json") for n in range(50)))
+    loaded = await asyncio.gather(*(handler.load_json(f"{n}.json") for n in range(50)))
+    assert [item["n"] for item in loaded] == list(range(50))
+    deleted = await asyncio.gather(*(handler.delete_file(f"{n}.json") for n in range(50)))
+    assert all(deleted)
+    assert await handler.read_file("0.json") is None
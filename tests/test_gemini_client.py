@@ -0,0 +1,62 @@
+import pytest
+import json
+import httpx
+
+from utils.gemini_client import GeminiClient
+
+@pytest.fixture
+def gemini_client(monkeypatch):
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "test-key-1234")
+    return GeminiClient()
+
+def sse_body(*texts):
+    events = []
+    for text in texts:
+        chunk = {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+        events.append(f"data: {json.dumps(chunk)}\r\n\r\n")
+    return "".join(events).encode()
+
+@pytest.mark.asyncio
+async def test_stream_response_yields_chunks(gemini_client):
+    """Test that streamed SSE events are yielded as text chunks in order"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=sse_body("Hello", ", ", "world"),
+                              headers={"content-type": "text/event-stream"})
+
+    gemini_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    chunks = [chunk async for chunk in gemini_client.stream_response("Hi", system_prompt="Be brief")]
+
+    assert chunks == ["Hello", ", ", "world"]
+    assert ":streamGenerateContent" in requests[0].url.path
+    assert requests[0].url.params["alt"] == "sse"
+    payload = json.loads(requests[0].content)
+    assert payload["contents"][0]["parts"][0]["text"] == "Be brief\n\nHi"
+
+@pytest.mark.asyncio
+async def test_stream_response_skips_empty_and_malformed_events(gemini_client):
+    """Test that keep-alive lines, malformed events and empty parts are ignored"""
+    body = b": keep-alive\r\n\r\ndata: not-json\r\n\r\n" + sse_body("", "ok")
+
+    def handler(request):
+        return httpx.Response(200, content=body)
+
+    gemini_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    chunks = [chunk async for chunk in gemini_client.stream_response("Hi")]
+
+    assert chunks == ["ok"]
+
+@pytest.mark.asyncio
+async def test_stream_response_http_error(gemini_client):
+    """Test that an HTTP error surfaces with the response body"""
+    def handler(request):
+        return httpx.Response(400, json={"error": {"message": "bad request"}})
+
+    gemini_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    with pytest.raises(Exception) as exc_info:
+        async for _ in gemini_client.stream_response("Hi"):
+            pass
+    assert "bad request" in str(exc_info.value)
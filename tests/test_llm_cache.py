@@ -0,0 +1,124 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from utils.llm_cache import LLMResponseCache, CachedLLMClient
+from utils.llm_router import LLMProvider, LLMRouter
+from services.translator import TranslatorService
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(db_path=str(tmp_path / "llm_cache.db"))
+
+@pytest.fixture
+def upstream():
+    client = AsyncMock()
+    client.model = "mock-model"
+    client.generate_response.return_value = {"content": "Hola", "model": "mock-model"}
+    return client
+
+@pytest.mark.asyncio
+async def test_repeat_request_served_from_memory(cache, upstream):
+    """Test that an identical low-temperature request hits the cache"""
+    client = CachedLLMClient(upstream, cache)
+
+    first = await client.generate_response("Hello", system_prompt="Translate", temperature=0.3)
+    second = await client.generate_response("Hello", system_prompt="Translate", temperature=0.3)
+
+    assert first["content"] == second["content"] == "Hola"
+    assert first["cache"] == {"hit": False}
+    assert second["cache"] == {"hit": True, "tier": "memory"}
+    upstream.generate_response.assert_called_once()
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_cache_hit_reaches_service_metadata(cache, upstream):
+    """Test that services pass the per-response cache flag through in their metadata"""
+    service = TranslatorService(CachedLLMClient(upstream, cache))
+    parameters = {"target_language": "Spanish"}
+
+    first = await service.process("Hello", parameters)
+    second = await service.process("Hello", parameters)
+
+    assert first["metadata"]["cache"] == {"hit": False}
+    assert second["metadata"]["cache"] == {"hit": True, "tier": "memory"}
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path, upstream):
+    """Test that a new cache instance reads entries persisted by a previous one"""
+    db_path = str(tmp_path / "llm_cache.db")
+    await CachedLLMClient(upstream, LLMResponseCache(db_path=db_path)).generate_response("Hello", temperature=0.3)
+
+    restarted = LLMResponseCache(db_path=db_path)
+    response = await CachedLLMClient(upstream, restarted).generate_response("Hello", temperature=0.3)
+
+    assert response["cache"] == {"hit": True, "tier": "disk"}
+    upstream.generate_response.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_high_temperature_bypasses_cache(cache, upstream):
+    """Test that creative (high temperature) requests always go upstream"""
+    client = CachedLLMClient(upstream, cache, max_cacheable_temperature=0.5)
+
+    await client.generate_response("Tell me a joke", temperature=0.9)
+    await client.generate_response("Tell me a joke", temperature=0.9)
+
+    assert upstream.generate_response.call_count == 2
+    assert cache.stats()["bypassed"] == 2
+
+@pytest.mark.asyncio
+async def test_memory_tier_lru_eviction(tmp_path, upstream):
+    """Test that the memory tier evicts least recently used entries beyond its bound"""
+    cache = LLMResponseCache(db_path=None, max_entries=2)
+    client = CachedLLMClient(upstream, cache)
+
+    for prompt in ["a", "b", "a", "c"]:
+        await client.generate_response(prompt, temperature=0.0)
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["memory_entries"] == 2
+    # "b" was least recently used, so it is the one that must be refetched
+    await client.generate_response("b", temperature=0.0)
+    assert upstream.generate_response.call_count == 4
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_refetched(upstream):
+    """Test that entries past their TTL count as misses"""
+    cache = LLMResponseCache(db_path=None, ttl=-1)
+    client = CachedLLMClient(upstream, cache)
+
+    await client.generate_response("Hello", temperature=0.0)
+    await client.generate_response("Hello", temperature=0.0)
+
+    assert upstream.generate_response.call_count == 2
+    assert cache.stats()["expirations"] == 1
+
+class StandInProvider(LLMProvider):
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.model = f"{name}-model"
+        self.fail = fail
+        self.calls = 0
+
+    async def generate_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return {"content": f"{self.name}: {prompt}", "model": self.model}
+
+@pytest.mark.asyncio
+async def test_local_fallback_answers_are_not_cached(cache):
+    """Test that replies from the router's local fallback are not stored under the primary model's key"""
+    cloud = StandInProvider("cloud", fail=True)
+    local = StandInProvider("local")
+    # probe_interval=0 lets the cloud provider back in as soon as it recovers
+    client = CachedLLMClient(LLMRouter([cloud], local_fallback=local, probe_interval=0), cache)
+
+    assert (await client.generate_response("Hello", temperature=0.0))["content"] == "local: Hello"
+    assert [chunk async for chunk in client.stream_response("Hello", temperature=0.0)] == ["local: Hello"]
+    assert local.calls == 2
+
+    cloud.fail = False
+    assert (await client.generate_response("Hello", temperature=0.0))["content"] == "cloud: Hello"
+    assert [chunk async for chunk in client.stream_response("Hello", temperature=0.0)] == ["cloud: Hello"]
+    assert cloud.calls == 3
@@ -0,0 +1,118 @@
+import pytest
+import asyncio
+
+from utils.llm_router import LLMProvider, LLMRouter, AllProvidersFailedError
+
+class StandInProvider(LLMProvider):
+    """Local stand-in for a cloud or local backend with scripted latency and failures"""
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.model = f"{name}-model"
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def generate_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return {"content": f"{self.name}: {prompt}", "model": self.model}
+
+@pytest.mark.asyncio
+async def test_routes_to_fastest_healthy_provider():
+    """Test that once latencies are known, requests go to the lowest-p50 provider"""
+    slow = StandInProvider("slow", delay=0.02)
+    fast = StandInProvider("fast", delay=0.0)
+    router = LLMRouter([slow, fast])
+    for provider in (slow, fast):
+        for _ in range(5):
+            router.stats_by_provider[provider.name].record(True, provider.delay)
+
+    response = await router.generate_response("Hello")
+
+    assert response["provider"] == "fast"
+    assert slow.calls == 0
+
+@pytest.mark.asyncio
+async def test_fails_over_to_next_provider():
+    """Test that a failing provider is skipped within the same request"""
+    broken = StandInProvider("broken", fail=True)
+    backup = StandInProvider("backup")
+    router = LLMRouter([broken, backup])
+
+    response = await router.generate_response("Hello")
+
+    assert response["content"] == "backup: Hello"
+    assert router.stats()["failovers"] == 1
+    assert router.stats()["providers"]["broken"]["error_rate"] == 1.0
+
+@pytest.mark.asyncio
+async def test_local_fallback_when_cloud_is_down():
+    """Test that the local endpoint serves requests when every cloud provider fails"""
+    cloud = StandInProvider("gemini", fail=True)
+    local = StandInProvider("local")
+    router = LLMRouter([cloud], local_fallback=local)
+
+    response = await router.generate_response("Hello")
+
+    assert response["provider"] == "local"
+    assert router.stats()["local_fallbacks"] == 1
+
+@pytest.mark.asyncio
+async def test_slow_provider_is_deprioritized():
+    """Test that a provider whose p95 exceeds the slow threshold is tried after healthy ones"""
+    sluggish = StandInProvider("sluggish")
+    healthy = StandInProvider("healthy")
+    router = LLMRouter([sluggish, healthy], slow_threshold=1.0, probe_interval=3600)
+    for _ in range(5):
+        router.stats_by_provider["sluggish"].record(True, 5.0)
+        router.stats_by_provider["healthy"].record(True, 0.5)
+
+    assert not router.is_healthy(sluggish)
+    assert [router._name(p) for p in router.route()] == ["healthy", "sluggish"]
+
+@pytest.mark.asyncio
+async def test_slow_provider_is_bypassed_for_local():
+    """Test that a cloud provider that is slow but still answering is routed after the local fallback"""
+    gemini = StandInProvider("gemini")
+    local = StandInProvider("local")
+    router = LLMRouter([gemini], local_fallback=local, slow_threshold=1.0, probe_interval=3600)
+    for _ in range(5):
+        router.stats_by_provider["gemini"].record(True, 5.0)
+
+    assert [router._name(p) for p in router.route()] == ["local", "gemini"]
+    response = await router.generate_response("Hello")
+    assert response["provider"] == "local"
+    assert gemini.calls == 0
+    assert router.stats()["local_fallbacks"] == 1
+
+    local.fail = True
+    assert (await router.generate_response("Hello"))["provider"] == "gemini"
+
+@pytest.mark.asyncio
+async def test_unhealthy_provider_is_probed_after_interval():
+    """Test that an unhealthy provider gets a probe request once the probe interval passes"""
+    flaky = StandInProvider("flaky")
+    other = StandInProvider("other")
+    router = LLMRouter([flaky, other], probe_interval=0)
+    router.stats_by_provider["flaky"].record(False)
+
+    assert router.route()[0] is flaky
+    await router.generate_response("Hello")
+    assert flaky.calls == 1
+
+@pytest.mark.asyncio
+async def test_all_providers_failed():
+    """Test that an error is raised when the cloud and local providers all fail"""
+    router = LLMRouter([StandInProvider("a", fail=True)], local_fallback=StandInProvider("local", fail=True))
+    with pytest.raises(AllProvidersFailedError):
+        await router.generate_response("Hello")
+
+@pytest.mark.asyncio
+async def test_stream_fails_over_before_first_chunk():
+    """Test that streams switch providers only before any chunk was sent"""
+    router = LLMRouter([StandInProvider("down", fail=True)], local_fallback=StandInProvider("local"))
+    chunks = [chunk async for chunk in router.stream_response("Hello")]
+    assert chunks == ["local: Hello"]
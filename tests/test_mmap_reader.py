@@ -0,0 +1,58 @@
+import pytest
+
+from utils.file_handler import FileHandler
+from utils.mmap_reader import MappedTextReader, LINE_INDEX_STRIDE
+
+@pytest.fixture
+def text_file(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_text("".join(f"line {n} – ünïcode\n" for n in range(3 * LINE_INDEX_STRIDE + 10)), encoding="utf-8")
+    return path
+
+def test_read_lines_uses_sparse_index(text_file):
+    """Test that line ranges are exact, including across index checkpoints and past the end"""
+    reader = MappedTextReader()
+    assert reader.read_lines(str(text_file), 0, 2) == "line 0 – ünïcode\nline 1 – ünïcode\n"
+    lines = reader.read_lines(str(text_file), LINE_INDEX_STRIDE - 1, LINE_INDEX_STRIDE + 1).splitlines()
+    assert lines == [f"line {LINE_INDEX_STRIDE - 1} – ünïcode", f"line {LINE_INDEX_STRIDE} – ünïcode"]
+    assert reader.read_lines(str(text_file), 3 * LINE_INDEX_STRIDE + 9, 10**9) == f"line {3 * LINE_INDEX_STRIDE + 9} – ünïcode\n"
+    assert reader.read_lines(str(text_file), 10**9) == ""
+
+def test_byte_range_aligns_to_character_boundaries(tmp_path):
+    """Test that a byte range starting inside a multi-byte character skips to the next character"""
+    path = tmp_path / "utf8.txt"
+    path.write_text("aü€b", encoding="utf-8")  # a=1 byte, ü=2, €=3, b=1
+    reader = MappedTextReader()
+    assert reader.read_bytes(str(path), 2) == "€b"
+    # A character belongs to the range its first byte is in, so adjacent ranges never overlap
+    assert reader.read_bytes(str(path), 0, 4) == "aü€"
+    assert reader.read_bytes(str(path), 4) == "b"
+
+def test_chunks_decode_split_characters(text_file):
+    """Test that chunk boundaries inside multi-byte characters do not corrupt text"""
+    reader = MappedTextReader()
+    chunks = list(reader.iter_chunks(str(text_file), chunk_size=7))
+    assert "".join(chunks) == text_file.read_text(encoding="utf-8")
+    assert "�" not in "".join(chunks)
+
+def test_empty_file(tmp_path):
+    """Test that empty files read as empty text"""
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    reader = MappedTextReader()
+    assert reader.read_bytes(str(path)) == ""
+    assert reader.read_lines(str(path), 0, 5) == ""
+    assert list(reader.iter_chunks(str(path))) == []
+
+@pytest.mark.asyncio
+async def test_file_handler_range_reads(text_file):
+    """Test the async FileHandler range and chunk APIs"""
+    handler = FileHandler(data_dir=str(text_file.parent))
+    try:
+        assert await handler.read_file_lines("log.txt", 5, 6) == "line 5 – ünïcode\n"
+        assert await handler.read_file_range("log.txt", 0, 6) == "line 0"
+        chunks = [chunk async for chunk in handler.iter_file_chunks("log.txt", chunk_size=4096)]
+        assert "".join(chunks) == await handler.read_file("log.txt")
+        assert await handler.read_file_lines("missing.txt") is None
+    finally:
+        handler.close()
@@ -0,0 +1,68 @@
+import pytest
+import asyncio
+import fitz
+
+from utils.file_handler import FileHandler
+from utils.pdf_extractor import PdfExtractor
+
+def make_pdf(path, pages):
+    doc = fitz.open()
+    for number in range(pages):
+        doc.new_page().insert_text((72, 72), f"Page {number} text")
+    doc.save(str(path))
+    doc.close()
+
+@pytest.fixture
+def handler(tmp_path):
+    make_pdf(tmp_path / "doc.pdf", 20)
+    handler = FileHandler(data_dir=str(tmp_path), pdf_extractor=PdfExtractor(max_workers=2, pages_per_task=3, min_pages_for_pool=5))
+    yield handler
+    handler.close()
+
+@pytest.mark.asyncio
+async def test_read_pdf_joins_pages_in_order(handler):
+    """Test that pages extracted across worker processes come back in page order"""
+    text = await handler.read_pdf("doc.pdf")
+    pages = text.split("\f")
+    assert len(pages) == 20
+    assert all(f"Page {number} text" in page for number, page in enumerate(pages))
+
+@pytest.mark.asyncio
+async def test_read_pdf_page_range(handler):
+    """Test that a page range returns only those pages and is clamped to the document"""
+    text = await handler.read_pdf("doc.pdf", start_page=18, end_page=50)
+    pages = text.split("\f")
+    assert len(pages) == 2
+    assert "Page 18 text" in pages[0]
+
+@pytest.mark.asyncio
+async def test_iter_pdf_pages_streams_in_order(handler):
+    """Test that the page iterator yields every page in order"""
+    pages = [page async for page in handler.iter_pdf_pages("doc.pdf", start_page=2)]
+    assert len(pages) == 18
+    assert "Page 2 text" in pages[0] and "Page 19 text" in pages[-1]
+
+@pytest.mark.asyncio
+async def test_read_pdf_does_not_block_event_loop(tmp_path):
+    """Test that other coroutines keep running while a PDF is extracted"""
+    make_pdf(tmp_path / "small.pdf", 3)
+    handler = FileHandler(data_dir=str(tmp_path))
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    task = asyncio.create_task(ticker())
+    text = await handler.read_pdf("small.pdf")
+    task.cancel()
+    assert text.count("\f") == 2
+    assert ticks > 1
+
+@pytest.mark.asyncio
+async def test_read_pdf_rejects_non_pdf(handler, tmp_path):
+    """Test that non-PDF files are not handed to the extractor"""
+    (tmp_path / "notes.txt").write_text("hello")
+    assert await handler.read_pdf("notes.txt") is None
@@ -0,0 +1,90 @@
+import pytest
+import asyncio
+import time
+import httpx
+
+from utils.gemini_client import GeminiClient
+from utils.quota_pacer import QuotaPacer, TokenBucket
+from utils.resilience import ResilientTransport, RetryPolicy
+
+def test_parse_retry_after_header():
+    """Test that numeric Retry-After headers are honoured"""
+    response = httpx.Response(429, headers={"Retry-After": "7"})
+    assert QuotaPacer.parse_retry_delay(response) == 7.0
+
+def test_parse_retry_info_detail():
+    """Test that google.rpc.RetryInfo details are used when there is no header"""
+    response = httpx.Response(429, json={"error": {"code": 429, "details": [
+        {"@type": "type.googleapis.com/google.rpc.QuotaFailure",
+         "violations": [{"quotaMetric": "generativelanguage.googleapis.com/generate_content_free_tier_requests"}]},
+        {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "12.5s"},
+    ]}})
+    assert QuotaPacer.parse_retry_delay(response) == 12.5
+    assert QuotaPacer.parse_retry_delay(httpx.Response(429, text="slow down")) is None
+
+def test_token_bucket_delay_and_debt():
+    """Test that the bucket reports refill delays and carries debt from under-estimates"""
+    bucket = TokenBucket(capacity=60, per_second=1)
+    assert bucket.delay_for(60) == 0
+    bucket.take(60)
+    assert bucket.delay_for(1) == pytest.approx(1, abs=0.05)
+    bucket.take(10)
+    assert bucket.delay_for(1) == pytest.approx(11, abs=0.05)
+
+@pytest.mark.asyncio
+async def test_acquire_paces_when_rpm_exhausted(monkeypatch):
+    """Test that callers wait instead of exceeding the requests-per-minute budget"""
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        pacer.requests.level += delay * pacer.requests.per_second
+
+    pacer = QuotaPacer(rpm=2)
+    monkeypatch.setattr("utils.quota_pacer.asyncio.sleep", fake_sleep)
+
+    await pacer.acquire(10)
+    await pacer.acquire(10)
+    assert sleeps == []
+    await pacer.acquire(10)
+    assert len(sleeps) == 1
+    assert sleeps[0] == pytest.approx(30, abs=0.1)
+    assert pacer.stats()["paced"] == 1
+
+@pytest.mark.asyncio
+async def test_reconcile_adjusts_token_budget():
+    """Test that actual usage replaces the up-front estimate"""
+    pacer = QuotaPacer(tpm=1000)
+    await pacer.acquire(100)
+    pacer.reconcile(100, 400)
+    assert pacer.tokens.level == pytest.approx(600, abs=1)
+    pacer.reconcile(400, 100)
+    assert pacer.tokens.level == pytest.approx(900, abs=1)
+
+@pytest.mark.asyncio
+async def test_gemini_client_pauses_after_throttle_and_reports_usage(monkeypatch):
+    """Test that a 429 with Retry-After pauses the next attempt and usageMetadata is returned"""
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "test-key-1234")
+    client = GeminiClient()
+    client.transport = ResilientTransport(retry_policy=RetryPolicy(max_attempts=2, base_delay=0))
+    client.pacer = QuotaPacer(rpm=100, tpm=100000)
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0.2"}, json={"error": {"code": 429}}),
+        httpx.Response(200, json={
+            "candidates": [{"content": {"parts": [{"text": "done"}]}}],
+            "usageMetadata": {"promptTokenCount": 5, "candidatesTokenCount": 1, "totalTokenCount": 6},
+        }),
+    ]
+    sent_at = []
+
+    def handler(request):
+        sent_at.append(time.monotonic())
+        return responses[len(sent_at) - 1]
+
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    response = await client.generate_response("Hello")
+
+    assert response["content"] == "done"
+    assert response["usage"] == {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6}
+    assert sent_at[1] - sent_at[0] >= 0.19
+    assert client.pacer.stats()["throttled"] == 1
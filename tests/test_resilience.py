@@ -0,0 +1,197 @@
+import pytest
+import asyncio
+import httpx
+
+from utils.gemini_client import GeminiClient
+from utils.resilience import (
+    ResilientTransport, RetryPolicy, CircuitBreaker, CircuitOpenError, LatencyTracker
+)
+
+def gemini_ok(text="ok"):
+    return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+class FakeGemini:
+    """Local stand-in for the Gemini HTTP API that replays scripted behaviours"""
+
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.calls = 0
+
+    async def handler(self, request):
+        behaviour = self.behaviours[min(self.calls, len(self.behaviours) - 1)]
+        self.calls += 1
+        return await behaviour(request)
+
+def status(code):
+    async def respond(request):
+        return httpx.Response(code, json={"error": {"code": code}})
+    return respond
+
+def ok(text="ok", delay=0.0):
+    async def respond(request):
+        await asyncio.sleep(delay)
+        return gemini_ok(text)
+    return respond
+
+def timeout():
+    async def respond(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+    return respond
+
+@pytest.fixture
+def gemini_client(monkeypatch):
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "test-key-1234")
+    client = GeminiClient()
+    client.transport = ResilientTransport(
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=0),
+        breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60),
+    )
+    return client
+
+def use_fake(client, fake):
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors(gemini_client):
+    """Test that 503s and timeouts are retried until a success"""
+    fake = FakeGemini(status(503), timeout(), ok("recovered"))
+    use_fake(gemini_client, fake)
+
+    response = await gemini_client.generate_response("Hello")
+
+    assert response["content"] == "recovered"
+    assert fake.calls == 3
+    assert gemini_client.transport.counters["retries"] == 2
+    assert gemini_client.transport.breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(gemini_client):
+    """Test that non-retryable statuses fail immediately"""
+    fake = FakeGemini(status(400))
+    use_fake(gemini_client, fake)
+
+    with pytest.raises(Exception):
+        await gemini_client.generate_response("Hello")
+    assert fake.calls == 1
+
+@pytest.mark.asyncio
+async def test_circuit_opens_and_fails_fast(gemini_client):
+    """Test that repeated failures open the circuit and later calls skip the network"""
+    fake = FakeGemini(status(500))
+    use_fake(gemini_client, fake)
+
+    with pytest.raises(Exception):
+        await gemini_client.generate_response("Hello")
+    assert gemini_client.transport.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await gemini_client.generate_response("Hello again")
+    assert fake.calls == 3
+
+def test_circuit_half_open_probe():
+    """Test that the breaker lets one probe through after the reset timeout"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    breaker.before_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_is_released(gemini_client):
+    """Test that cancelling the half-open probe lets the next request probe again"""
+    breaker = gemini_client.transport.breaker
+    breaker.reset_timeout = 0
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    fake = FakeGemini(ok("stuck", delay=5), ok("recovered"))
+    use_fake(gemini_client, fake)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(gemini_client.generate_response("Hello"), timeout=0.05)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    response = await gemini_client.generate_response("Hello again")
+    assert response["content"] == "recovered"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.asyncio
+async def test_cancelled_stream_probe_is_released(gemini_client):
+    """Test that a stream cancelled while half-open does not leave the probe claimed"""
+    breaker = gemini_client.transport.breaker
+    breaker.reset_timeout = 0
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    use_fake(gemini_client, FakeGemini(ok("stuck", delay=5)))
+
+    async def consume():
+        async for _ in gemini_client.stream_response("Hello"):
+            pass
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(consume(), timeout=0.05)
+    breaker.before_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_over_slow_primary():
+    """Test that a slow primary is raced by a hedge after the p95 delay"""
+    latency = LatencyTracker(min_samples=5)
+    for _ in range(5):
+        latency.record(0.01)
+    transport = ResilientTransport(retry_policy=RetryPolicy(base_delay=0), hedge=True, latency=latency)
+    fake = FakeGemini(ok("slow", delay=5), ok("fast"))
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+
+    response = await asyncio.wait_for(transport.request(lambda: client.post("https://fake/gemini")), timeout=2)
+
+    assert response.json()["candidates"][0]["content"]["parts"][0]["text"] == "fast"
+    assert transport.counters["hedges"] == 1
+    assert transport.counters["hedge_wins"] == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_cancels_hedged_requests():
+    """Test that cancelling the caller while it waits on the primary or the hedge cancels both"""
+    latency = LatencyTracker(min_samples=5)
+    for _ in range(5):
+        latency.record(0.02)
+    transport = ResilientTransport(retry_policy=RetryPolicy(base_delay=0), hedge=True, latency=latency)
+    started, cancelled = [], []
+
+    async def send():
+        started.append(True)
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return gemini_ok()
+
+    # Before the hedge delay: only the primary is in flight
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(transport.request(send), timeout=0.01)
+    await asyncio.sleep(0)
+    assert (len(started), len(cancelled)) == (1, 1)
+
+    # After it: the primary and the hedge are both in flight
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(transport.request(send), timeout=0.1)
+    await asyncio.sleep(0)
+    assert (len(started), len(cancelled)) == (3, 3)
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_latency_history():
+    """Test that hedging waits for enough samples to estimate the p95"""
+    transport = ResilientTransport(retry_policy=RetryPolicy(base_delay=0), hedge=True)
+    fake = FakeGemini(ok("only"))
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+
+    await transport.request(lambda: client.post("https://fake/gemini"))
+
+    assert fake.calls == 1
+    assert transport.counters["hedges"] == 0
@@ -0,0 +1,107 @@
+import pytest
+import asyncio
+
+from utils.single_flight import SingleFlightClient
+
+class SlowClient:
+    """Fake upstream that blocks until released and counts calls"""
+    model = "slow-model"
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def generate_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if prompt == "fail":
+            raise RuntimeError("upstream failed")
+        return {"content": f"echo: {prompt}", "model": self.model}
+
+    async def close(self):
+        pass
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_upstream_call():
+    """Test that concurrent identical requests are coalesced"""
+    upstream = SlowClient()
+    client = SingleFlightClient(upstream)
+
+    waiters = [asyncio.create_task(client.generate_response("Summarize this", temperature=0.3)) for _ in range(5)]
+    # Whitespace differences normalize to the same request
+    waiters.append(asyncio.create_task(client.generate_response("  Summarize this\n", temperature=0.3)))
+    await asyncio.sleep(0)
+    upstream.release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert upstream.calls == 1
+    assert all(result["content"] == "echo: Summarize this" for result in results)
+    # Each waiter gets its own dict
+    assert len({id(result) for result in results}) == len(results)
+    assert client.stats() == {"upstream_calls": 1, "coalesced": 5, "abandoned": 0, "inflight": 0}
+
+@pytest.mark.asyncio
+async def test_different_requests_are_not_coalesced():
+    """Test that requests differing in parameters go upstream separately"""
+    upstream = SlowClient()
+    upstream.release.set()
+    client = SingleFlightClient(upstream)
+
+    await asyncio.gather(
+        client.generate_response("Hello", temperature=0.3),
+        client.generate_response("Hello", temperature=0.7),
+    )
+    assert upstream.calls == 2
+
+@pytest.mark.asyncio
+async def test_errors_fan_out_to_all_waiters():
+    """Test that an upstream exception is raised in every waiter"""
+    upstream = SlowClient()
+    client = SingleFlightClient(upstream)
+
+    waiters = [asyncio.create_task(client.generate_response("fail")) for _ in range(3)]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert upstream.calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+@pytest.mark.asyncio
+async def test_cancelling_one_waiter_keeps_upstream_call_alive():
+    """Test that a cancelled waiter does not cancel the shared call for the others"""
+    upstream = SlowClient()
+    client = SingleFlightClient(upstream)
+
+    first = asyncio.create_task(client.generate_response("Hello"))
+    second = asyncio.create_task(client.generate_response("Hello"))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    upstream.release.set()
+
+    assert (await second)["content"] == "echo: Hello"
+    assert first.cancelled()
+    assert upstream.cancelled == 0
+
+@pytest.mark.asyncio
+async def test_cancelling_all_waiters_cancels_upstream_call():
+    """Test that the upstream call is cancelled once nobody is waiting for it"""
+    upstream = SlowClient()
+    client = SingleFlightClient(upstream)
+
+    waiters = [asyncio.create_task(client.generate_response("Hello")) for _ in range(2)]
+    await asyncio.sleep(0)
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert upstream.cancelled == 1
+    assert client.stats()["abandoned"] == 1
+    assert client.stats()["inflight"] == 0
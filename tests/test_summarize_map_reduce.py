@@ -0,0 +1,141 @@
+import pytest
+import asyncio
+
+from services.summarize import SummarizeService, SINGLE_PASS_MAX_CHARS
+from utils.text_chunker import split_into_chunks
+from utils.summary_store import ChunkSummaryStore
+from utils.file_handler import FileHandler
+
+class RecordingClient:
+    """Stand-in LLM client that returns a short summary and tracks concurrency"""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024):
+        self.calls.append((prompt, system_prompt))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        return {"content": f"summary of {len(prompt)} chars", "usage": {}}
+
+    async def stream_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024):
+        response = await self.generate_response(prompt, system_prompt, temperature, max_tokens)
+        yield response["content"]
+
+def test_split_into_chunks_is_stable_under_edits():
+    """Test that editing one paragraph changes only the chunks around it"""
+    paragraphs = [f"Paragraph {i}. " + "word " * (20 + i % 50) for i in range(300)]
+    before = split_into_chunks("\n\n".join(paragraphs), max_tokens=500)
+    paragraphs[150] += " An inserted sentence."
+    after = split_into_chunks("\n\n".join(paragraphs), max_tokens=500)
+    assert all(len(chunk) <= 2000 for chunk in before)
+    assert len(set(after) - set(before)) <= 3
+
+def test_split_into_chunks_hard_splits_oversized_paragraph():
+    """Test that a paragraph without sentence breaks is still split"""
+    chunks = split_into_chunks("x" * 1000, max_tokens=50)
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert "".join(chunks) == "x" * 1000
+
+@pytest.mark.asyncio
+async def test_short_text_uses_single_call():
+    """Test that text under the single-pass limit is summarized in one call"""
+    client = RecordingClient()
+    service = SummarizeService(client)
+    response = await service.process("A short but valid piece of text to summarize.")
+    assert len(client.calls) == 1
+    assert "map_reduce" not in response["metadata"]
+
+@pytest.mark.asyncio
+async def test_long_text_is_map_reduced():
+    """Test that long text is chunked, summarized in parallel and reduced in a final call"""
+    client = RecordingClient()
+    service = SummarizeService(client, chunk_tokens=500, max_parallel_chunks=3)
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * 300 for i in range(40))
+    assert len(text) > SINGLE_PASS_MAX_CHARS
+
+    response = await service.process(text)
+
+    stats = response["metadata"]["map_reduce"]
+    assert stats["chunks"] > 1
+    assert stats["depth"] == 1
+    # One call per chunk plus the final reduce
+    assert len(client.calls) == stats["chunks"] + 1
+    assert client.max_in_flight <= 3
+    assert "consecutive sections" in client.calls[-1][1]
+
+@pytest.mark.asyncio
+async def test_stream_map_reduces_before_streaming():
+    """Test that streaming a long text streams only the final reduce"""
+    client = RecordingClient()
+    service = SummarizeService(client, chunk_tokens=500)
+    text = "\n\n".join("word " * 300 for _ in range(40))
+    chunks = [chunk async for chunk in service.stream(text)]
+    assert len(chunks) == 1
+    assert len(client.calls) > 2
+
+@pytest.mark.asyncio
+async def test_resummarizing_edited_document_reuses_chunk_summaries(tmp_path):
+    """Test that only changed chunks are sent to the LLM on re-summarization"""
+    client = RecordingClient()
+    store = ChunkSummaryStore(db_path=str(tmp_path / "summaries.db"))
+    service = SummarizeService(client, chunk_tokens=500, summary_store=store)
+    paragraphs = [f"Paragraph {i}. " + "word " * (40 + i % 30) for i in range(200)]
+
+    first = await service.process("\n\n".join(paragraphs))
+    calls_first = len(client.calls)
+    paragraphs[100] += " A late edit."
+    second = await service.process("\n\n".join(paragraphs))
+    calls_second = len(client.calls) - calls_first
+
+    stats = second["metadata"]["map_reduce"]
+    assert first["metadata"]["map_reduce"]["reused_chunks"] == 0
+    assert stats["reused_chunks"] >= stats["chunks"] - 2
+    assert calls_second <= 3
+
+@pytest.mark.asyncio
+async def test_fallback_chunk_summaries_are_not_stored(tmp_path):
+    """Test that partials produced by the local fallback model are not reused later"""
+    client = RecordingClient()
+    respond = client.generate_response
+    async def from_fallback(*args, **kwargs):
+        return {**await respond(*args, **kwargs), "provider": "local", "fallback": True}
+    client.generate_response = from_fallback
+    store = ChunkSummaryStore(db_path=str(tmp_path / "summaries.db"))
+    service = SummarizeService(client, chunk_tokens=500, summary_store=store)
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * 60 for i in range(100))
+
+    await service.process(text)
+    client.generate_response = respond
+    response = await service.process(text)
+    assert response["metadata"]["map_reduce"]["reused_chunks"] == 0
+
+@pytest.mark.asyncio
+async def test_chunk_summaries_are_keyed_by_format(tmp_path):
+    """Test that a different summary format does not reuse paragraph-format partials"""
+    client = RecordingClient()
+    store = ChunkSummaryStore(db_path=str(tmp_path / "summaries.db"))
+    service = SummarizeService(client, chunk_tokens=500, summary_store=store)
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * 60 for i in range(100))
+
+    await service.process(text)
+    response = await service.process(text, parameters={"format": "bullets"})
+    assert response["metadata"]["map_reduce"]["reused_chunks"] == 0
+
+@pytest.mark.asyncio
+async def test_summarize_file_line_range(tmp_path):
+    """Test that start_line/end_line summarize only that slice of a text file"""
+    (tmp_path / "server.log").write_text("".join(f"request {n} handled in {n}ms\n" for n in range(1000)))
+    handler = FileHandler(data_dir=str(tmp_path))
+    client = RecordingClient()
+    service = SummarizeService(client, handler)
+
+    response = await service.process(parameters={"filename": "server.log", "start_line": 10, "end_line": 12})
+    handler.close()
+
+    assert client.calls[0][0] == "request 10 handled in 10ms\nrequest 11 handled in 11ms\n"
+    assert response["metadata"]["line_range"] == [10, 12]
@@ -0,0 +1,82 @@
+import pytest
+from datetime import datetime, timezone
+
+from conftest import CountingStore
+from services.todo_manager import TodoManager
+
+@pytest.mark.asyncio
+async def test_bulk_operations_apply_in_order(manager):
+    """Test that later operations see the effects of earlier ones in the same batch"""
+    await manager.add_task("alice", "Existing task")
+    response = await manager.bulk_update("alice", [
+        {"op": "add", "title": "Plan sprint #work !high"},
+        {"op": "add", "title": "Book flights"},
+        {"op": "complete", "id": 2},
+        {"op": "update", "id": 3, "title": "Book trains #travel"},
+        {"op": "delete", "id": 1},
+    ])
+    assert response["success"] is True
+    assert [result["success"] for result in response["results"]] == [True] * 5
+    assert response["results"][0]["task"]["tags"] == ["work"]
+
+    tasks = {task["id"]: task for task in manager.get_tasks("alice")}
+    assert sorted(tasks) == [2, 3]
+    assert tasks[2]["completed"] is True
+    assert tasks[3]["title"] == "Book trains #travel"
+    assert tasks[3]["tags"] == ["travel"]
+
+@pytest.mark.asyncio
+async def test_invalid_operation_rejects_whole_batch(manager):
+    """Test that one invalid operation leaves the list untouched and is reported"""
+    await manager.add_task("alice", "Existing task")
+    response = await manager.bulk_update("alice", [
+        {"op": "add", "title": "New task"},
+        {"op": "add", "title": "existing TASK"},
+        {"op": "complete", "id": 42},
+        {"op": "add", "title": "  "},
+    ])
+    assert response["success"] is False
+    errors = [result.get("error") for result in response["results"]]
+    assert errors == [None, "Duplicate task title.", "Task not found.", "Task title cannot be empty."]
+    listing = await manager.query_tasks("alice")
+    assert [task["title"] for task in listing["tasks"]] == ["Existing task"]
+
+@pytest.mark.asyncio
+async def test_update_task(manager):
+    """Test that update_task renames a task and rejects unknown IDs"""
+    await manager.add_task("alice", "Draft memo")
+    updated = await manager.update_task("alice", 1, "Send memo !high")
+    assert updated["success"] is True
+    assert updated["task"]["priority"] == "high"
+    assert (await manager.update_task("alice", 7, "Anything")) == {"success": False, "error": "Task not found."}
+
+@pytest.mark.parametrize("cache", [True, False])
+@pytest.mark.asyncio
+async def test_bulk_import_is_one_write(tmp_path, cache):
+    """Test that importing 500 tasks costs a single storage write"""
+    manager = TodoManager(base_dir=str(tmp_path / "todos"), cache=cache)
+    manager.store = store = CountingStore(str(tmp_path / "todos" / "counted.db"))
+    manager.backend.store = store
+    response = await manager.bulk_update("alice", [{"op": "add", "title": f"Imported task {i}"} for i in range(500)])
+    await manager.close()
+
+    assert response["success"] is True
+    assert store.writes == 1
+    assert len(store.load_tasks("alice")) == 500
+
+@pytest.mark.asyncio
+async def test_aware_due_dates_are_stored_as_local_time(manager):
+    """Test that timezone-aware due dates are stored naive in local time and stay schedulable"""
+    due = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    local = due.astimezone().replace(tzinfo=None).isoformat()
+    response = await manager.bulk_update("alice", [
+        {"op": "add", "title": "From an API client", "due_date": "2030-01-01T00:00:00Z"},
+        {"op": "add", "title": "Reschedule me"},
+        {"op": "update", "id": 2, "due_date": due},
+    ])
+    assert response["success"] is True
+    assert [task["due_date"] for task in manager.get_tasks("alice")] == [local, local]
+    assert manager.scheduler.seconds_until_next() is not None
+
+    response = await manager.bulk_update("alice", [{"op": "update", "id": 1, "due_date": "next tuesday"}])
+    assert response["results"][0]["error"] == "Invalid due date."
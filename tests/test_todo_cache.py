@@ -0,0 +1,110 @@
+import pytest
+import asyncio
+
+from conftest import CountingStore, make_task
+from services.todo_manager import TodoManager
+from utils.todo_cache import WriteBackTodoCache
+
+@pytest.mark.asyncio
+async def test_concurrent_adds_get_unique_ids(tmp_path):
+    """Test that concurrent adds for one user are serialized and get distinct IDs"""
+    cache = WriteBackTodoCache(CountingStore(str(tmp_path / "todos.db")), flush_delay=0.01)
+    tasks = await asyncio.gather(*(cache.add_task("alice", make_task(f"task {i}")) for i in range(50)))
+    assert sorted(task["id"] for task in tasks) == list(range(1, 51))
+    await cache.close()
+    assert sorted(cache.store.load_tasks("alice")) == list(range(1, 51))
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_adds_store_one_task(tmp_path):
+    """Test that the title check and the insert happen under one lock"""
+    manager = TodoManager(base_dir=str(tmp_path / "todos"), cache=True)
+    results = await asyncio.gather(*(manager.add_task("alice", "Buy milk") for _ in range(3)))
+    assert sorted(result["success"] for result in results) == [False, False, True]
+    assert len(await manager.backend.load_tasks("alice")) == 1
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_burst_is_flushed_as_one_batch(tmp_path):
+    """Test that a burst of mutations is written back in a single batch after the delay"""
+    store = CountingStore(str(tmp_path / "todos.db"))
+    cache = WriteBackTodoCache(store, flush_delay=0.05)
+    for i in range(10):
+        await cache.add_task("alice", make_task(f"task {i}"))
+    await cache.set_completed("alice", 3)
+    await cache.delete_task("alice", 4)
+    assert store.batches == []
+
+    await asyncio.sleep(0.2)
+    assert store.batches == [("alice", 9, 1)]
+    persisted = store.load_tasks("alice")
+    assert 4 not in persisted
+    assert persisted[3]["completed"] is True
+
+@pytest.mark.asyncio
+async def test_reads_are_served_from_memory(tmp_path):
+    """Test that a user's tasks are loaded from the engine only once"""
+    store = CountingStore(str(tmp_path / "todos.db"))
+    cache = WriteBackTodoCache(store)
+    await cache.add_task("alice", make_task("one"))
+    for _ in range(5):
+        assert len(await cache.load_tasks("alice")) == 1
+    assert await cache.add_task("alice", make_task(" ONE ")) is None
+    assert store.loads == 1
+    await cache.close()
+
+@pytest.mark.asyncio
+async def test_only_clean_users_are_evicted(tmp_path):
+    """Test that LRU eviction skips users with unflushed changes"""
+    store = CountingStore(str(tmp_path / "todos.db"))
+    cache = WriteBackTodoCache(store, flush_delay=60, max_users=2)
+    await cache.add_task("alice", make_task("pending write"))
+    await cache.load_tasks("bob")
+    await cache.load_tasks("carol")
+    assert cache.peek("alice") is not None
+    assert cache.peek("bob") is None
+    assert cache.stats()["evictions"] == 1
+    await cache.close()
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_changes(tmp_path):
+    """Test that closing the manager writes back changes before the flush delay"""
+    manager = TodoManager(base_dir=str(tmp_path / "todos"), cache=True, flush_delay=60)
+    await manager.add_task("alice", "Buy milk")
+    await manager.add_task("alice", "Call mom")
+    await manager.close()
+
+    reopened = TodoManager(base_dir=str(tmp_path / "todos"), cache=False)
+    assert [task["title"] for task in reopened.get_tasks("alice")] == ["Buy milk", "Call mom"]
+
+@pytest.mark.parametrize("storage", ["sqlite", "json", "journal"])
+@pytest.mark.parametrize("cache", [True, False])
+@pytest.mark.asyncio
+async def test_ids_are_not_reused_after_delete(tmp_path, cache, storage):
+    """Test that deleting the newest task does not free its ID, even across restarts"""
+    manager = TodoManager(base_dir=str(tmp_path / "todos"), storage=storage, cache=cache)
+    await manager.add_task("alice", "First")
+    await manager.add_task("alice", "Second")
+    await manager.delete_task("alice", 2)
+    assert (await manager.add_task("alice", "Third"))["task"]["id"] == 3
+    await manager.delete_task("alice", 3)
+    await manager.close()
+
+    reopened = TodoManager(base_dir=str(tmp_path / "todos"), storage=storage, cache=cache)
+    assert (await reopened.add_task("alice", "Fourth"))["task"]["id"] == 4
+    bulk = await reopened.bulk_update("alice", [{"op": "add", "title": "Fifth"}])
+    assert bulk["results"][0]["task"]["id"] == 5
+    await reopened.close()
+
+@pytest.mark.asyncio
+async def test_title_index_follows_updates_and_deletes(tmp_path):
+    """Test that renamed and deleted titles become available again"""
+    cache = WriteBackTodoCache(CountingStore(str(tmp_path / "todos.db")))
+    await cache.add_task("alice", make_task("Draft"))
+    await cache.add_task("alice", make_task("Review"))
+    await cache.transact("alice", lambda tasks, next_id: ([{**tasks[1], "title": "Final"}], [], None))
+    await cache.delete_task("alice", 2)
+
+    assert await cache.add_task("alice", make_task("draft")) is not None
+    assert await cache.add_task("alice", make_task(" FINAL ")) is None
+    assert await cache.add_task("alice", make_task("Review")) is not None
+    await cache.close()
@@ -0,0 +1,93 @@
+import pytest
+import asyncio
+
+from utils.todo_feed import TodoChangeFeed
+
+async def take(events, count):
+    return [await events.__anext__() for _ in range(count)]
+
+@pytest.mark.asyncio
+async def test_resume_replays_missed_events():
+    """Test that resuming from a sequence number yields only the later events, then goes live"""
+    feed = TodoChangeFeed()
+    first = feed.publish("alice", "add", id=1)
+    feed.publish("alice", "add", id=2)
+    feed.publish("bob", "add", id=1)
+    feed.publish("alice", "delete", id=1)
+
+    events = feed.subscribe("alice", after=first["seq"])
+    replayed = await take(events, 3)
+    assert [(e["type"], e["id"]) for e in replayed[:2]] == [("add", 2), ("delete", 1)]
+    assert replayed[2] == {"seq": feed.latest_seq("alice"), "type": "ready"}
+    assert replayed[0]["seq"] < replayed[1]["seq"]
+
+    feed.publish("alice", "complete", id=2)
+    assert (await events.__anext__())["type"] == "complete"
+    await events.aclose()
+    assert feed.stats()["subscribers"] == 0
+
+@pytest.mark.asyncio
+async def test_lost_history_sends_reset():
+    """Test that a client resuming past the retained history, or from another run, is told to reload"""
+    feed = TodoChangeFeed(history_size=2)
+    first = feed.publish("alice", "add", id=1)
+    for task_id in (2, 3, 4):
+        feed.publish("alice", "add", id=task_id)
+
+    events = feed.subscribe("alice", after=first["seq"])
+    assert [e["type"] for e in await take(events, 2)] == ["reset", "ready"]
+    await events.aclose()
+
+    restarted = TodoChangeFeed()
+    assert restarted.latest_seq("alice") > feed.latest_seq("alice")
+    events = restarted.subscribe("alice", after=feed.latest_seq("alice"))
+    assert (await events.__anext__())["type"] == "reset"
+    await events.aclose()
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_reset():
+    """Test that a subscriber whose queue overflows gets a reset instead of unbounded buffering"""
+    feed = TodoChangeFeed(queue_size=2)
+    events = feed.subscribe("alice")
+    assert (await events.__anext__())["type"] == "ready"
+    for task_id in range(5):
+        feed.publish("alice", "add", id=task_id)
+    reset = await events.__anext__()
+    assert reset == {"seq": feed.latest_seq("alice"), "type": "reset"}
+
+    feed.publish("alice", "delete", id=0)
+    assert (await events.__anext__())["type"] == "delete"
+    await events.aclose()
+
+@pytest.mark.asyncio
+async def test_heartbeat_while_idle():
+    """Test that an idle subscription yields None at the heartbeat interval"""
+    feed = TodoChangeFeed()
+    events = feed.subscribe("alice", heartbeat=0.01)
+    assert (await events.__anext__())["type"] == "ready"
+    assert await asyncio.wait_for(events.__anext__(), 1) is None
+    await events.aclose()
+
+@pytest.mark.asyncio
+async def test_manager_publishes_changes(manager):
+    """Test that every todo mutation reaches the user's feed and list queries carry the feed position"""
+    events = manager.feed.subscribe("alice")
+    assert (await events.__anext__())["type"] == "ready"
+
+    await manager.add_task("alice", "Buy milk")
+    await manager.bulk_update("alice", [
+        {"op": "add", "title": "Call mom"},
+        {"op": "update", "id": 1, "title": "Buy oat milk"},
+        {"op": "complete", "id": 2},
+    ])
+    await manager.bulk_update("alice", [{"op": "delete", "id": 99}])
+    await manager.complete_task("alice", 1)
+    await manager.delete_task("alice", 2)
+
+    received = await take(events, 6)
+    assert [(e["type"], e["id"]) for e in received] == [
+        ("add", 1), ("add", 2), ("update", 1), ("complete", 2), ("complete", 1), ("delete", 2)
+    ]
+    assert received[2]["task"]["title"] == "Buy oat milk"
+    assert (await manager.query_tasks("alice"))["metadata"]["seq"] == received[-1]["seq"]
+    await events.aclose()
@@ -0,0 +1,125 @@
+import pytest
+from datetime import datetime, timedelta
+
+from utils.todo_query import TaskIndex, TaskQuery, sort_key
+from utils.todo_store import SqliteTodoStore
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+def make_tasks(count=60):
+    tasks = {}
+    for i in range(1, count + 1):
+        tasks[i] = {
+            "id": i,
+            "title": f"Task {i}",
+            "description": None,
+            "created_at": (NOW - timedelta(hours=i % 7)).isoformat(),
+            "due_date": (NOW + timedelta(hours=12 * (i % 9) - 30)).isoformat() if i % 3 else None,
+            "completed": i % 4 == 0,
+            "tags": ["work"] if i % 2 else ["home", "errand"] if i % 5 == 0 else [],
+            "priority": (None, "high", "medium", "low")[i % 4],
+        }
+    return tasks
+
+def brute_force(tasks, query):
+    matching = [task for task in tasks.values() if query.matches(task)]
+    return sorted(matching, key=lambda task: (sort_key(task, query.sort), task["id"]), reverse=query.descending)
+
+def read_all_pages(run_query, **filters):
+    ids, cursor = [], None
+    while True:
+        page = run_query(TaskQuery(limit=7, cursor=cursor, now=NOW, **filters))
+        assert len(page["tasks"]) <= 7
+        ids += [task["id"] for task in page["tasks"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+QUERIES = [
+    {},
+    {"completed": False},
+    {"tag": "work", "sort": "due_date"},
+    {"priority": "high", "descending": True},
+    {"status": "overdue", "sort": "due_date"},
+    {"status": "due_soon"},
+    {"status": "pending", "sort": "priority", "descending": True},
+    {"due_after": NOW, "due_before": NOW + timedelta(days=1), "sort": "due_date", "descending": True},
+    {"sort": "created_at", "tag": "home"},
+]
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = SqliteTodoStore(str(tmp_path / "todos.db"))
+    store.apply_changes("alice", list(make_tasks().values()), [])
+    store.apply_changes("bob", [{**make_tasks(1)[1], "tags": ["work"]}], [])
+    return store
+
+@pytest.mark.parametrize("filters", QUERIES)
+def test_index_pages_match_brute_force(filters):
+    """Test that paging through TaskIndex returns exactly the filtered, sorted tasks"""
+    tasks = make_tasks()
+    index = TaskIndex(tasks)
+    expected = [task["id"] for task in brute_force(tasks, TaskQuery(now=NOW, **filters))]
+    assert read_all_pages(index.query, **filters) == expected
+
+@pytest.mark.parametrize("filters", QUERIES)
+def test_sqlite_pages_match_brute_force(sqlite_store, filters):
+    """Test that the SQLite engine pages through the same tasks as the in-memory index"""
+    tasks = make_tasks()
+    expected = [task["id"] for task in brute_force(tasks, TaskQuery(now=NOW, **filters))]
+    assert read_all_pages(lambda query: sqlite_store.query_tasks("alice", query), **filters) == expected
+
+def test_index_follows_mutations():
+    """Test that add/remove keep the sorted orders and postings consistent"""
+    tasks = make_tasks()
+    index = TaskIndex(tasks)
+    index.query(TaskQuery(sort="due_date", now=NOW))
+    index.remove(tasks[5])
+    del tasks[5]
+    index.remove(tasks[7])
+    tasks[7] = {**tasks[7], "due_date": None, "tags": ["new"], "priority": "low"}
+    index.add(tasks[7])
+
+    for filters in QUERIES + [{"tag": "new"}, {"sort": "due_date"}]:
+        expected = [task["id"] for task in brute_force(tasks, TaskQuery(now=NOW, **filters))]
+        assert read_all_pages(index.query, **filters) == expected
+
+def test_sqlite_query_uses_user_index(sqlite_store):
+    """Test that a due-date page is answered from the per-user due-date index"""
+    query = TaskQuery(sort="due_date", limit=10, now=NOW)
+    with sqlite_store._connect() as conn:
+        plan = " ".join(str(row) for row in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE username = ? "
+            f"ORDER BY {sqlite_store._SORT_EXPRESSIONS['due_date']}, id LIMIT ?", ("alice", query.limit + 1)
+        ))
+    assert "idx_tasks_user_due_date" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_cursor_must_match_sort():
+    """Test that a cursor from one sort order is rejected for another"""
+    page = TaskIndex(make_tasks()).query(TaskQuery(limit=5, now=NOW))
+    with pytest.raises(ValueError):
+        TaskQuery(sort="due_date", cursor=page["next_cursor"])
+    with pytest.raises(ValueError):
+        TaskQuery(cursor="not-a-cursor")
+
+@pytest.mark.asyncio
+async def test_manager_query_tasks(manager):
+    """Test filtering and paging through TodoManager with each backend"""
+    for title in ["Pay rent #home !high", "Ship release #work !high", "Review PR #work !low", "Water plants #home"]:
+        await manager.add_task("alice", title)
+    await manager.complete_task("alice", 2)
+    # Queries see mutations made after the index was built
+    await manager.query_tasks("alice", tag="work")
+    await manager.delete_task("alice", 3)
+
+    work = await manager.query_tasks("alice", tag="work")
+    assert [task["id"] for task in work["tasks"]] == [2]
+    assert work["tasks"][0]["status"] == "completed"
+
+    first = await manager.query_tasks("alice", limit=2, sort="priority")
+    assert [task["id"] for task in first["tasks"]] == [1, 2]
+    second = await manager.query_tasks("alice", limit=2, sort="priority", cursor=first["next_cursor"])
+    assert [task["id"] for task in second["tasks"]] == [4]
+    assert second["next_cursor"] is None
+    assert second["content"] == "○ 4. Water plants #home"
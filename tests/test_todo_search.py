@@ -0,0 +1,106 @@
+import pytest
+import sqlite3
+
+from conftest import make_task
+from services.todo_manager import TodoManager
+from utils.todo_search import SearchUnavailableError, build_match_query
+from utils.todo_store import SqliteTodoStore
+
+@pytest.mark.asyncio
+async def test_search_ranks_and_highlights(sqlite_manager):
+    """Test that title matches outrank description matches and are highlighted"""
+    await sqlite_manager.bulk_update("alice", [
+        {"op": "add", "title": "Call the plumber", "description": "Ask about the quarterly budget"},
+        {"op": "add", "title": "Quarterly budget review #finance"},
+        {"op": "add", "title": "Water plants"},
+    ])
+    response = await sqlite_manager.search_tasks("alice", "budget")
+    ids = [result["task"]["id"] for result in response["results"]]
+    assert ids == [2, 1]
+    assert "<mark>budget</mark>" in response["results"][0]["snippet"].lower()
+    assert response["results"][0]["score"] > response["results"][1]["score"]
+    assert response["results"][0]["task"]["status"] == "pending"
+
+@pytest.mark.asyncio
+async def test_search_prefix_tags_and_user_isolation(sqlite_manager):
+    """Test prefix terms, tag matches and that users only see their own tasks"""
+    await sqlite_manager.add_task("alice", "Planning offsite #travel")
+    await sqlite_manager.add_task("bob", "Planning party")
+    assert [r["task"]["title"] for r in (await sqlite_manager.search_tasks("alice", "plan*"))["results"]] == ["Planning offsite #travel"]
+    assert (await sqlite_manager.search_tasks("alice", "plan"))["results"] == []
+    assert len((await sqlite_manager.search_tasks("alice", "travel"))["results"]) == 1
+    assert (await sqlite_manager.search_tasks("carol", "planning"))["results"] == []
+
+@pytest.mark.asyncio
+async def test_search_follows_mutations(sqlite_manager):
+    """Test that updates and deletes are reflected in search results straight away"""
+    await sqlite_manager.add_task("alice", "Renew passport")
+    await sqlite_manager.add_task("alice", "Renew car insurance")
+    await sqlite_manager.update_task("alice", 1, "Collect passport")
+    await sqlite_manager.delete_task("alice", 2)
+    assert (await sqlite_manager.search_tasks("alice", "renew"))["results"] == []
+    assert [r["task"]["id"] for r in (await sqlite_manager.search_tasks("alice", "collect"))["results"]] == [1]
+
+def test_match_query_quotes_user_input():
+    """Test that FTS5 operators and punctuation in the query are treated as plain words"""
+    match = build_match_query("alice", 'NOT "budget" OR (plan* -x')
+    assert match.endswith('("NOT" AND "budget" AND "OR" AND "plan"* AND "x")')
+    with pytest.raises(ValueError):
+        build_match_query("alice", "***")
+
+def test_existing_tasks_are_indexed(tmp_path):
+    """Test that a database created before search existed is indexed on open"""
+    db_path = tmp_path / "todos.db"
+    SqliteTodoStore(str(db_path)).apply_changes("alice", [{
+        "id": 1, "title": "Legacy task", "description": None, "created_at": "2024-01-01T00:00:00",
+        "due_date": None, "completed": False, "tags": ["old"], "priority": None,
+    }], [])
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("DROP TABLE tasks_fts")
+        for trigger in ("insert", "delete", "update"):
+            conn.execute(f"DROP TRIGGER tasks_fts_{trigger}")
+    conn.close()
+
+    results = SqliteTodoStore(str(db_path)).search_tasks("alice", "legacy")
+    assert [result["task"]["tags"] for result in results] == [["old"]]
+
+def test_search_survives_vacuum(tmp_path):
+    """Test that results still join to the right task after the tasks table's rowids are renumbered"""
+    db_path = tmp_path / "todos.db"
+    SqliteTodoStore(str(db_path)).apply_changes("alice", [{**make_task(f"Alice chore {i}"), "id": i} for i in range(1, 6)], [])
+    SqliteTodoStore(str(db_path)).apply_changes("bob", [{**make_task("Bob errand"), "id": 1}], [])
+    conn = sqlite3.connect(db_path)
+    with conn:
+        # Renumber rowids behind the triggers' back, as VACUUM may for a table without an INTEGER PRIMARY KEY
+        for trigger in ("insert", "delete", "update"):
+            conn.execute(f"DROP TRIGGER tasks_fts_{trigger}")
+        conn.execute("UPDATE tasks SET rowid = -rowid")
+        conn.execute("UPDATE tasks SET rowid = 7 + rowid")
+    conn.execute("VACUUM")
+    conn.close()
+
+    store = SqliteTodoStore(str(db_path))
+    store.apply_changes("alice", [], [1, 2, 3, 4])
+
+    assert [result["task"]["title"] for result in store.search_tasks("alice", "chore")] == ["Alice chore 5"]
+    assert [result["task"]["title"] for result in store.search_tasks("bob", "errand")] == ["Bob errand"]
+    store.apply_changes("bob", [{**make_task("Bob groceries"), "id": 1}], [])
+    assert store.search_tasks("bob", "errand") == []
+    assert [result["task"]["id"] for result in store.search_tasks("alice", "chore")] == [5]
+
+@pytest.mark.asyncio
+async def test_snippets_escape_task_text(sqlite_manager):
+    """Test that markup in task text is escaped while matches are still highlighted"""
+    await sqlite_manager.add_task("alice", "Fix <script>alert(1)</script> bug & retest")
+    snippet = (await sqlite_manager.search_tasks("alice", "script"))["results"][0]["snippet"]
+    assert "<script>" not in snippet
+    assert snippet == "Fix &lt;<mark>script</mark>&gt;alert(1)&lt;/<mark>script</mark>&gt; bug &amp; retest"
+
+@pytest.mark.asyncio
+async def test_search_needs_sqlite(tmp_path):
+    """Test that file-based storage reports search as unsupported"""
+    manager = TodoManager(base_dir=str(tmp_path / "todos"), storage="json")
+    with pytest.raises(SearchUnavailableError):
+        await manager.search_tasks("alice", "anything")
+    await manager.close()
@@ -0,0 +1,160 @@
+import pytest
+import asyncio
+import json
+
+from conftest import make_task
+from services.todo_manager import Task, TodoManager
+from utils.todo_store import JournalTodoStore, JsonTodoStore, SqliteTodoStore
+
+@pytest.mark.asyncio
+async def test_engines_behave_the_same(manager):
+    """Test add, duplicate detection, complete, delete and status with each engine"""
+    added = await manager.add_task("alice", "Write report #work !high tomorrow")
+    assert added["success"] is True
+    assert added["task"]["id"] == 1
+    assert added["task"]["tags"] == ["work"]
+    assert added["task"]["priority"] == "high"
+    assert (await manager.add_task("alice", "  write REPORT #work !high tomorrow "))["error"] == "Duplicate task title."
+    assert (await manager.add_task("alice", "Second"))["task"]["id"] == 2
+    assert (await manager.add_task("bob", "Second"))["task"]["id"] == 1
+
+    assert await manager.complete_task("alice", 1) == {"content": "Marked task 1 as completed"}
+    assert await manager.complete_task("alice", 9) == {"content": "Task 9 not found"}
+    statuses = {task["id"]: task["status"] for task in manager.get_tasks("alice")}
+    assert statuses == {1: "completed", 2: "pending"}
+
+    assert await manager.delete_task("alice", 2) == {"success": True}
+    assert (await manager.delete_task("alice", 2))["error"] == "Task not found."
+    listing = await manager.list_tasks("alice")
+    assert listing["content"] == "✓ 1. Write report #work !high tomorrow"
+    assert listing["metadata"]["task_count"] == 1
+
+@pytest.mark.parametrize("storage", ["sqlite", "json", "journal"])
+@pytest.mark.asyncio
+async def test_concurrent_adds_without_cache(tmp_path, storage):
+    """Test that concurrent duplicate adds store one task and concurrent distinct adds store all"""
+    manager = TodoManager(base_dir=str(tmp_path / "todos"), storage=storage, cache=False)
+    duplicates = await asyncio.gather(*(manager.add_task("alice", "Buy milk") for _ in range(3)))
+    assert sorted(result["success"] for result in duplicates) == [False, False, True]
+
+    distinct = await asyncio.gather(*(manager.add_task("alice", f"Task {i}") for i in range(5)))
+    assert all(result["success"] for result in distinct)
+    assert len(manager.get_tasks("alice")) == 6
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_json_files_are_migrated_to_sqlite(tmp_path):
+    """Test that existing per-user JSON files are imported once on startup"""
+    todo_dir = tmp_path / "todos"
+    json_manager = TodoManager(base_dir=str(todo_dir), storage="json")
+    await json_manager.add_task("carol", "Legacy task #old")
+    await json_manager.add_task("carol", "Done task")
+    await json_manager.complete_task("carol", 2)
+    await json_manager.close()
+
+    manager = TodoManager(base_dir=str(todo_dir), storage="sqlite")
+    tasks = {task["id"]: task for task in manager.get_tasks("carol")}
+    assert tasks[1]["title"] == "Legacy task #old"
+    assert tasks[1]["tags"] == ["old"]
+    assert tasks[2]["completed"] is True
+    assert (todo_dir / "carol.json.migrated").exists()
+    assert not (todo_dir / "carol.json").exists()
+
+    # Re-running the migration is a no-op
+    assert SqliteTodoStore(str(todo_dir / "todos.db")).import_json_dir(str(todo_dir)) == 0
+    assert (await manager.add_task("carol", "New task"))["task"]["id"] == 3
+    await manager.close()
+
+def test_sqlite_indexes_exist(tmp_path):
+    """Test that the lookup indexes are created"""
+    store = SqliteTodoStore(str(tmp_path / "todos.db"))
+    with store._connect() as conn:
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {
+        "idx_tasks_user_completed", "idx_tasks_user_title",
+        "idx_tasks_user_created_at", "idx_tasks_user_due_date", "idx_tasks_user_priority",
+    } <= indexes
+
+def test_journal_appends_one_record_per_mutation(tmp_path):
+    """Test that journal mutations append a record instead of rewriting the snapshot"""
+    store = JournalTodoStore(str(tmp_path / "journal"))
+    store.add_task("alice", make_task("one"))
+    store.add_task("alice", make_task("two"))
+    store.set_completed("alice", 1)
+    store.delete_task("alice", 2)
+    store.apply_changes("alice", [{**make_task("three"), "id": 3}], [])
+
+    log_file = tmp_path / "journal" / "alice.log"
+    assert len(log_file.read_bytes().splitlines()) == 5
+    assert not (tmp_path / "journal" / "alice.json").exists()
+    tasks = store.load_tasks("alice")
+    assert sorted(tasks) == [1, 3]
+    assert tasks[1]["completed"] is True
+    store.close()
+
+def test_journal_drops_torn_record(tmp_path):
+    """Test that a partially written last record is ignored and cut off"""
+    store = JournalTodoStore(str(tmp_path / "journal"))
+    store.add_task("alice", make_task("one"))
+    log_file = tmp_path / "journal" / "alice.log"
+    with open(log_file, "ab") as f:
+        f.write(b'{"op": "put", "task": {"id": 2, "tit')
+
+    assert sorted(store.load_tasks("alice")) == [1]
+    assert store.add_task("alice", make_task("two"))["id"] == 2
+    assert sorted(JournalTodoStore(str(tmp_path / "journal")).load_tasks("alice")) == [1, 2]
+    store.close()
+
+def test_journal_keeps_replayed_state_in_memory(tmp_path, monkeypatch):
+    """Test that mutations after the first load do not re-read the snapshot and log"""
+    store = JournalTodoStore(str(tmp_path / "journal"))
+    store.add_task("alice", make_task("one"))
+    loads = []
+    original = store._load_locked
+    monkeypatch.setattr(store, "_load_locked", lambda username: loads.append(username) or original(username))
+
+    assert store.add_task("alice", make_task("two"))["id"] == 2
+    assert store.add_task("alice", make_task(" ONE ")) is None
+    store.apply_changes("alice", [{**make_task("renamed"), "id": 1}], [2])
+    assert store.add_task("alice", make_task("one"))["id"] == 3
+    assert store.delete_task("alice", 2) is False
+    tasks = store.load_tasks("alice")
+    tasks[1]["status"] = "pending"
+    assert "status" not in store.load_tasks("alice")[1]
+    assert loads == []
+    store.close()
+
+    reopened = JournalTodoStore(str(tmp_path / "journal")).load_tasks("alice")
+    assert {task_id: task["title"] for task_id, task in reopened.items()} == {1: "renamed", 3: "one"}
+
+def test_journal_compacts_into_snapshot(tmp_path):
+    """Test that a log past the size threshold is folded into the snapshot in the background"""
+    store = JournalTodoStore(str(tmp_path / "journal"), compact_bytes=2048)
+    for i in range(30):
+        store.add_task("alice", make_task(f"task {i}"))
+    store.delete_task("alice", 5)
+    store.close()
+
+    assert store.stats()["compactions"] >= 1
+    assert (tmp_path / "journal" / "alice.json").exists()
+    log_file = tmp_path / "journal" / "alice.log"
+    assert not log_file.exists() or log_file.stat().st_size < 2048
+    tasks = JournalTodoStore(str(tmp_path / "journal")).load_tasks("alice")
+    assert sorted(tasks) == [i for i in range(1, 31) if i != 5]
+
+def test_task_dates_are_parsed_lazily():
+    """Test that stored ISO dates round-trip unchanged and parse on first access"""
+    data = {**make_task("one"), "id": 1, "due_date": "2024-02-01T09:30:00"}
+    task = Task.from_dict(data)
+    assert task.to_dict() == data
+    assert task.due_date.day == 1
+    assert task.created_at.year == 2024
+    assert not hasattr(task, "__dict__")
+
+def test_json_engine_reads_indented_files(tmp_path):
+    """Test that files written by the previous indent=2 encoder still load"""
+    (tmp_path / "alice.json").write_text(json.dumps({"1": {**make_task("one"), "id": 1}}, indent=2))
+    store = JsonTodoStore(str(tmp_path))
+    assert store.load_tasks("alice")[1]["title"] == "one"
+    store.add_task("alice", make_task("two"))
+    assert sorted(store.load_tasks("alice")) == [1, 2]
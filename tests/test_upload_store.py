@@ -0,0 +1,109 @@
+import pytest
+import hashlib
+import os
+import time
+
+import main
+from utils.auth import get_current_active_user, User
+from utils.file_handler import FileHandler
+from utils.upload_store import ContentAddressedStore, UploadTooLargeError, upload_owner
+
+async def chunks_of(data, size=1000):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentAddressedStore(root=str(tmp_path / "uploads"), gc_grace_seconds=0)
+
+@pytest.mark.asyncio
+async def test_save_stream_hashes_and_stores_blob(store):
+    """Test that a chunked upload is stored under its SHA-256"""
+    data = os.urandom(10_000)
+    result = await store.save_stream(chunks_of(data), "../../etc/report 1.pdf")
+    assert result["content_hash"] == hashlib.sha256(data).hexdigest()
+    assert result["size"] == len(data)
+    assert result["filename"].endswith("_report_1.pdf")
+    assert store.resolve(result["filename"]).read_bytes() == data
+
+@pytest.mark.asyncio
+async def test_identical_uploads_are_deduplicated(store):
+    """Test that repeat content is stored once and both names resolve to it"""
+    first = await store.save_stream(chunks_of(b"same bytes" * 100), "a.txt")
+    second = await store.save_stream(chunks_of(b"same bytes" * 100), "b.txt")
+    assert second["deduplicated"] is True
+    assert store.resolve(first["filename"]) == store.resolve(second["filename"])
+    assert len(list(store.blob_dir.glob("*/*"))) == 1
+    assert not list(store.tmp_dir.iterdir())
+
+@pytest.mark.asyncio
+async def test_oversized_upload_is_rejected_and_cleaned_up(tmp_path):
+    """Test that exceeding the size limit aborts without leaving files behind"""
+    store = ContentAddressedStore(root=str(tmp_path / "uploads"), max_upload_bytes=1500)
+    with pytest.raises(UploadTooLargeError):
+        await store.save_stream(chunks_of(b"x" * 3000), "big.txt")
+    assert not list(store.tmp_dir.iterdir())
+    assert not list(store.blob_dir.glob("*/*"))
+
+@pytest.mark.asyncio
+async def test_garbage_collection_removes_only_unreferenced_blobs(store):
+    """Test that GC keeps shared blobs until their last name is removed"""
+    first = await store.save_stream(chunks_of(b"shared content"), "a.txt")
+    second = await store.save_stream(chunks_of(b"shared content"), "b.txt")
+    other = await store.save_stream(chunks_of(b"other content"), "c.txt")
+    time.sleep(0.01)
+
+    store.remove(first["filename"])
+    store.remove(other["filename"])
+    assert store.collect_garbage()["removed"] == 1
+    assert store.resolve(second["filename"]) is not None
+
+    store.remove(second["filename"])
+    assert store.collect_garbage()["removed"] == 1
+
+@pytest.mark.asyncio
+async def test_file_handler_reads_stored_uploads(tmp_path, store):
+    """Test that stored names can be read back through FileHandler"""
+    handler = FileHandler(data_dir=str(tmp_path / "files"), upload_store=store)
+    result = await store.save_stream(chunks_of(b"Uploaded notes"), "notes.txt")
+    assert await handler.read_document(result["filename"]) == "Uploaded notes"
+    assert await handler.delete_file(result["filename"]) is True
+    assert await handler.read_file(result["filename"]) is None
+
+@pytest.mark.asyncio
+async def test_uploads_are_scoped_to_their_owner(tmp_path, store):
+    """Test that one user can neither replace nor read another user's upload of the same name"""
+    handler = FileHandler(data_dir=str(tmp_path / "files"), upload_store=store)
+    alice = await store.save_stream(chunks_of(b"Alice's notes"), "notes.txt", owner="alice")
+    bob = await store.save_stream(chunks_of(b"Alice's notes"), "notes.txt", owner="bob")
+    assert bob["deduplicated"] is True
+    assert bob["filename"] != alice["filename"]
+
+    token = upload_owner.set("bob")
+    try:
+        assert store.resolve(alice["filename"]) is None
+        assert await handler.read_document(alice["filename"]) is None
+        assert await handler.delete_file(alice["filename"]) is False
+        assert await handler.read_document(bob["filename"]) == "Alice's notes"
+    finally:
+        upload_owner.reset(token)
+
+    token = upload_owner.set("alice")
+    try:
+        assert await handler.read_document(alice["filename"]) == "Alice's notes"
+    finally:
+        upload_owner.reset(token)
+
+def test_upload_endpoints(test_client, store, monkeypatch):
+    """Test multipart and raw-body uploads through the API"""
+    monkeypatch.setattr(main, "upload_store", store)
+    monkeypatch.setattr(main.file_handler, "upload_store", store)
+    main.app.dependency_overrides[get_current_active_user] = lambda: User(username="upload_user")
+    try:
+        multipart = test_client.post("/api/upload", files={"file": ("doc.txt", b"hello upload", "text/plain")})
+        raw = test_client.put("/upload/doc.txt", content=b"hello upload")
+    finally:
+        main.app.dependency_overrides.clear()
+    assert multipart.status_code == 200
+    assert raw.json()["deduplicated"] is True
+    assert raw.json()["filename"] == multipart.json()["filename"]
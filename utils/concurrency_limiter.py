@@ -0,0 +1,204 @@
+"""
+Adaptive outbound concurrency limiting for LLM calls.
+
+The limit follows AIMD (additive increase, multiplicative decrease): it grows by
+roughly one slot per "window" of healthy calls and is cut in half on 429s,
+timeouts or latency spikes. Callers over the limit wait in a priority queue, so
+interactive requests are admitted before bulk work.
+
+A spike is judged against the baseline of comparable calls: baselines are kept
+per priority class, and calls that report their output token count are
+compared per generated token, so a long summary is not mistaken for a slow
+upstream just because short translations set the baseline.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from utils.resilience import LatencyTracker
+
+logger = logging.getLogger("ConcurrencyLimiter")
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BULK = 2
+
+# Set per request (e.g. from the request type) to order queued LLM calls; lower runs first
+request_priority: ContextVar[int] = ContextVar("request_priority", default=PRIORITY_DEFAULT)
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """True if an exception (or anything in its cause chain) signals upstream overload"""
+    while error is not None:
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code in (429, 503):
+            return True
+        if isinstance(error, httpx.TimeoutException):
+            return True
+        error = error.__cause__
+    return False
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_spike_factor: float = 2.0,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = 1.0,
+        smoothing: float = 0.1,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_spike_factor = latency_spike_factor
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.smoothing = smoothing
+        # (priority, per_token) -> EWMA of seconds, or of seconds per output token
+        self.baselines: Dict[Tuple[int, bool], float] = {}
+        self.in_flight = 0
+        self.queued = 0
+        self._last_decrease = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self.wait_times = LatencyTracker(window=500, min_samples=1)
+        self.counters = {"admitted": 0, "queued_total": 0, "increases": 0, "decreases": 0}
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    @asynccontextmanager
+    async def acquire(self, priority: int = PRIORITY_DEFAULT) -> AsyncIterator[None]:
+        """Hold one concurrency slot for the duration of the block"""
+        start = time.monotonic()
+        if self.in_flight < self.current_limit and not self._waiters:
+            self.in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            # The sequence number keeps FIFO order within a priority level
+            heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+            self.queued += 1
+            self.counters["queued_total"] += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # A slot was handed over just as we were cancelled; give it back
+                    self._release()
+                raise
+            finally:
+                self.queued -= 1
+        self.counters["admitted"] += 1
+        self.wait_times.record(time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.current_limit:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Waiter was cancelled while queued
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def record_success(self, latency: float, priority: int = PRIORITY_DEFAULT, output_tokens: Optional[int] = None) -> None:
+        per_token = bool(output_tokens)
+        sample = latency / output_tokens if per_token else latency
+        key = (priority, per_token)
+        baseline = self.baselines.get(key)
+        if baseline is not None and sample > baseline * self.latency_spike_factor:
+            unit = "s/token" if per_token else "s"
+            self._decrease(f"latency spike ({sample:.3g}{unit} vs baseline {baseline:.3g}{unit}, priority {priority})")
+        else:
+            # One extra slot per full window of healthy calls
+            if self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self.counters["increases"] += 1
+            self._wake()
+        self.baselines[key] = sample if baseline is None else baseline + self.smoothing * (sample - baseline)
+
+    def record_overload(self) -> None:
+        self._decrease("upstream overload")
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        # Many in-flight calls fail together during one overload; react to it once
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        new_limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        if new_limit < self.limit:
+            logger.warning(f"Reducing LLM concurrency limit {self.limit:.1f} -> {new_limit:.1f}: {reason}")
+            self.limit = new_limit
+            self.counters["decreases"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "wait_p50": self.wait_times.percentile(50),
+            "wait_p95": self.wait_times.percentile(95),
+        }
+
+
+class ConcurrencyLimitedClient:
+    """Drop-in wrapper that admits LLM calls through an AdaptiveConcurrencyLimiter."""
+
+    def __init__(self, client, limiter: AdaptiveConcurrencyLimiter):
+        self.client = client
+        self.limiter = limiter
+
+    @property
+    def name(self) -> str:
+        return getattr(self.client, "name", type(self.client).__name__)
+
+    @property
+    def model(self) -> str:
+        return getattr(self.client, "model", type(self.client).__name__)
+
+    async def generate_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> dict:
+        priority = request_priority.get()
+        async with self.limiter.acquire(priority):
+            start = time.monotonic()
+            try:
+                response = await self.client.generate_response(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens)
+            except Exception as e:
+                if is_overload_error(e):
+                    self.limiter.record_overload()
+                raise
+            output_tokens = (response.get("usage") or {}).get("completion_tokens")
+            self.limiter.record_success(time.monotonic() - start, priority, output_tokens)
+            return response
+
+    async def stream_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> AsyncIterator[str]:
+        # A stream holds its slot until the last chunk; its duration is not a latency signal
+        async with self.limiter.acquire(request_priority.get()):
+            try:
+                async for chunk in self.client.stream_response(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens):
+                    yield chunk
+            except Exception as e:
+                if is_overload_error(e):
+                    self.limiter.record_overload()
+                raise
+
+    async def close(self):
+        await self.client.close()
@@ -0,0 +1,176 @@
+"""
+Content-addressed cache of extracted document text.
+
+Entries are keyed by the SHA-256 of the file's bytes, so a renamed or
+re-uploaded copy of a document hits the cache and an edited one misses it.
+Each entry holds the normalized text and the character offset of every page.
+Recently used entries stay in memory. All entries are stored in SQLite under
+``data/``, and the least recently used ones are evicted once the stored text
+exceeds ``max_disk_bytes``.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("DocumentCache")
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with Unix line endings, so equivalent extractions compare equal"""
+    return unicodedata.normalize("NFC", text.replace("\r\n", "\n").replace("\r", "\n"))
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentTextCache:
+    def __init__(
+        self,
+        db_path: str = "data/document_cache.db",
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        # content hash -> {"text", "page_offsets"}
+        self._memory: "OrderedDict[str, dict]" = OrderedDict()
+        self._memory_bytes = 0
+        # path -> (size, mtime_ns, content hash); unchanged files are not re-hashed
+        self._fingerprints: Dict[str, Tuple[int, int, str]] = {}
+        self.counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "disk_evictions": 0}
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS document_text (
+                content_hash TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                page_offsets TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_document_text_accessed ON document_text (accessed_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    async def content_hash(self, path: Path) -> str:
+        """SHA-256 of a file's bytes, memoized on (size, mtime)"""
+        key = str(path)
+        cached = self._fingerprints.get(key)
+
+        def fingerprint() -> Tuple[int, int, str]:
+            # stat and hash both touch the disk, so neither runs on the event loop
+            stat = os.stat(key)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                return cached
+            return stat.st_size, stat.st_mtime_ns, hash_file(key)
+
+        self._fingerprints[key] = entry = await asyncio.to_thread(fingerprint)
+        return entry[2]
+
+    # --- Memory tier ---
+    def _memory_set(self, content_hash: str, entry: dict) -> None:
+        size = len(entry["text"])
+        if size > self.max_memory_bytes:
+            return
+        if content_hash in self._memory:
+            self._memory_bytes -= len(self._memory.pop(content_hash)["text"])
+        self._memory[content_hash] = entry
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, oldest = self._memory.popitem(last=False)
+            self._memory_bytes -= len(oldest["text"])
+
+    # --- Disk tier ---
+    def _disk_get(self, content_hash: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT text, page_offsets FROM document_text WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE document_text SET accessed_at = ? WHERE content_hash = ?", (time.time(), content_hash))
+            return {"text": row[0], "page_offsets": json.loads(row[1])}
+
+    def _disk_set(self, content_hash: str, entry: dict) -> int:
+        """Store an entry and evict least recently used ones over the size bound; returns evictions"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO document_text (content_hash, text, page_offsets, size, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (content_hash, entry["text"], json.dumps(entry["page_offsets"]), len(entry["text"]), time.time())
+            )
+            overflow = conn.execute("SELECT COALESCE(SUM(size), 0) FROM document_text").fetchone()[0] - self.max_disk_bytes
+            evicted = 0
+            if overflow > 0:
+                for key, size in conn.execute("SELECT content_hash, size FROM document_text ORDER BY accessed_at").fetchall():
+                    if overflow <= 0 or key == content_hash:
+                        break
+                    conn.execute("DELETE FROM document_text WHERE content_hash = ?", (key,))
+                    overflow -= size
+                    evicted += 1
+            return evicted
+
+    # --- Public API ---
+    async def get(self, content_hash: str) -> Optional[dict]:
+        """Return ``{"text", "page_offsets"}`` for a content hash, or None"""
+        entry = self._memory.get(content_hash)
+        if entry is not None:
+            self._memory.move_to_end(content_hash)
+            self.counters["hits"] += 1
+            self.counters["memory_hits"] += 1
+            return entry
+        try:
+            entry = await asyncio.to_thread(self._disk_get, content_hash)
+        except sqlite3.Error as e:
+            logger.warning(f"Document cache disk read failed: {e}")
+            entry = None
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        self._memory_set(content_hash, entry)
+        self.counters["hits"] += 1
+        self.counters["disk_hits"] += 1
+        return entry
+
+    async def set(self, content_hash: str, pages: List[str], separator: str = "") -> dict:
+        """Normalize and store extracted pages; returns the stored entry"""
+        pages = [normalize_text(page) for page in pages]
+        offsets, position = [], 0
+        for page in pages:
+            offsets.append(position)
+            position += len(page) + len(separator)
+        entry = {"text": separator.join(pages), "page_offsets": offsets}
+        self._memory_set(content_hash, entry)
+        try:
+            self.counters["disk_evictions"] += await asyncio.to_thread(self._disk_set, content_hash, entry)
+        except sqlite3.Error as e:
+            logger.warning(f"Document cache disk write failed: {e}")
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "memory_entries": len(self._memory), "memory_bytes": self._memory_bytes}
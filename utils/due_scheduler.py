@@ -0,0 +1,181 @@
+"""
+Due-date reminders for todos.
+
+Every open task with a due date has two thresholds: entering the due-soon
+window (``due - DUE_SOON``) and becoming overdue (``due``). The scheduler
+keeps them in one min-heap ordered by time, so the background loop sleeps
+until the next threshold instead of rescanning tasks. Changed, completed or
+deleted tasks are not removed from the heap; their stale entries are skipped
+when they surface, and the heap is rebuilt once stale entries dominate.
+
+Thresholds that passed before the scheduler started are not announced, so a
+restart does not repeat old reminders. A task added or re-dated while the
+scheduler runs that is already inside its due-soon window gets ``due_soon``
+straight away instead. Each task also remembers the last
+reminder it got for its current due date, so re-tracking it (a rename, or
+reopening a completed task) does not announce the same threshold twice.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.todo_query import DUE_SOON
+
+logger = logging.getLogger("DueDateScheduler")
+
+# Longest sleep between checks, so clock changes are picked up
+MAX_SLEEP_SECONDS = 60.0
+
+
+class DueDateScheduler:
+    def __init__(self, clock: Callable[[], datetime] = datetime.now):
+        self.clock = clock
+        # (fire_at, sequence, username, task_id, kind, due_date); ISO strings compare like datetimes
+        self._heap: List[Tuple[str, int, str, int, str, str]] = []
+        self._sequence = itertools.count()
+        # (username, task_id) -> (due_date, title) of open tasks with a due date
+        self._tracked: Dict[Tuple[str, int], Tuple[str, str]] = {}
+        # (username, task_id) -> (due_date, kind) of the last reminder sent
+        self._fired: Dict[Tuple[str, int], Tuple[str, str]] = {}
+        self._listeners: List[Callable[[dict], None]] = []
+        self._started_at = clock().isoformat()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        self.counters = {"reminders": 0, "stale_skipped": 0, "repeats_skipped": 0, "rebuilds": 0, "loop_errors": 0}
+
+    def add_listener(self, callback: Callable[[dict], None]) -> None:
+        """Call ``callback(event)`` for every reminder"""
+        self._listeners.append(callback)
+
+    def track(self, username: str, task: dict, catch_up: bool = True) -> None:
+        """
+        Schedule (or reschedule) a task after it was added or changed. With
+        ``catch_up``, a due-soon threshold that already passed fires now
+        (unless the task is overdue); ``load`` turns it off for stored tasks.
+        """
+        key = (username, task["id"])
+        due_date = task.get("due_date")
+        if task.get("completed") or not due_date:
+            self._tracked.pop(key, None)
+            return
+        if self._tracked.get(key, (None,))[0] == due_date:
+            self._tracked[key] = (due_date, task["title"])
+            return
+        try:
+            due = datetime.fromisoformat(due_date)
+        except ValueError:
+            due = None
+        if due is None or due.tzinfo is not None:
+            # Thresholds are compared as naive local ISO strings
+            logger.warning(f"Not scheduling task {task['id']} of {username}: unsupported due date {due_date!r}")
+            self._tracked.pop(key, None)
+            return
+        if self._fired.get(key, (due_date,))[0] != due_date:
+            del self._fired[key]
+        self._tracked[key] = (due_date, task["title"])
+        soon_at = (due - DUE_SOON).isoformat()
+        now = self.clock().isoformat()
+        if catch_up and soon_at < now < due_date:
+            soon_at = now
+        earliest = self._heap[0][0] if self._heap else None
+        for fire_at, kind in ((soon_at, "due_soon"), (due_date, "overdue")):
+            heapq.heappush(self._heap, (fire_at, next(self._sequence), username, task["id"], kind, due_date))
+        if self._wakeup is not None and (earliest is None or soon_at < earliest):
+            self._wakeup.set()
+        if len(self._heap) > 4 * len(self._tracked) + 1024:
+            self._rebuild()
+
+    def untrack(self, username: str, task_id: int) -> None:
+        """Forget a deleted task"""
+        self._tracked.pop((username, task_id), None)
+        self._fired.pop((username, task_id), None)
+
+    def load(self, tasks: Iterable[Tuple[str, dict]]) -> None:
+        """Track existing (username, task) pairs, e.g. everything in storage at startup"""
+        for username, task in tasks:
+            self.track(username, task, catch_up=False)
+
+    def _rebuild(self) -> None:
+        # Keep the live entries as pushed, so caught-up due_soon times are not recomputed
+        self._heap = [entry for entry in self._heap if self._tracked.get((entry[2], entry[3]), (None,))[0] == entry[5]]
+        heapq.heapify(self._heap)
+        self.counters["rebuilds"] += 1
+
+    def fire_due(self) -> List[dict]:
+        """Emit reminders for every threshold that has passed; returns the events"""
+        now = self.clock().isoformat()
+        events = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, _, username, task_id, kind, due_date = heapq.heappop(self._heap)
+            tracked = self._tracked.get((username, task_id))
+            if tracked is None or tracked[0] != due_date:
+                self.counters["stale_skipped"] += 1
+                continue
+            if kind == "overdue":
+                # Nothing more to announce for this task
+                del self._tracked[(username, task_id)]
+            fired = self._fired.get((username, task_id))
+            if fired is not None and fired[0] == due_date and (fired[1] == kind or fired[1] == "overdue"):
+                self.counters["repeats_skipped"] += 1
+                continue
+            self._fired[(username, task_id)] = (due_date, kind)
+            if fire_at < self._started_at:
+                continue
+            events.append({
+                "type": kind,
+                "username": username,
+                "task_id": task_id,
+                "title": tracked[1],
+                "due_date": due_date,
+                "at": now,
+            })
+        for event in events:
+            self.counters["reminders"] += 1
+            for listener in self._listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    logger.error(f"Reminder listener failed: {e}")
+        return events
+
+    def seconds_until_next(self) -> Optional[float]:
+        if not self._heap:
+            return None
+        return max(0.0, (datetime.fromisoformat(self._heap[0][0]) - self.clock()).total_seconds())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.fire_due()
+                delay = self.seconds_until_next()
+            except Exception as e:
+                # Keep reminders running for everyone else; retry after the usual sleep
+                self.counters["loop_errors"] += 1
+                logger.error(f"Reminder loop failed: {e}")
+                delay = None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), min(MAX_SLEEP_SECONDS, delay if delay is not None else MAX_SLEEP_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Start the background loop; call from a running event loop"""
+        if self._runner is None:
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "tracked": len(self._tracked), "heap": len(self._heap)}
@@ -1,101 +1,268 @@
 import os
+import asyncio
+import logging
+import tempfile
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, BinaryIO
-import json
+from typing import Optional, BinaryIO, AsyncIterator, Any, Callable
 from datetime import datetime
-import fitz # PyMuPDF
+
+import orjson
+
+from utils.document_cache import DocumentTextCache
+from utils.mmap_reader import DEFAULT_CHUNK_SIZE, MappedTextReader
+from utils.pdf_extractor import PdfExtractor
+from utils.text_chunker import PAGE_BREAK
+from utils.upload_store import CHUNK_SIZE, ContentAddressedStore, safe_name
+
+logger = logging.getLogger("FileHandler")
 
 class FileHandler:
-    def __init__(self, data_dir: str = "data"):
+    def __init__(
+        self,
+        data_dir: str = "data",
+        pdf_extractor: Optional[PdfExtractor] = None,
+        text_cache: Optional[DocumentTextCache] = None,
+        upload_store: Optional[ContentAddressedStore] = None,
+        io_workers: int = 8,
+    ):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
+        self.pdf_extractor = pdf_extractor or PdfExtractor()
+        self.text_cache = text_cache
+        self.upload_store = upload_store
+        self.text_reader = MappedTextReader()
+        # Blocking file operations run here so they never stall the event loop
+        self._io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="file-io")
+
+    def _run(self, func: Callable, *args: Any) -> "asyncio.Future":
+        # Carry the caller's context (e.g. upload_owner) into the worker thread
+        context = contextvars.copy_context()
+        return asyncio.get_running_loop().run_in_executor(self._io_executor, context.run, func, *args)
+
+    def _resolve(self, filename: str) -> Path:
+        """Path of a stored upload by name, falling back to a file directly under data_dir"""
+        if self.upload_store is not None:
+            blob = self.upload_store.resolve(filename)
+            if blob is not None:
+                return blob
+        return self.data_dir / filename
+
+    @staticmethod
+    def _write_atomic(filepath: Path, content: bytes) -> None:
+        """Write to a temp file in the same directory, then rename over the target"""
+        fd, tmp_name = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, filepath)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def _write_json(cls, filepath: Path, data: dict) -> None:
+        cls._write_atomic(filepath, orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
+    @staticmethod
+    def _read_json(filepath: Path) -> dict:
+        try:
+            with open(filepath, 'rb') as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return {}
 
     async def save_json(self, data: dict, filename: str) -> None:
         """
-        Save data to a JSON file
+        Save data to a JSON file; readers never see a partially written file
         """
-        filepath = self.data_dir / filename
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        await self._run(self._write_json, self.data_dir / filename, data)
 
     async def load_json(self, filename: str) -> dict:
         """
         Load data from a JSON file
         """
-        filepath = self.data_dir / filename
-        try:
-            with open(filepath, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        return await self._run(self._read_json, self.data_dir / filename)
+
+    @staticmethod
+    async def _iter_upload(file: BinaryIO) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
 
-    async def save_file(self, file: BinaryIO, filename: str) -> str:
+    async def save_file(self, file: BinaryIO, filename: str, content_type: Optional[str] = None, owner: Optional[str] = None) -> dict:
         """
-        Save an uploaded file
+        Save an uploaded file in fixed-size chunks, so memory use does not grow
+        with file size. Returns a dict whose ``filename`` can be read back with
+        read_file/read_pdf/read_document.
         """
+        if self.upload_store is not None:
+            return await self.upload_store.save_stream(self._iter_upload(file), filename, content_type, owner)
+
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename = f"{timestamp}_{filename}"
-        filepath = self.data_dir / safe_filename
-        
-        # Read the file content once
-        content = await file.read()
-        
-        with open(filepath, 'wb') as f:
-            f.write(content)
-        
-        return str(filepath)
+        stored_name = f"{timestamp}_{safe_name(filename)}"
+        size = 0
+        f = await self._run(open, self.data_dir / stored_name, 'wb')
+        try:
+            async for chunk in self._iter_upload(file):
+                size += len(chunk)
+                await self._run(f.write, chunk)
+        finally:
+            await self._run(f.close)
+        return {"filename": stored_name, "size": size}
+
+    def _read_text(self, filename: str) -> Optional[str]:
+        filepath = self._resolve(filename)
+        if not filepath.is_file():
+            return None
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return f.read()
 
     async def read_file(self, filename: str) -> Optional[str]:
         """
         Read contents of a text file
         """
-        filepath = self.data_dir / filename
-        if not filepath.is_file():
-             return None
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return f.read()
+            return await self._run(self._read_text, filename)
         except FileNotFoundError:
             return None
         except Exception as e:
-            # Log error
-            print(f"Error reading file {filename}: {e}")
+            logger.error(f"Error reading file {filename}: {e}")
+            return None
+
+    def _text_path(self, filename: str) -> Optional[str]:
+        filepath = self._resolve(filename)
+        return str(filepath) if filepath.is_file() else None
+
+    def _read_range(self, filename: str, start: int, end: Optional[int]) -> Optional[str]:
+        path = self._text_path(filename)
+        return None if path is None else self.text_reader.read_bytes(path, start, end)
+
+    def _read_lines(self, filename: str, start_line: int, end_line: Optional[int]) -> Optional[str]:
+        path = self._text_path(filename)
+        return None if path is None else self.text_reader.read_lines(path, start_line, end_line)
+
+    async def read_file_range(self, filename: str, start: int = 0, end: Optional[int] = None) -> Optional[str]:
+        """
+        Read bytes [start, end) of a text file as text, without loading the rest of the file
+        """
+        return await self._run(self._read_range, filename, start, end)
+
+    async def read_file_lines(self, filename: str, start_line: int = 0, end_line: Optional[int] = None) -> Optional[str]:
+        """
+        Read 0-based lines [start_line, end_line) of a text file
+        """
+        return await self._run(self._read_lines, filename, start_line, end_line)
+
+    async def iter_file_chunks(self, filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE, start: int = 0, end: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Yield a text file's contents in chunks of about ``chunk_size`` bytes,
+        so callers can stream through files larger than they want to hold in memory
+        """
+        path = await self._run(self._text_path, filename)
+        if path is None:
+            return
+        chunks = self.text_reader.iter_chunks(path, chunk_size, start, end)
+        try:
+            while True:
+                chunk = await self._run(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            await self._run(chunks.close)
+
+    def _pdf_path(self, filename: str) -> Optional[Path]:
+        # Uploads are stored under their content hash, so the type comes from the name
+        filepath = self._resolve(filename)
+        if not filepath.is_file() or Path(filename).suffix.lower() != '.pdf':
             return None
+        return filepath
 
-    async def read_pdf(self, filename: str) -> Optional[str]:
+    async def read_pdf(self, filename: str, start_page: int = 0, end_page: Optional[int] = None) -> Optional[str]:
         """
-        Read text content from a PDF file
+        Read text content from a PDF file, optionally limited to pages [start_page, end_page).
+        Pages are separated by form feeds.
         """
-        filepath = self.data_dir / filename
-        if not filepath.is_file() or filepath.suffix.lower() != '.pdf':
+        filepath = await self._run(self._pdf_path, filename)
+        if filepath is None:
             return None
         try:
-            doc = fitz.open(filepath)
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            doc.close()
-            return text
+            pages = await self.pdf_extractor.extract_pages(filepath, start_page, end_page)
+            return PAGE_BREAK.join(pages)
         except FileNotFoundError:
             return None
         except Exception as e:
-            # Log error
-            print(f"Error reading PDF {filename}: {e}") # Replace with proper logging
+            logger.error(f"Error reading PDF {filename}: {e}")
+            return None
+
+    async def iter_pdf_pages(self, filename: str, start_page: int = 0, end_page: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Yield the text of each page of a PDF file in order, one page at a time
+        """
+        filepath = await self._run(self._pdf_path, filename)
+        if filepath is None:
+            return
+        async for page in self.pdf_extractor.iter_pages(filepath, start_page, end_page):
+            yield page
+
+    async def read_document(self, filename: str) -> Optional[str]:
+        """
+        Read the text of a PDF or text file, served from the content-hash keyed
+        text cache when the same bytes were extracted before
+        """
+        filepath = await self._run(self._resolve, filename)
+        if self.text_cache is None or not await self._run(filepath.is_file):
+            return await self.read_pdf(filename) or await self.read_file(filename)
+        try:
+            content_hash = await self.text_cache.content_hash(filepath)
+        except OSError:
             return None
+        entry = await self.text_cache.get(content_hash)
+        if entry is not None:
+            return entry["text"]
+        if Path(filename).suffix.lower() == '.pdf':
+            try:
+                pages = await self.pdf_extractor.extract_pages(filepath)
+            except Exception as e:
+                logger.error(f"Error reading PDF {filename}: {e}")
+                pages = None
+        else:
+            text = await self.read_file(filename)
+            pages = None if text is None else [text]
+        if not pages:
+            return None
+        entry = await self.text_cache.set(content_hash, pages, separator=PAGE_BREAK)
+        return entry["text"]
+
+    def close(self) -> None:
+        """Release the PDF extraction and file I/O worker pools"""
+        self.pdf_extractor.close()
+        self._io_executor.shutdown(wait=False)
+
+    def _delete(self, filename: str) -> bool:
+        if self.upload_store is not None and self.upload_store.remove(filename):
+            # The blob may be shared with other names; collect_garbage reclaims it once unreferenced
+            return True
+        filepath = self.data_dir / filename
+        if filepath.is_file():
+            os.remove(filepath)
+            return True
+        return False
 
     async def delete_file(self, filename: str) -> bool:
         """
         Delete a file
         """
-        filepath = self.data_dir / filename
         try:
-            if filepath.is_file():
-                os.remove(filepath)
-                return True
-            return False
+            return await self._run(self._delete, filename)
         except FileNotFoundError:
             return False
         except Exception as e:
-            # Log error
-            print(f"Error deleting file {filename}: {e}")
-            return False 
\ No newline at end of file
+            logger.error(f"Error deleting file {filename}: {e}")
+            return False
@@ -1,49 +1,108 @@
 import os
+import json
+import logging
+from typing import AsyncIterator
 import httpx
+from utils.resilience import ResilientTransport, RetryPolicy, CircuitBreaker
+from utils.quota_pacer import QuotaPacer
+from utils.llm_router import LLMProvider
+
+class GeminiClient(LLMProvider):
+    name = "gemini"
 
-class GeminiClient:
     def __init__(self):
         self.api_key = os.getenv("GOOGLE_GEMINI_API_KEY")
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+        self.model = "gemini-2.0-flash"
+        self.base_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent"
+        self.stream_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:streamGenerateContent"
         if not self.api_key:
             raise ValueError("GOOGLE_GEMINI_API_KEY not found in environment variables")
         self.client = httpx.AsyncClient(timeout=httpx.Timeout(10.0))
+        # Retries on 429/5xx/timeouts, fails fast while Gemini is down, optionally hedges slow calls
+        self.transport = ResilientTransport(
+            retry_policy=RetryPolicy(max_attempts=int(os.getenv("GEMINI_MAX_ATTEMPTS", "3"))),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+            ),
+            hedge=os.getenv("GEMINI_HEDGE_REQUESTS", "false").lower() == "true"
+        )
+        # Client-side RPM/TPM budgets (defaults match the paid tier for gemini-2.0-flash; 0 disables)
+        self.pacer = QuotaPacer(
+            rpm=int(os.getenv("GEMINI_RPM", "2000")),
+            tpm=int(os.getenv("GEMINI_TPM", "4000000"))
+        )
         import logging
         masked = self.api_key[:4] + "..." + self.api_key[-4:] if self.api_key and len(self.api_key) > 8 else "NOT SET"
         logging.info(f"[GeminiClient] Initialized with API key: {masked}")
 
-    async def generate_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> dict:
+    @staticmethod
+    def _build_payload(prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> dict:
         # Gemini API expects a 'contents' array, with user and system messages
         combined_text = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
         contents = [{
             "role": "user",
             "parts": [{"text": combined_text}]
         }]
-        
-        payload = {
+        return {
             "contents": contents,
             "generationConfig": {
                 "temperature": temperature,
                 "maxOutputTokens": max_tokens
             }
         }
+
+    @staticmethod
+    def _extract_chunk_text(data: dict) -> str:
+        """Concatenate the text parts of the first candidate in a (partial) response."""
+        candidates = data.get("candidates", [])
+        if not candidates:
+            return ""
+        parts = candidates[0].get("content", {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts if isinstance(part, dict))
+
+    @staticmethod
+    def _extract_usage(data: dict) -> dict:
+        """Translate Gemini's usageMetadata into the usage dict services report"""
+        usage = data.get("usageMetadata") or {}
+        if not usage:
+            return {}
+        return {
+            "prompt_tokens": usage.get("promptTokenCount"),
+            "completion_tokens": usage.get("candidatesTokenCount"),
+            "total_tokens": usage.get("totalTokenCount"),
+        }
+
+    async def _paced_post(self, url: str, payload: dict, estimated_tokens: int) -> httpx.Response:
+        """One HTTP attempt, admitted by the quota pacer"""
+        await self.pacer.acquire(estimated_tokens)
+        resp = await self.client.post(url, json=payload)
+        if resp.status_code == 429:
+            self.pacer.observe_throttle(resp)
+        return resp
+
+    async def generate_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> dict:
+        payload = self._build_payload(prompt, system_prompt, temperature, max_tokens)
+        estimated_tokens = self.pacer.estimate_tokens(payload["contents"][0]["parts"][0]["text"])
         url = f"{self.base_url}?key={self.api_key}"
         import logging
         masked = self.api_key[:4] + "..." + self.api_key[-4:] if self.api_key and len(self.api_key) > 8 else "NOT SET"
         logging.info(f"[GeminiClient] Sending prompt: {prompt}, system_prompt: {system_prompt}, API key: {masked}, payload: {payload}")
         try:
-            resp = await self.client.post(url, json=payload)
+            resp = await self.transport.request(lambda: self._paced_post(url, payload, estimated_tokens))
             logging.info(f"[GeminiClient] Raw response status: {resp.status_code}, body: {resp.text}")
             resp.raise_for_status()
             data = resp.json()
-            print("[GeminiClient] Full parsed response:", data)
             logging.info(f"[GeminiClient] Parsed response JSON: {data}")
+            usage = self._extract_usage(data)
+            self.pacer.reconcile(estimated_tokens, usage.get("total_tokens"))
             candidates = data.get("candidates", [])
             if not candidates or "content" not in candidates[0]:
                 logging.warning("[GeminiClient] No valid candidates or content returned.")
                 return {
                     "content": "[No content returned from Gemini]",
-                    "model": "gemini-2.0-flash"
+                    "model": "gemini-2.0-flash",
+                    "usage": usage
                 }
 
             candidate = candidates[0]["content"]
@@ -57,7 +116,8 @@ class GeminiClient:
             logging.info(f"[GeminiClient] Parsed content: {content_text}")
             return {
                 "content": content_text if content_text.strip() else "[No meaningful content returned]",
-                "model": "gemini-2.0-flash"
+                "model": "gemini-2.0-flash",
+                "usage": usage
             }
         except Exception as e:
             import traceback
@@ -71,5 +131,64 @@ class GeminiClient:
                 raise Exception(f"GeminiClient error: {e} | Response: {err_data}") from e
             raise
 
+    async def stream_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> AsyncIterator[str]:
+        """
+        Stream a completion from Gemini, yielding text chunks as they arrive.
+
+        Uses the ``streamGenerateContent`` endpoint with ``alt=sse`` so every
+        server-sent event carries a partial ``GenerateContentResponse``.
+        """
+        payload = self._build_payload(prompt, system_prompt, temperature, max_tokens)
+        url = f"{self.stream_url}?alt=sse&key={self.api_key}"
+        logging.info(f"[GeminiClient] Streaming prompt: {prompt}, system_prompt: {system_prompt}")
+        estimated_tokens = self.pacer.estimate_tokens(payload["contents"][0]["parts"][0]["text"])
+        # Chunks cannot be un-sent, so streams are not retried or hedged; they only honour the breaker
+        self.transport.breaker.before_request()
+        usage = {}
+        try:
+            await self.pacer.acquire(estimated_tokens)
+            # Generation can take longer than the default timeout, but chunks arrive well within it
+            async with self.client.stream("POST", url, json=payload, timeout=httpx.Timeout(10.0, read=60.0)) as resp:
+                if resp.is_error:
+                    await resp.aread()
+                if resp.status_code == 429:
+                    self.pacer.observe_throttle(resp)
+                if self.transport.retry_policy.is_retryable_response(resp):
+                    self.transport.breaker.record_failure()
+                else:
+                    self.transport.breaker.record_success()
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if not data:
+                        continue
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        logging.warning(f"[GeminiClient] Skipping malformed stream event: {data}")
+                        continue
+                    # Usage totals are cumulative; the last event carries the final counts
+                    usage = self._extract_usage(chunk) or usage
+                    text = self._extract_chunk_text(chunk)
+                    if text:
+                        yield text
+            self.pacer.reconcile(estimated_tokens, usage.get("total_tokens"))
+        except (httpx.TimeoutException, httpx.TransportError):
+            self.transport.breaker.record_failure()
+            raise
+        except httpx.HTTPStatusError as e:
+            try:
+                err_data = e.response.json()
+            except Exception:
+                err_data = e.response.text
+            logging.error(f"GeminiClient stream error: {e} | Response: {err_data}")
+            raise Exception(f"GeminiClient error: {e} | Response: {err_data}") from e
+        except BaseException:
+            # Cancelled or closed early; a half-open probe must not stay claimed
+            self.transport.breaker.release_probe()
+            raise
+
     async def close(self):
         await self.client.aclose()
@@ -0,0 +1,261 @@
+"""
+Tiered response cache for LLM clients.
+
+Exact-repeat requests (same model, prompts, temperature and token budget) are
+answered from an in-process LRU first and a SQLite store under ``data/`` second.
+The SQLite tier survives restarts and is shared by every uvicorn worker.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from utils.llm_router import is_fallback_response, stream_used_fallback
+
+logger = logging.getLogger("LLMCache")
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of LLM responses.
+
+    - Memory tier: LRU bounded by entry count and approximate byte size, with a TTL.
+    - Disk tier: SQLite (WAL mode) bounded by entry count, with its own TTL.
+    """
+    def __init__(
+        self,
+        db_path: str = "data/llm_cache.db",
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: float = 3600,
+        disk_ttl: float = 7 * 24 * 3600,
+        max_disk_entries: int = 50_000,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl
+        self.max_disk_entries = max_disk_entries
+        # key -> (expires_at, size, value)
+        self._memory: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+        self._memory_bytes = 0
+        self.counters = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "disk_evictions": 0,
+        }
+        self.db_path = Path(db_path) if db_path else None
+        if self.db_path:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                ''')
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A short-lived connection per operation keeps this safe across threads and worker processes
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: Optional[str], prompt: str, temperature: float, max_tokens: int) -> str:
+        """Hash the request parameters that determine the response"""
+        raw = json.dumps([model, system_prompt, prompt, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # --- Memory tier ---
+    def _memory_get(self, key: str) -> Optional[dict]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at < time.time():
+            self._memory_pop(key)
+            self.counters["expirations"] += 1
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_pop(self, key: str) -> None:
+        _, size, _ = self._memory.pop(key)
+        self._memory_bytes -= size
+
+    def _memory_set(self, key: str, value: dict, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        if key in self._memory:
+            self._memory_pop(key)
+        self._memory[key] = (time.time() + self.ttl, size, value)
+        self._memory_bytes += size
+        while len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes:
+            oldest = next(iter(self._memory))
+            self._memory_pop(oldest)
+            self.counters["evictions"] += 1
+
+    # --- Disk tier ---
+    def _disk_get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def _disk_set(self, key: str, serialized: str) -> int:
+        """Store an entry and trim the table; returns the number of evicted rows"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, serialized, now + self.disk_ttl, now)
+            )
+            evicted = conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,)).rowcount
+            overflow = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_disk_entries
+            if overflow > 0:
+                evicted += conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                ).rowcount
+            return evicted
+
+    # --- Public API ---
+    async def get(self, key: str) -> Tuple[Optional[dict], Optional[str]]:
+        """Return ``(value, tier)`` for a key, or ``(None, None)`` on a miss"""
+        value = self._memory_get(key)
+        if value is not None:
+            self.counters["hits"] += 1
+            self.counters["memory_hits"] += 1
+            return value, "memory"
+        if self.db_path:
+            try:
+                serialized = await asyncio.to_thread(self._disk_get, key)
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache disk read failed: {e}")
+                serialized = None
+            if serialized is not None:
+                value = json.loads(serialized)
+                self._memory_set(key, value, len(serialized))
+                self.counters["hits"] += 1
+                self.counters["disk_hits"] += 1
+                return value, "disk"
+        self.counters["misses"] += 1
+        return None, None
+
+    async def set(self, key: str, value: dict) -> None:
+        serialized = json.dumps(value, default=str)
+        self._memory_set(key, value, len(serialized))
+        if self.db_path:
+            try:
+                self.counters["disk_evictions"] += await asyncio.to_thread(self._disk_set, key, serialized)
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache disk write failed: {e}")
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._memory_bytes = 0
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+        }
+
+
+class CachedLLMClient:
+    """
+    Drop-in wrapper that serves ``generate_response`` from an LLMResponseCache.
+
+    Requests above ``max_cacheable_temperature`` (e.g. creative chat) bypass the
+    cache, since callers expect a fresh sample each time. Answers from the
+    router's local fallback are returned but not stored, since keys name the
+    primary model.
+    """
+    def __init__(self, client, cache: LLMResponseCache, max_cacheable_temperature: float = 0.5):
+        self.client = client
+        self.cache = cache
+        self.max_cacheable_temperature = max_cacheable_temperature
+
+    @property
+    def model(self) -> str:
+        return getattr(self.client, "model", type(self.client).__name__)
+
+    def is_cacheable(self, temperature: float) -> bool:
+        return temperature <= self.max_cacheable_temperature
+
+    async def generate_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> dict:
+        if not self.is_cacheable(temperature):
+            self.cache.counters["bypassed"] += 1
+            return await self.client.generate_response(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens)
+
+        key = self.cache.make_key(self.model, system_prompt, prompt, temperature, max_tokens)
+        cached, tier = await self.cache.get(key)
+        if cached is not None:
+            # Callers may mutate the response (e.g. reformatting code), so hand out a copy
+            return {**cached, "cache": {"hit": True, "tier": tier}}
+
+        response = await self.client.generate_response(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens)
+        if is_fallback_response(response):
+            self.cache.counters["bypassed"] += 1
+        else:
+            await self.cache.set(key, {k: v for k, v in response.items() if k != "cache"})
+        return {**response, "cache": {"hit": False}}
+
+    async def stream_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> AsyncIterator[str]:
+        """Replay a cached completion as one chunk; otherwise stream from the wrapped client"""
+        if not self.is_cacheable(temperature):
+            self.cache.counters["bypassed"] += 1
+            async for chunk in self.client.stream_response(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens):
+                yield chunk
+            return
+
+        key = self.cache.make_key(self.model, system_prompt, prompt, temperature, max_tokens)
+        cached, _ = await self.cache.get(key)
+        if cached is not None:
+            yield cached.get("content", "")
+            return
+        chunks = []
+        stream_used_fallback.set(False)
+        async for chunk in self.client.stream_response(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens):
+            chunks.append(chunk)
+            yield chunk
+        # Only a stream that ran to completion, from the primary model, is worth caching
+        if stream_used_fallback.get():
+            self.cache.counters["bypassed"] += 1
+        elif chunks:
+            await self.cache.set(key, {"content": "".join(chunks), "model": self.model})
+
+    async def close(self):
+        await self.client.close()
@@ -1,27 +1,144 @@
 import os
+import json
 import asyncio
-                    local_response = await local_client.post(
-                        "http://localhost:11434/api/generate",
-                        json={
-                            "model": model,
-                            "prompt": prompt,
-                            "stream": False
-                        }
-                    )
-                    local_response.raise_for_status()
-                    result = local_response.json()
-                    return {
-                        "content": result.get("response", "No response"),
-                        "usage": {},
-                        "model": model + " (local)"
-                    }
-            except Exception as local_e:
-                print(f"Local fallback error: {str(local_e)}")
-                raise Exception("Both OpenRouter and local fallback failed.")
+import logging
+from typing import AsyncIterator, Optional
+import httpx
+
+from utils.llm_router import LLMProvider, LLMRouter
+
+logger = logging.getLogger("LLMClient")
+
+
+class OpenRouterProvider(LLMProvider):
+    """
+    Cloud provider for any model served through OpenRouter's OpenAI-compatible API
+    """
+    name = "openrouter"
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+        self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
+        if not self.api_key:
+            raise ValueError("OPENROUTER_API_KEY not found in environment variables")
+        self.model = model or os.getenv("OPENROUTER_MODEL", "openai/gpt-3.5-turbo")
+        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.client = httpx.AsyncClient(timeout=httpx.Timeout(30.0))
+
+    def _build_payload(self, prompt: str, system_prompt: str, temperature: float, max_tokens: int, stream: bool = False) -> dict:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream
+        }
+
+    @property
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    async def generate_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> dict:
+        resp = await self.client.post(
+            self.base_url,
+            headers=self._headers,
+            json=self._build_payload(prompt, system_prompt, temperature, max_tokens)
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        return {
+            "content": data["choices"][0]["message"]["content"],
+            "usage": data.get("usage", {}),
+            "model": data.get("model", self.model)
+        }
+
+    async def stream_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> AsyncIterator[str]:
+        payload = self._build_payload(prompt, system_prompt, temperature, max_tokens, stream=True)
+        async with self.client.stream("POST", self.base_url, headers=self._headers, json=payload) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if not data or data == "[DONE]":
+                    continue
+                delta = json.loads(data)["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    yield delta["content"]
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class OllamaProvider(LLMProvider):
+    """
+    Local provider for an Ollama-compatible `/api/generate` endpoint
+    """
+    name = "local"
+
+    def __init__(self, base_url: Optional[str] = None, model: Optional[str] = None):
+        self.base_url = (base_url or os.getenv("OLLAMA_URL", "http://localhost:11434")).rstrip("/")
+        self.model = model or os.getenv("OLLAMA_MODEL", "llama3")
+        # Local models can be slow to load on first use
+        self.client = httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=2.0))
+
+    def _build_payload(self, prompt: str, system_prompt: str, temperature: float, max_tokens: int, stream: bool) -> dict:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {"temperature": temperature, "num_predict": max_tokens}
+        }
+        if system_prompt:
+            payload["system"] = system_prompt
+        return payload
+
+    async def generate_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> dict:
+        resp = await self.client.post(
+            f"{self.base_url}/api/generate",
+            json=self._build_payload(prompt, system_prompt, temperature, max_tokens, stream=False)
+        )
+        resp.raise_for_status()
+        result = resp.json()
+        return {
+            "content": result.get("response", "No response"),
+            "usage": {
+                "prompt_tokens": result.get("prompt_eval_count"),
+                "completion_tokens": result.get("eval_count")
+            },
+            "model": self.model + " (local)"
+        }
+
+    async def stream_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> AsyncIterator[str]:
+        payload = self._build_payload(prompt, system_prompt, temperature, max_tokens, stream=True)
+        async with self.client.stream("POST", f"{self.base_url}/api/generate", json=payload) as resp:
+            resp.raise_for_status()
+            # Ollama streams newline-delimited JSON objects
+            async for line in resp.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class LLMClient(LLMRouter):
+    """
+    OpenRouter client with a local Ollama fallback, kept for existing callers.
+    New code should use build_default_router().
+    """
+    def __init__(self):
+        super().__init__([OpenRouterProvider()], local_fallback=OllamaProvider())
 
     async def summarize(self, text: str, max_length: int = 500) -> str:
         """
-        Summarize text using the LLM via OpenRouter
+        Summarize text using the LLM
         """
         system_prompt = f"Please summarize the following text concisely, aiming for approximately {max_length} characters:"
         response = await self.generate_response(text, system_prompt=system_prompt, temperature=0.3)
@@ -29,21 +146,35 @@ import asyncio
 
     async def translate(self, text: str, target_language: str) -> str:
         """
-        Translate text to target language via OpenRouter
+        Translate text to target language
         """
         system_prompt = f"Translate the following text to {target_language}:"
         response = await self.generate_response(text, system_prompt=system_prompt, temperature=0.3)
         return response["content"]
 
-    async def close(self):
-        await self.client.aclose()
+
+def build_default_router(gemini_client=None) -> LLMRouter:
+    """
+    Build the router used by both the API and the CLI from environment variables:
+    Gemini (if GOOGLE_GEMINI_API_KEY is set), OpenRouter (if OPENROUTER_API_KEY is set),
+    and the local Ollama endpoint as last resort unless LLM_LOCAL_FALLBACK=false.
+    """
+    from utils.gemini_client import GeminiClient
+
+    providers = []
+    if gemini_client is not None:
+        providers.append(gemini_client)
+    elif os.getenv("GOOGLE_GEMINI_API_KEY"):
+        providers.append(GeminiClient())
+    if os.getenv("OPENROUTER_API_KEY"):
+        providers.append(OpenRouterProvider())
+    local_fallback = OllamaProvider() if os.getenv("LLM_LOCAL_FALLBACK", "true").lower() == "true" else None
+    return LLMRouter(
+        providers,
+        local_fallback=local_fallback,
+        slow_threshold=float(os.getenv("LLM_SLOW_THRESHOLD_SECONDS", "8"))
+    )
+
 
 def run_async(func, *args, **kwargs):
     return asyncio.get_event_loop().run_until_complete(func(*args, **kwargs))
-
-# Ensure client is closed properly (e.g., in FastAPI shutdown event)
-# Example:
-# @app.on_event("shutdown")
-# async def shutdown_event():
-#     await llm_client.close()
-# ... existing code ...
\ No newline at end of file
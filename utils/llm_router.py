@@ -0,0 +1,221 @@
+"""
+Latency-aware routing across LLM providers.
+
+Every provider exposes the same interface as GeminiClient
+(``generate_response`` / ``stream_response`` / ``close``). The router keeps
+rolling latency percentiles and error rates per provider, sends each request to
+the fastest healthy one, fails over to the next on error, and falls back to a
+local (Ollama-style) endpoint when every cloud provider is slow or down.
+"""
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from utils.resilience import LatencyTracker
+
+logger = logging.getLogger("LLMRouter")
+
+# True while the current task's stream is served by the local fallback. Streams
+# cannot carry a response flag, so caching wrappers check this instead.
+stream_used_fallback: ContextVar[bool] = ContextVar("stream_used_fallback", default=False)
+
+
+def is_fallback_response(response: dict) -> bool:
+    """True if the local fallback produced the response; such answers must not be cached under the primary model"""
+    return bool(response.get("fallback"))
+
+
+class LLMProvider:
+    """Interface shared by every LLM backend."""
+    name = "provider"
+    model = "unknown"
+
+    async def generate_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> dict:
+        raise NotImplementedError
+
+    async def stream_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> AsyncIterator[str]:
+        # Providers without native streaming return the whole completion as one chunk
+        response = await self.generate_response(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens)
+        yield response.get("content", "")
+
+    async def close(self):
+        pass
+
+
+class AllProvidersFailedError(Exception):
+    """Raised when no provider (including the local fallback) could serve a request."""
+
+
+class ProviderStats:
+    """Rolling latency and error-rate window for one provider."""
+
+    def __init__(self, window: int = 100):
+        self.latency = LatencyTracker(window=window, min_samples=5)
+        self.outcomes = deque(maxlen=window)
+        self.last_attempt = 0.0
+
+    def record(self, ok: bool, latency: Optional[float] = None) -> None:
+        self.outcomes.append(ok)
+        self.last_attempt = time.monotonic()
+        if ok and latency is not None:
+            self.latency.record(latency)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "p50": self.latency.percentile(50),
+            "p95": self.latency.percentile(95),
+            "error_rate": round(self.error_rate, 3),
+            "samples": len(self.outcomes),
+        }
+
+
+class LLMRouter(LLMProvider):
+    """
+    Routes requests across cloud providers by health and latency.
+
+    A provider is unhealthy when its recent error rate exceeds ``max_error_rate``
+    or its p95 latency exceeds ``slow_threshold`` seconds. Healthy providers are
+    tried fastest-p50 first, then ``local_fallback``, then unhealthy ones, so a
+    cloud provider that is slow but still answering does not keep being served
+    ahead of local. An unhealthy provider that has not been tried for
+    ``probe_interval`` seconds is given one request first so that recovery gets
+    noticed.
+    """
+    name = "router"
+
+    def __init__(
+        self,
+        providers: List[Any],
+        local_fallback: Optional[Any] = None,
+        max_error_rate: float = 0.5,
+        slow_threshold: float = 8.0,
+        probe_interval: float = 30.0,
+    ):
+        if not providers and local_fallback is None:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = list(providers)
+        self.local_fallback = local_fallback
+        self.max_error_rate = max_error_rate
+        self.slow_threshold = slow_threshold
+        self.probe_interval = probe_interval
+        self.stats_by_provider: Dict[str, ProviderStats] = {
+            self._name(provider): ProviderStats() for provider in self._all_providers()
+        }
+        self.counters = {"requests": 0, "failovers": 0, "local_fallbacks": 0}
+
+    @staticmethod
+    def _name(provider) -> str:
+        return getattr(provider, "name", type(provider).__name__)
+
+    @property
+    def model(self) -> str:
+        primary = self.providers[0] if self.providers else self.local_fallback
+        return getattr(primary, "model", self._name(primary))
+
+    def _all_providers(self) -> List[Any]:
+        return self.providers + ([self.local_fallback] if self.local_fallback is not None else [])
+
+    def is_healthy(self, provider) -> bool:
+        stats = self.stats_by_provider[self._name(provider)]
+        if stats.error_rate > self.max_error_rate:
+            return False
+        p95 = stats.latency.percentile(95)
+        return p95 is None or p95 <= self.slow_threshold
+
+    def route(self) -> List[Any]:
+        """Order in which providers should be tried for the next request"""
+        now = time.monotonic()
+        healthy, unhealthy, probes = [], [], []
+        for provider in self.providers:
+            stats = self.stats_by_provider[self._name(provider)]
+            if self.is_healthy(provider):
+                healthy.append(provider)
+            elif now - stats.last_attempt >= self.probe_interval:
+                probes.append(provider)
+            else:
+                unhealthy.append(provider)
+
+        def p50(provider):
+            # Providers without latency history sort first so they get measured
+            value = self.stats_by_provider[self._name(provider)].latency.percentile(50)
+            return value if value is not None else 0.0
+
+        healthy.sort(key=p50)
+        local = [self.local_fallback] if self.local_fallback is not None else []
+        return probes + healthy + local + unhealthy
+
+    async def generate_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> dict:
+        self.counters["requests"] += 1
+        errors = []
+        for index, provider in enumerate(self.route()):
+            name = self._name(provider)
+            stats = self.stats_by_provider[name]
+            self._count_failover(provider, index)
+            start = time.monotonic()
+            try:
+                response = await provider.generate_response(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens)
+            except Exception as e:
+                stats.record(False)
+                logger.warning(f"Provider {name} failed: {e}")
+                errors.append(f"{name}: {e}")
+                continue
+            stats.record(True, time.monotonic() - start)
+            if provider is self.local_fallback:
+                return {**response, "provider": name, "fallback": True}
+            return {**response, "provider": name}
+        raise AllProvidersFailedError("All LLM providers failed: " + "; ".join(errors))
+
+    async def stream_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> AsyncIterator[str]:
+        self.counters["requests"] += 1
+        errors = []
+        for index, provider in enumerate(self.route()):
+            name = self._name(provider)
+            stats = self.stats_by_provider[name]
+            self._count_failover(provider, index)
+            start = time.monotonic()
+            started = False
+            stream_used_fallback.set(provider is self.local_fallback)
+            try:
+                async for chunk in provider.stream_response(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens):
+                    if not started:
+                        # Time to first chunk is the latency that matters for streams
+                        stats.record(True, time.monotonic() - start)
+                        started = True
+                    yield chunk
+                if not started:
+                    stats.record(True, time.monotonic() - start)
+                return
+            except Exception as e:
+                stats.record(False)
+                if started:
+                    # Chunks already reached the caller; switching providers would garble the output
+                    raise
+                logger.warning(f"Provider {name} failed to start stream: {e}")
+                errors.append(f"{name}: {e}")
+        raise AllProvidersFailedError("All LLM providers failed: " + "; ".join(errors))
+
+    def _count_failover(self, provider, index: int) -> None:
+        if index > 0:
+            self.counters["failovers"] += 1
+        # Local can come first when no cloud provider is healthy
+        if provider is self.local_fallback:
+            self.counters["local_fallbacks"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        providers = {}
+        for provider in self._all_providers():
+            name = self._name(provider)
+            providers[name] = {**self.stats_by_provider[name].snapshot(), "healthy": self.is_healthy(provider)}
+        return {**self.counters, "providers": providers}
+
+    async def close(self):
+        for provider in self._all_providers():
+            await provider.close()
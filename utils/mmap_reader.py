@@ -0,0 +1,119 @@
+"""
+Range reads over large text files without loading them whole.
+
+Files are memory-mapped, so a byte or line range only touches the pages it
+covers. Text is decoded incrementally as UTF-8, so a chunk boundary that falls
+inside a multi-byte character is handled correctly. Line lookups use a sparse
+index of every ``LINE_INDEX_STRIDE``-th line offset, built once per file
+version.
+"""
+import codecs
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+LINE_INDEX_STRIDE = 1024
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+def _align_to_char_start(mm: mmap.mmap, offset: int) -> int:
+    """Move offset forward past UTF-8 continuation bytes (at most three)"""
+    end = min(len(mm), offset + 3)
+    while offset < end and (mm[offset] & 0xC0) == 0x80:
+        offset += 1
+    return offset
+
+
+class MappedTextReader:
+    """Blocking reader; FileHandler runs its methods in the file I/O pool."""
+
+    def __init__(self, max_indexed_files: int = 64):
+        self.max_indexed_files = max_indexed_files
+        # path -> ((size, mtime_ns), offsets of lines 0, STRIDE, 2*STRIDE, ...)
+        self._line_indexes: Dict[str, Tuple[Tuple[int, int], List[int]]] = {}
+
+    @contextmanager
+    def _mapped(self, path: str) -> Iterator[Optional[mmap.mmap]]:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be mapped
+                yield None
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+    def read_bytes(self, path: str, start: int = 0, end: Optional[int] = None) -> str:
+        """
+        Decode bytes [start, end) as text. Offsets inside a multi-byte
+        character are moved to the next character boundary.
+        """
+        with self._mapped(path) as mm:
+            if mm is None:
+                return ""
+            end = len(mm) if end is None else min(end, len(mm))
+            start = _align_to_char_start(mm, max(0, start))
+            end = _align_to_char_start(mm, end)
+            if start >= end:
+                return ""
+            return mm[start:end].decode("utf-8", errors="replace")
+
+    def iter_chunks(self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        """Yield decoded text for [start, end) in chunks of about chunk_size bytes"""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with self._mapped(path) as mm:
+            if mm is None:
+                return
+            end = len(mm) if end is None else min(end, len(mm))
+            position = _align_to_char_start(mm, max(0, start))
+            while position < end:
+                stop = min(position + chunk_size, end)
+                text = decoder.decode(mm[position:stop], final=stop >= end)
+                position = stop
+                if text:
+                    yield text
+
+    def _line_index(self, path: str, mm: mmap.mmap) -> List[int]:
+        stat = os.stat(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+        cached = self._line_indexes.get(path)
+        if cached and cached[0] == version:
+            return cached[1]
+        offsets = [0]
+        line = 0
+        position = mm.find(b"\n")
+        while position != -1:
+            line += 1
+            if line % LINE_INDEX_STRIDE == 0:
+                offsets.append(position + 1)
+            position = mm.find(b"\n", position + 1)
+        if len(self._line_indexes) >= self.max_indexed_files:
+            self._line_indexes.pop(next(iter(self._line_indexes)))
+        self._line_indexes[path] = (version, offsets)
+        return offsets
+
+    def _line_offset(self, mm: mmap.mmap, index: List[int], line: int) -> int:
+        """Byte offset where 0-based ``line`` starts, or len(mm) past the end"""
+        checkpoint = min(line // LINE_INDEX_STRIDE, len(index) - 1)
+        offset = index[checkpoint]
+        for _ in range(line - checkpoint * LINE_INDEX_STRIDE):
+            newline = mm.find(b"\n", offset)
+            if newline == -1:
+                return len(mm)
+            offset = newline + 1
+        return offset
+
+    def line_range_offsets(self, path: str, start_line: int = 0, end_line: Optional[int] = None) -> Tuple[int, int]:
+        """Byte offsets covering 0-based lines [start_line, end_line)"""
+        with self._mapped(path) as mm:
+            if mm is None:
+                return 0, 0
+            index = self._line_index(path, mm)
+            start = self._line_offset(mm, index, max(0, start_line))
+            end = len(mm) if end_line is None else self._line_offset(mm, index, max(start_line, end_line))
+            return start, end
+
+    def read_lines(self, path: str, start_line: int = 0, end_line: Optional[int] = None) -> str:
+        """Text of 0-based lines [start_line, end_line), including their line endings"""
+        start, end = self.line_range_offsets(path, start_line, end_line)
+        return self.read_bytes(path, start, end)
@@ -0,0 +1,108 @@
+"""
+Off-event-loop PDF text extraction.
+
+PyMuPDF is CPU-bound and holds the GIL, so page ranges of large documents are
+extracted in a process pool (one document handle per worker). Small documents
+are extracted in a thread instead, where process start-up and pickling would
+cost more than they save.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple, Union
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger("PdfExtractor")
+
+PathLike = Union[str, Path]
+
+
+def _extract_range(path: str, start: int, stop: int) -> List[str]:
+    """Worker: text of pages [start, stop) of one document"""
+    with fitz.open(path) as doc:
+        return [doc[number].get_text() for number in range(start, stop)]
+
+
+def _page_count(path: str) -> int:
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+
+class PdfExtractor:
+    def __init__(self, max_workers: Optional[int] = None, pages_per_task: int = 8, min_pages_for_pool: int = 32):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.min_pages_for_pool = min_pages_for_pool
+        self._pool: Optional[Executor] = None
+
+    def _executor_for(self, pages: int) -> Optional[Executor]:
+        """Process pool for large page counts on multi-core hosts; None means the default thread pool"""
+        if self.max_workers < 2 or pages < self.min_pages_for_pool:
+            return None
+        if self._pool is None:
+            # Never fork the server process: it already runs thread pools and holds SQLite connections
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context(method))
+        return self._pool
+
+    def _ranges(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        return [(first, min(first + self.pages_per_task, stop)) for first in range(start, stop, self.pages_per_task)]
+
+    async def page_count(self, path: PathLike) -> int:
+        return await asyncio.to_thread(_page_count, str(path))
+
+    async def _resolve_range(self, path: PathLike, start: int, stop: Optional[int]) -> Tuple[int, int]:
+        count = await self.page_count(path)
+        stop = count if stop is None else min(stop, count)
+        return max(0, start), stop
+
+    async def extract_pages(self, path: PathLike, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        """Text of pages [start, stop), in page order"""
+        start, stop = await self._resolve_range(path, start, stop)
+        if start >= stop:
+            return []
+        executor = self._executor_for(stop - start)
+        if executor is None:
+            return await asyncio.to_thread(_extract_range, str(path), start, stop)
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, _extract_range, str(path), first, last)
+            for first, last in self._ranges(start, stop)
+        ))
+        return [page for pages in results for page in pages]
+
+    async def iter_pages(self, path: PathLike, start: int = 0, stop: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Yield page texts in order as they become available. At most
+        ``max_workers`` page ranges are extracted ahead of the consumer.
+        """
+        start, stop = await self._resolve_range(path, start, stop)
+        if start >= stop:
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._executor_for(stop - start)
+        pending: List[asyncio.Future] = []
+        ranges = iter(self._ranges(start, stop))
+        try:
+            while True:
+                while len(pending) < self.max_workers:
+                    next_range = next(ranges, None)
+                    if next_range is None:
+                        break
+                    pending.append(loop.run_in_executor(executor, _extract_range, str(path), *next_range))
+                if not pending:
+                    return
+                for page in await pending.pop(0):
+                    yield page
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,156 @@
+"""
+Client-side pacing for provider quotas (requests-per-minute and tokens-per-minute).
+
+Requests draw from two token buckets before they are sent. Token usage is
+estimated up front and reconciled against the usage the provider reports
+afterwards. Throttling responses (429 with ``Retry-After`` or a
+``google.rpc.RetryInfo`` detail) pause all outgoing requests until the
+indicated time, instead of hammering a throttled endpoint.
+"""
+import asyncio
+import logging
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger("QuotaPacer")
+
+# Rough English-text average; real counts come back in usageMetadata
+CHARS_PER_TOKEN = 4
+
+
+class TokenBucket:
+    """Continuously refilling bucket. The level may go negative to record debt from under-estimates."""
+
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (amounts above capacity wait for a full bucket)"""
+        self._refill()
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.per_second)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+    def give_back(self, amount: float) -> None:
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class QuotaPacer:
+    """
+    Paces requests to stay within ``rpm`` requests and ``tpm`` tokens per minute.
+    A limit of 0 disables that bucket.
+    """
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_pause: float = 120.0):
+        self.requests = TokenBucket(rpm, rpm / 60.0) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm, tpm / 60.0) if tpm > 0 else None
+        self.max_pause = max_pause
+        self.paused_until = 0.0
+        # Serializes waiting so callers are released in arrival order
+        self._lock = asyncio.Lock()
+        self.counters = {"paced": 0, "paced_seconds": 0.0, "throttled": 0, "reconciled_tokens": 0}
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait until one request and ``estimated_tokens`` tokens fit in the quota, then take them"""
+        async with self._lock:
+            while True:
+                delay = self.paused_until - time.monotonic()
+                if self.requests:
+                    delay = max(delay, self.requests.delay_for(1))
+                if self.tokens:
+                    delay = max(delay, self.tokens.delay_for(estimated_tokens))
+                if delay <= 0:
+                    break
+                self.counters["paced"] += 1
+                self.counters["paced_seconds"] += delay
+                await asyncio.sleep(delay)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(estimated_tokens)
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Correct the token bucket once the provider reports real usage"""
+        if not self.tokens or actual_tokens is None:
+            return
+        delta = actual_tokens - estimated_tokens
+        self.counters["reconciled_tokens"] += delta
+        if delta > 0:
+            self.tokens.take(delta)
+        elif delta < 0:
+            self.tokens.give_back(-delta)
+
+    def observe_throttle(self, response: httpx.Response) -> Optional[float]:
+        """Pause all requests for the delay a throttling response asks for; returns that delay"""
+        self.counters["throttled"] += 1
+        delay = self.parse_retry_delay(response)
+        self._log_quota_violations(response)
+        if delay is None:
+            return None
+        delay = min(delay, self.max_pause)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        logger.warning(f"Provider throttled request; pausing outgoing calls for {delay:.1f}s")
+        return delay
+
+    @staticmethod
+    def parse_retry_delay(response: httpx.Response) -> Optional[float]:
+        """Read ``Retry-After`` (seconds or HTTP date), falling back to a RetryInfo ``retryDelay`` detail"""
+        header = response.headers.get("retry-after")
+        if header:
+            try:
+                return max(0.0, float(header))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        for detail in QuotaPacer._error_details(response):
+            if detail.get("@type", "").endswith("google.rpc.RetryInfo"):
+                match = re.fullmatch(r"([\d.]+)s", str(detail.get("retryDelay", "")))
+                if match:
+                    return float(match.group(1))
+        return None
+
+    @staticmethod
+    def _error_details(response: httpx.Response) -> list:
+        try:
+            body = response.json()
+        except Exception:
+            return []
+        error = body.get("error", {}) if isinstance(body, dict) else {}
+        details = error.get("details", []) if isinstance(error, dict) else []
+        return [detail for detail in details if isinstance(detail, dict)]
+
+    @staticmethod
+    def _log_quota_violations(response: httpx.Response) -> None:
+        for detail in QuotaPacer._error_details(response):
+            if detail.get("@type", "").endswith("google.rpc.QuotaFailure"):
+                for violation in detail.get("violations", []):
+                    logger.warning(f"Quota exceeded: {violation.get('quotaMetric')} ({violation.get('quotaId')})")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "paused_for": max(0.0, self.paused_until - time.monotonic()),
+            "requests_available": self.requests.level if self.requests else None,
+            "tokens_available": self.tokens.level if self.tokens else None,
+        }
@@ -0,0 +1,227 @@
+"""
+Resilience primitives for outbound LLM HTTP calls.
+
+- RetryPolicy: classifies failures and computes exponential backoff with full jitter.
+- CircuitBreaker: fails fast while an upstream is degraded, probing it periodically.
+- LatencyTracker: rolling latency window with percentile queries.
+- ResilientTransport: combines the above and optionally hedges slow requests.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger("Resilience")
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is rejected because the circuit breaker is open."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Circuit breaker is open; upstream considered unavailable for another {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @staticmethod
+    def is_retryable_response(response: httpx.Response) -> bool:
+        return response.status_code in RETRYABLE_STATUS_CODES
+
+    @staticmethod
+    def is_retryable_exception(error: BaseException) -> bool:
+        # Timeouts, connection resets and protocol errors; not programming errors
+        return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (zero-based) retry attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls
+    fail fast for ``reset_timeout`` seconds. Then a single probe is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_request(self) -> None:
+        """Raise CircuitOpenError if the request must not be sent"""
+        if self.state == self.OPEN:
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_timeout:
+                raise CircuitOpenError(self.reset_timeout - elapsed)
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                raise CircuitOpenError(0.0)
+            self._probe_in_flight = True
+
+    def release_probe(self) -> None:
+        """Give up a probe that ended without an outcome (e.g. it was cancelled), so the next call can probe"""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("Circuit breaker closed after successful probe")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit breaker opened after {self.consecutive_failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of request latencies (seconds) with percentile queries."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the pct-th percentile, or None until enough samples were seen"""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class ResilientTransport:
+    """
+    Sends a request with classified retries, a circuit breaker and optional hedging.
+
+    ``send`` is a zero-argument coroutine factory performing one HTTP attempt, so the
+    transport works with any httpx client (and can issue duplicate hedge attempts).
+    """
+    def __init__(
+        self,
+        retry_policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = False,
+        hedge_percentile: float = 95,
+        latency: Optional[LatencyTracker] = None,
+    ):
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.latency = latency or LatencyTracker()
+        self.counters = {"requests": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "rejected": 0}
+
+    async def request(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        Send with retries. Returns the final response, which may still be an error
+        response (callers decide via ``raise_for_status``); re-raises the last
+        transport exception if every attempt failed that way.
+        """
+        self.counters["requests"] += 1
+        attempts = self.retry_policy.max_attempts
+        for attempt in range(attempts):
+            try:
+                self.breaker.before_request()
+            except CircuitOpenError:
+                self.counters["rejected"] += 1
+                raise
+            try:
+                response = await self._send_maybe_hedged(send)
+            except Exception as e:
+                self.breaker.record_failure()
+                if not self.retry_policy.is_retryable_exception(e) or attempt == attempts - 1:
+                    raise
+                logger.warning(f"Retryable transport error ({type(e).__name__}: {e}); attempt {attempt + 1}/{attempts}")
+            except BaseException:
+                # Cancelled: no verdict on the upstream, but a half-open probe must not stay claimed
+                self.breaker.release_probe()
+                raise
+            else:
+                if not self.retry_policy.is_retryable_response(response):
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if attempt == attempts - 1:
+                    return response
+                logger.warning(f"Retryable status {response.status_code}; attempt {attempt + 1}/{attempts}")
+            self.counters["retries"] += 1
+            await asyncio.sleep(self.retry_policy.backoff(attempt))
+        raise RuntimeError("unreachable")
+
+    async def _timed(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        start = time.monotonic()
+        response = await send()
+        if not self.retry_policy.is_retryable_response(response):
+            self.latency.record(time.monotonic() - start)
+        return response
+
+    async def _send_maybe_hedged(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        hedge_delay = self.latency.percentile(self.hedge_percentile) if self.hedge else None
+        if hedge_delay is None:
+            return await self._timed(send)
+
+        primary = asyncio.ensure_future(self._timed(send))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            # The primary is slower than the p95: race a duplicate against it
+            self.counters["hedges"] += 1
+            hedged = asyncio.ensure_future(self._timed(send))
+            pending.add(hedged)
+            fallback: Optional[asyncio.Future] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and not self.retry_policy.is_retryable_response(task.result()):
+                        if task is hedged:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    fallback = fallback or task
+            # Both attempts failed; surface the first failure to the retry loop
+            return fallback.result()
+        finally:
+            # Also reached when the caller is cancelled mid-wait; no request may outlive it
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "circuit_state": self.breaker.state,
+            "p95_latency": self.latency.percentile(95),
+        }
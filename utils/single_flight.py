@@ -0,0 +1,91 @@
+"""
+Single-flight coalescing for LLM clients.
+
+Concurrent calls with an identical normalized request share one upstream call;
+its result (or exception) is fanned out to every waiter.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger("SingleFlight")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlightClient:
+    """
+    Drop-in wrapper that coalesces identical in-flight ``generate_response`` calls.
+
+    The upstream call runs in its own task so that one waiter going away does not
+    cancel it for the others; it is only cancelled once every waiter has left.
+    """
+    def __init__(self, client):
+        self.client = client
+        self._inflight: Dict[str, _Flight] = {}
+        self.counters = {"upstream_calls": 0, "coalesced": 0, "abandoned": 0}
+
+    @property
+    def model(self) -> str:
+        return getattr(self.client, "model", type(self.client).__name__)
+
+    @staticmethod
+    def normalize_key(prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int) -> str:
+        """Build a key that treats insignificant whitespace and numeric types as equal"""
+        return json.dumps([
+            (system_prompt or "").strip(),
+            prompt.strip(),
+            round(float(temperature), 4),
+            int(max_tokens),
+        ], ensure_ascii=False)
+
+    async def generate_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> dict:
+        key = self.normalize_key(prompt, system_prompt, temperature, max_tokens)
+        flight = self._inflight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(
+                self.client.generate_response(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens)
+            )
+            flight = _Flight(task)
+            self._inflight[key] = flight
+            task.add_done_callback(lambda _, key=key, flight=flight: self._forget(key, flight))
+            self.counters["upstream_calls"] += 1
+        else:
+            self.counters["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Last interested caller is gone; stop spending quota on the upstream call
+                self.counters["abandoned"] += 1
+                flight.task.cancel()
+                self._forget(key, flight)
+            raise
+        finally:
+            flight.waiters -= 1
+        # Each waiter gets its own copy, since callers may mutate the response
+        return dict(result) if isinstance(result, dict) else result
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    async def stream_response(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 1024) -> AsyncIterator[str]:
+        # Streams are consumed incrementally by one caller, so they are not coalesced
+        async for chunk in self.client.stream_response(prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=max_tokens):
+            yield chunk
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "inflight": len(self._inflight)}
+
+    async def close(self):
+        await self.client.close()
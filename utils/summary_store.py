@@ -0,0 +1,106 @@
+"""
+Persistent store of per-chunk summaries for incremental re-summarization.
+
+Keys hash the chunk text together with everything that shapes its summary
+(model and map-phase prompt, which carries the format parameters). When a
+lightly edited document is summarized again, only chunks whose key is missing
+go back to the LLM.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator
+
+logger = logging.getLogger("SummaryStore")
+
+
+class ChunkSummaryStore:
+    def __init__(self, db_path: str = "data/chunk_summaries.db", max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS chunk_summaries (
+                key TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_summaries_accessed ON chunk_summaries (accessed_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(chunk: str, model: str, system_prompt: str) -> str:
+        raw = json.dumps([model, system_prompt, chunk], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get_many(self, keys: list) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        with self._connect() as conn:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(conn.execute(
+                    f"SELECT key, summary FROM chunk_summaries WHERE key IN ({placeholders})", batch
+                ).fetchall())
+            if found:
+                now = time.time()
+                conn.executemany("UPDATE chunk_summaries SET accessed_at = ? WHERE key = ?", [(now, key) for key in found])
+        return found
+
+    def _set_many(self, summaries: Dict[str, str]) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunk_summaries (key, summary, accessed_at) VALUES (?, ?, ?)",
+                [(key, summary, now) for key, summary in summaries.items()]
+            )
+            overflow = conn.execute("SELECT COUNT(*) FROM chunk_summaries").fetchone()[0] - self.max_entries
+            if overflow <= 0:
+                return 0
+            return conn.execute(
+                "DELETE FROM chunk_summaries WHERE key IN (SELECT key FROM chunk_summaries ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            ).rowcount
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Return the stored summaries for whichever of ``keys`` are present"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        try:
+            found = await asyncio.to_thread(self._get_many, keys)
+        except sqlite3.Error as e:
+            logger.warning(f"Chunk summary store read failed: {e}")
+            found = {}
+        self.counters["hits"] += len(found)
+        self.counters["misses"] += len(keys) - len(found)
+        return found
+
+    async def set_many(self, summaries: Dict[str, str]) -> None:
+        if not summaries:
+            return
+        try:
+            self.counters["evictions"] += await asyncio.to_thread(self._set_many, summaries)
+        except sqlite3.Error as e:
+            logger.warning(f"Chunk summary store write failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counters)
@@ -0,0 +1,80 @@
+"""
+Token-budgeted text chunking for long documents.
+
+Chunks are built from whole paragraphs (page breaks, i.e. the form feeds
+produced by FileHandler.read_pdf, count as paragraph breaks). Sentence and hard
+splits are used only for single paragraphs that exceed the budget on their own.
+Boundaries are picked from the content itself, so an edit only changes the
+chunks around it and the rest keep their hashes (and cached summaries).
+"""
+import hashlib
+import re
+from typing import List
+
+from utils.quota_pacer import CHARS_PER_TOKEN
+
+PAGE_BREAK = "\f"
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _split_oversized(block: str, max_chars: int) -> List[str]:
+    """Split a single block that exceeds the budget, on sentences where possible"""
+    pieces: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(block):
+        while len(sentence) > max_chars:
+            # A "sentence" longer than the budget (tables, code, no punctuation): hard split
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _is_anchor(paragraph: str, divisor: int) -> bool:
+    digest = hashlib.blake2b(paragraph.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % divisor == 0
+
+
+def split_into_chunks(text: str, max_tokens: int, anchor_divisor: int = 4) -> List[str]:
+    """
+    Content-defined chunking: a chunk ends after any paragraph whose hash is an
+    "anchor" (about one in ``anchor_divisor``) once it holds a quarter of the
+    budget, or when the next paragraph would exceed ``max_tokens``. Boundaries
+    depend only on nearby paragraphs, so they re-synchronize right after an edit.
+    """
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    min_chars = max_chars // 4
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+
+    for paragraph in (p.strip() for p in _PARAGRAPH_BREAK.split(text.replace(PAGE_BREAK, "\n\n"))):
+        if not paragraph:
+            continue
+        blocks = [paragraph] if len(paragraph) <= max_chars else _split_oversized(paragraph, max_chars)
+        for block in blocks:
+            if current and current_len + len(block) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current, current_len = [], 0
+            current.append(block)
+            current_len += len(block) + 2
+            if current_len >= min_chars and _is_anchor(block, anchor_divisor):
+                chunks.append("\n\n".join(current))
+                current, current_len = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
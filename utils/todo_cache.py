@@ -0,0 +1,240 @@
+"""
+Write-back, per-user in-memory cache in front of a todo storage engine.
+
+Each user's tasks are loaded once and then served from memory. Mutations for a
+user are serialized by that user's asyncio lock, applied in memory, and
+recorded as dirty. A flush is scheduled ``flush_delay`` seconds after the
+first unflushed mutation, so a burst of changes is written to the engine as
+one batch (``apply_changes``). Users beyond ``max_users`` are evicted in LRU
+order once they have no unflushed changes. ``close()`` flushes everything and
+must run on shutdown. Queries are answered from a per-user ``TaskIndex``,
+built on the user's first query and kept current by every mutation. Search
+runs on the engine's full-text index after flushing the user's changes.
+
+The cache assumes it is the only writer of its users' tasks, i.e. a single
+app worker: it allocates IDs from its own counter and writes batches back by
+ID. It is therefore off by default; enable it with TODO_CACHE=true only when
+running one worker.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from utils.todo_query import TaskIndex, TaskQuery
+from utils.todo_search import SearchUnavailableError
+from utils.todo_store import Plan, title_key
+
+logger = logging.getLogger("TodoCache")
+
+
+class _UserEntry:
+    __slots__ = ("tasks", "titles", "next_id", "dirty_ids", "deleted_ids", "flush_task", "flush_lock", "index")
+
+    def __init__(self, tasks: Dict[int, dict], next_id: int):
+        self.tasks = tasks
+        # Normalized title -> task ID, for constant-time duplicate checks
+        self.titles = {title_key(task["title"]): task_id for task_id, task in tasks.items()}
+        self.next_id = max(next_id, max(tasks.keys(), default=0) + 1)
+        self.dirty_ids: Set[int] = set()
+        self.deleted_ids: Set[int] = set()
+        self.flush_task: Optional[asyncio.Task] = None
+        self.flush_lock = asyncio.Lock()
+        self.index: Optional[TaskIndex] = None
+
+    @property
+    def is_dirty(self) -> bool:
+        return bool(self.dirty_ids or self.deleted_ids)
+
+    def put(self, task: dict) -> None:
+        """Store a new or changed task and mark it for the next flush"""
+        previous = self.tasks.get(task["id"])
+        if previous is not None:
+            self._drop_title(previous)
+            if self.index is not None:
+                self.index.remove(previous)
+        self.tasks[task["id"]] = task
+        self.titles[title_key(task["title"])] = task["id"]
+        self.next_id = max(self.next_id, task["id"] + 1)
+        if self.index is not None:
+            self.index.add(task)
+        self.dirty_ids.add(task["id"])
+        self.deleted_ids.discard(task["id"])
+
+    def remove(self, task_id: int) -> bool:
+        task = self.tasks.pop(task_id, None)
+        if task is None:
+            return False
+        self._drop_title(task)
+        if self.index is not None:
+            self.index.remove(task)
+        self.dirty_ids.discard(task_id)
+        self.deleted_ids.add(task_id)
+        return True
+
+    def _drop_title(self, task: dict) -> None:
+        key = title_key(task["title"])
+        if self.titles.get(key) == task["id"]:
+            del self.titles[key]
+
+
+class WriteBackTodoCache:
+    def __init__(self, store, flush_delay: float = 0.5, max_users: int = 1000):
+        self.store = store
+        self.flush_delay = flush_delay
+        self.max_users = max_users
+        self._entries: "OrderedDict[str, _UserEntry]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.counters = {"loads": 0, "hits": 0, "flushes": 0, "flush_errors": 0, "evictions": 0}
+
+    def _lock(self, username: str) -> asyncio.Lock:
+        lock = self._locks.get(username)
+        if lock is None:
+            lock = self._locks[username] = asyncio.Lock()
+        return lock
+
+    async def _entry(self, username: str) -> _UserEntry:
+        """The user's cache entry, loading it from the engine on a miss; call with the user's lock held"""
+        entry = self._entries.get(username)
+        if entry is not None:
+            self._entries.move_to_end(username)
+            self.counters["hits"] += 1
+            return entry
+        tasks = await asyncio.to_thread(self.store.load_tasks, username)
+        # Engines with a persistent counter know IDs past the highest remaining task
+        next_id = await asyncio.to_thread(self.store.next_id, username) if hasattr(self.store, "next_id") else 1
+        entry = self._entries[username] = _UserEntry(tasks, next_id)
+        self.counters["loads"] += 1
+        self._evict()
+        return entry
+
+    @asynccontextmanager
+    async def _mutating(self, username: str) -> AsyncIterator[_UserEntry]:
+        async with self._lock(username):
+            entry = await self._entry(username)
+            yield entry
+            if entry.is_dirty and entry.flush_task is None:
+                entry.flush_task = asyncio.create_task(self._flush_later(username, entry))
+
+    def _evict(self) -> None:
+        for username in list(self._entries):
+            if len(self._entries) <= self.max_users:
+                break
+            entry = self._entries[username]
+            if entry.is_dirty or entry.flush_task is not None or self._lock(username).locked():
+                continue
+            del self._entries[username]
+            self._locks.pop(username, None)
+            self.counters["evictions"] += 1
+
+    async def _flush_later(self, username: str, entry: _UserEntry) -> None:
+        try:
+            await asyncio.sleep(self.flush_delay)
+        except asyncio.CancelledError:
+            # flush_all() flushes explicitly
+            return
+        # Once started, a flush runs to completion so batches reach the engine in order
+        await asyncio.shield(self._flush(username, entry))
+
+    async def _flush(self, username: str, entry: _UserEntry) -> None:
+        # The flush lock keeps this user's batches in order, while the user's
+        # mutation lock is only held long enough to take a snapshot
+        async with entry.flush_lock:
+            async with self._lock(username):
+                entry.flush_task = None
+                upserts = [dict(entry.tasks[task_id]) for task_id in entry.dirty_ids if task_id in entry.tasks]
+                deleted_ids = list(entry.deleted_ids)
+                entry.dirty_ids.clear()
+                entry.deleted_ids.clear()
+            if not upserts and not deleted_ids:
+                return
+            try:
+                await asyncio.to_thread(self.store.apply_changes, username, upserts, deleted_ids)
+                self.counters["flushes"] += 1
+            except Exception as e:
+                logger.error(f"Failed to flush todos for {username}; will retry: {e}")
+                self.counters["flush_errors"] += 1
+                async with self._lock(username):
+                    # Re-mark unless a newer mutation superseded the failed batch
+                    entry.dirty_ids.update(task["id"] for task in upserts if task["id"] not in entry.deleted_ids)
+                    entry.deleted_ids.update(task_id for task_id in deleted_ids if task_id not in entry.dirty_ids)
+                    if entry.flush_task is None:
+                        entry.flush_task = asyncio.create_task(self._flush_later(username, entry))
+        self._evict()
+
+    # --- Same interface as AsyncTodoStore ---
+    async def load_tasks(self, username: str) -> Dict[int, dict]:
+        async with self._lock(username):
+            entry = await self._entry(username)
+            return dict(entry.tasks)
+
+    async def add_task(self, username: str, task: dict) -> Optional[dict]:
+        """Store a new task, or return None if the user already has one with this title"""
+        async with self._mutating(username) as entry:
+            # Checked under the same lock as the insert, so concurrent duplicates cannot both pass
+            if title_key(task["title"]) in entry.titles:
+                return None
+            task = {**task, "id": entry.next_id}
+            entry.put(task)
+            return dict(task)
+
+    async def set_completed(self, username: str, task_id: int, completed: bool = True) -> bool:
+        async with self._mutating(username) as entry:
+            if task_id not in entry.tasks:
+                return False
+            entry.put({**entry.tasks[task_id], "completed": completed})
+            return True
+
+    async def delete_task(self, username: str, task_id: int) -> bool:
+        async with self._mutating(username) as entry:
+            return entry.remove(task_id)
+
+    async def transact(self, username: str, plan: Plan) -> Any:
+        """Apply a plan's changes in memory; they are flushed together as one batch"""
+        async with self._mutating(username) as entry:
+            upserts, deleted_ids, result = plan(dict(entry.tasks), entry.next_id)
+            for task_id in deleted_ids:
+                entry.remove(task_id)
+            for task in upserts:
+                entry.put(task)
+            return result
+
+    async def search_tasks(self, username: str, text: str, limit: int = 20) -> List[dict]:
+        if not hasattr(self.store, "search_tasks"):
+            raise SearchUnavailableError("Todo search needs TODO_STORAGE=sqlite")
+        entry = self._entries.get(username)
+        if entry is not None and entry.is_dirty:
+            # Write pending changes first so the engine's index reflects them
+            if entry.flush_task is not None:
+                entry.flush_task.cancel()
+            await self._flush(username, entry)
+        return await asyncio.to_thread(self.store.search_tasks, username, text, limit)
+
+    async def query_tasks(self, username: str, query: TaskQuery) -> Dict[str, Any]:
+        async with self._lock(username):
+            entry = await self._entry(username)
+            if entry.index is None:
+                entry.index = TaskIndex(entry.tasks)
+            return entry.index.query(query)
+
+    def peek(self, username: str) -> Optional[Dict[int, dict]]:
+        """Cached tasks for a user without loading or locking, or None if not cached"""
+        entry = self._entries.get(username)
+        return dict(entry.tasks) if entry is not None else None
+
+    async def flush_all(self) -> None:
+        for username, entry in list(self._entries.items()):
+            if entry.flush_task is not None:
+                entry.flush_task.cancel()
+            await self._flush(username, entry)
+
+    async def close(self) -> None:
+        await self.flush_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "users": len(self._entries),
+            "dirty_users": sum(entry.is_dirty for entry in self._entries.values()),
+        }
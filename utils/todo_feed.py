@@ -0,0 +1,130 @@
+"""
+Per-user change feed for todos.
+
+Every change is published as an event with a sequence number that only ever
+grows for that user, and the most recent events are kept in memory so a
+client that reconnects with the last sequence it saw receives just what it
+missed. Sequence numbers start from the process start time in microseconds,
+so they also keep growing across restarts. When the missed events are no
+longer available (an older sequence number, a restart, or a subscriber that
+fell too far behind), the client is told to reload the full list instead.
+
+The feed lives in one process, like the write-back cache, so it assumes a
+single app worker.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, Optional, Set
+
+logger = logging.getLogger("TodoChangeFeed")
+
+# Sent instead of the missed events when they cannot be replayed
+RESET = "reset"
+# Sent once the subscriber has caught up and further events are live
+READY = "ready"
+
+
+class _UserFeed:
+    __slots__ = ("seq", "history", "subscribers")
+
+    def __init__(self, seq: int, history_size: int):
+        self.seq = seq
+        self.history: deque = deque(maxlen=history_size)
+        self.subscribers: Set[asyncio.Queue] = set()
+
+
+class TodoChangeFeed:
+    def __init__(self, history_size: int = 1000, queue_size: int = 1000):
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self._base_seq = time.time_ns() // 1000
+        self._users: Dict[str, _UserFeed] = {}
+        self.counters = {"published": 0, "replayed": 0, "resets": 0, "dropped_subscribers": 0}
+
+    def _feed(self, username: str) -> _UserFeed:
+        feed = self._users.get(username)
+        if feed is None:
+            feed = self._users[username] = _UserFeed(self._base_seq, self.history_size)
+        return feed
+
+    def latest_seq(self, username: str) -> int:
+        """Sequence number of the user's latest event; resuming from it replays nothing"""
+        return self._feed(username).seq
+
+    def publish(self, username: str, event_type: str, **payload) -> dict:
+        """Record an event and hand it to the user's live subscribers"""
+        feed = self._feed(username)
+        feed.seq += 1
+        event = {"seq": feed.seq, "type": event_type, **payload}
+        feed.history.append(event)
+        self.counters["published"] += 1
+        for queue in list(feed.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up; end its stream with a reset rather than buffer without bound
+                feed.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.counters["dropped_subscribers"] += 1
+        return event
+
+    def _replay(self, feed: _UserFeed, after: int) -> Optional[list]:
+        """Events after ``after``, or None if some of them are gone"""
+        if after == feed.seq:
+            return []
+        if after > feed.seq or not feed.history or feed.history[0]["seq"] > after + 1:
+            return None
+        return [event for event in feed.history if event["seq"] > after]
+
+    async def subscribe(self, username: str, after: Optional[int] = None, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[dict]]:
+        """
+        The user's events after sequence ``after`` (only new ones if None), a
+        ``ready`` event, then live events until the caller stops iterating.
+        Yields a ``reset`` event, carrying the current sequence, whenever
+        events were missed, and None after ``heartbeat`` seconds without events.
+        """
+        feed = self._feed(username)
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        feed.subscribers.add(queue)
+        try:
+            last = feed.seq if after is None else after
+            missed = self._replay(feed, last)
+            if missed is None:
+                self.counters["resets"] += 1
+                last = feed.seq
+                yield {"seq": last, "type": RESET}
+            else:
+                self.counters["replayed"] += len(missed)
+                for event in missed:
+                    last = event["seq"]
+                    yield event
+            yield {"seq": last, "type": READY}
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is None:
+                    self.counters["resets"] += 1
+                    feed.subscribers.add(queue)
+                    last = feed.seq
+                    yield {"seq": last, "type": RESET}
+                    continue
+                # Already sent during the replay
+                if event["seq"] > last:
+                    last = event["seq"]
+                    yield event
+        finally:
+            feed.subscribers.discard(queue)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self.counters,
+            "users": len(self._users),
+            "subscribers": sum(len(feed.subscribers) for feed in self._users.values()),
+        }
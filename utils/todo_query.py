@@ -0,0 +1,205 @@
+"""
+Filtering, sorting and keyset pagination over todo tasks.
+
+``TaskQuery`` holds one request's filters and its position: a cursor encodes
+the sort key and ID of the last task on the previous page, so each page
+resumes right after it instead of skipping an offset. Engines answer queries
+from their own indexes (``SqliteTodoStore.query_tasks``); in-memory task
+lists use ``TaskIndex``, which keeps tasks sorted per sort key plus posting
+sets for tags and priority.
+
+Dates are compared as ISO strings, which order the same as the datetimes.
+"""
+import base64
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import orjson
+
+SORT_FIELDS = ("id", "created_at", "due_date", "priority")
+STATUSES = ("completed", "overdue", "due_soon", "pending")
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+# Sorts after every ISO date, so tasks without a due date come last
+NO_DUE_DATE = "~"
+DUE_SOON = timedelta(days=2)
+
+
+def task_status(task: dict, now: str, soon: str) -> str:
+    """completed, overdue, due_soon or pending, given ISO timestamps for now and now + DUE_SOON"""
+    if task.get("completed"):
+        return "completed"
+    due_date = task.get("due_date")
+    if not due_date or due_date >= soon:
+        return "pending"
+    return "overdue" if due_date < now else "due_soon"
+
+
+def _local_iso(value: datetime) -> str:
+    # Stored dates are naive local time
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat()
+
+
+def sort_key(task: dict, sort: str) -> Any:
+    if sort == "due_date":
+        return task.get("due_date") or NO_DUE_DATE
+    if sort == "priority":
+        return PRIORITY_RANK.get(task.get("priority"), len(PRIORITY_RANK))
+    return task[sort]
+
+
+class TaskQuery:
+    def __init__(
+        self,
+        completed: Optional[bool] = None,
+        priority: Optional[str] = None,
+        tag: Optional[str] = None,
+        due_before: Optional[datetime] = None,
+        due_after: Optional[datetime] = None,
+        status: Optional[str] = None,
+        sort: str = "id",
+        descending: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ):
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort field: {sort}")
+        if status is not None and status not in STATUSES:
+            raise ValueError(f"Unknown status: {status}")
+        self.completed = completed
+        self.priority = priority
+        self.tag = tag
+        self.status = status
+        self.sort = sort
+        self.descending = descending
+        self.limit = limit
+        now = now or datetime.now()
+        self.now = now.isoformat()
+        self.soon = (now + DUE_SOON).isoformat()
+        self.position = self._decode_cursor(cursor) if cursor else None
+
+        # Due-date bounds [due_min, due_max), narrowed further by the status filter
+        self.due_min = _local_iso(due_after) if due_after else None
+        self.due_max = _local_iso(due_before) if due_before else None
+        if status == "overdue":
+            self.due_max = min(filter(None, (self.due_max, self.now)))
+        elif status == "due_soon":
+            self.due_min = max(filter(None, (self.due_min, self.now)))
+            self.due_max = min(filter(None, (self.due_max, self.soon)))
+
+    def _decode_cursor(self, cursor: str) -> Tuple[Any, int]:
+        try:
+            sort, key, task_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid cursor") from e
+        if sort != self.sort or not isinstance(task_id, int):
+            raise ValueError("Cursor does not match the sort order")
+        return key, task_id
+
+    def cursor_for(self, task: dict) -> str:
+        """Cursor resuming after ``task``"""
+        return base64.urlsafe_b64encode(orjson.dumps([self.sort, sort_key(task, self.sort), task["id"]])).decode()
+
+    @property
+    def has_due_bounds(self) -> bool:
+        return self.due_min is not None or self.due_max is not None
+
+    def matches(self, task: dict) -> bool:
+        if self.completed is not None and bool(task.get("completed")) != self.completed:
+            return False
+        if self.priority is not None and task.get("priority") != self.priority:
+            return False
+        if self.tag is not None and self.tag not in (task.get("tags") or ()):
+            return False
+        if self.has_due_bounds:
+            due_date = task.get("due_date")
+            if not due_date or (self.due_min and due_date < self.due_min) or (self.due_max and due_date >= self.due_max):
+                return False
+        return self.status is None or task_status(task, self.now, self.soon) == self.status
+
+    def page(self, tasks: List[dict]) -> Dict[str, Any]:
+        """Response for up to limit + 1 matching tasks in order; the extra one signals a next page"""
+        has_more = self.limit is not None and len(tasks) > self.limit
+        tasks = tasks[:self.limit] if has_more else tasks
+        for task in tasks:
+            task["status"] = task_status(task, self.now, self.soon)
+        return {"tasks": tasks, "next_cursor": self.cursor_for(tasks[-1]) if has_more else None}
+
+
+class TaskIndex:
+    """
+    Secondary indexes over one user's tasks. Sorted (key, id) lists are built
+    per sort field on first use and kept up to date by ``add``/``remove``.
+    """
+
+    def __init__(self, tasks: Dict[int, dict]):
+        self.tasks = tasks
+        self._orders: Dict[str, List[Tuple[Any, int]]] = {}
+        self._tags: Dict[str, Set[int]] = {}
+        self._priorities: Dict[Optional[str], Set[int]] = {}
+        for task in tasks.values():
+            self._post(task)
+
+    def _post(self, task: dict) -> None:
+        for tag in task.get("tags") or ():
+            self._tags.setdefault(tag, set()).add(task["id"])
+        self._priorities.setdefault(task.get("priority"), set()).add(task["id"])
+
+    def _order(self, sort: str) -> List[Tuple[Any, int]]:
+        order = self._orders.get(sort)
+        if order is None:
+            order = self._orders[sort] = sorted((sort_key(task, sort), task_id) for task_id, task in self.tasks.items())
+        return order
+
+    def add(self, task: dict) -> None:
+        """Index a task just stored in ``tasks``"""
+        self._post(task)
+        for sort, order in self._orders.items():
+            insort(order, (sort_key(task, sort), task["id"]))
+
+    def remove(self, task: dict) -> None:
+        """Unindex a task before it is replaced or deleted"""
+        for tag in task.get("tags") or ():
+            self._tags.get(tag, set()).discard(task["id"])
+        self._priorities.get(task.get("priority"), set()).discard(task["id"])
+        for sort, order in self._orders.items():
+            entry = (sort_key(task, sort), task["id"])
+            position = bisect_left(order, entry)
+            if position < len(order) and order[position] == entry:
+                del order[position]
+
+    def query(self, query: TaskQuery) -> Dict[str, Any]:
+        # A tag or priority filter narrows candidates to its posting set; otherwise walk the sort order
+        postings = []
+        if query.tag is not None:
+            postings.append(self._tags.get(query.tag, set()))
+        if query.priority is not None:
+            postings.append(self._priorities.get(query.priority, set()))
+        if postings:
+            order = sorted((sort_key(self.tasks[task_id], query.sort), task_id) for task_id in min(postings, key=len))
+        else:
+            order = self._order(query.sort)
+
+        start, end = 0, len(order)
+        if query.sort == "due_date" and query.has_due_bounds:
+            start = bisect_left(order, (query.due_min,)) if query.due_min else 0
+            end = bisect_left(order, (query.due_max or NO_DUE_DATE,))
+        if query.position is not None:
+            if query.descending:
+                end = min(end, bisect_left(order, query.position))
+            else:
+                start = max(start, bisect_right(order, query.position))
+
+        wanted = None if query.limit is None else query.limit + 1
+        positions = range(end - 1, start - 1, -1) if query.descending else range(start, end)
+        found = []
+        for position in positions:
+            task = self.tasks[order[position][1]]
+            if query.matches(task):
+                found.append(dict(task))
+                if wanted is not None and len(found) >= wanted:
+                    break
+        return query.page(found)
@@ -0,0 +1,118 @@
+"""
+Full-text search over todos with SQLite FTS5.
+
+``tasks_fts`` indexes each task's title, description and tags, plus an
+``owner`` token derived from the username so a query only touches the
+searching user's postings, and the task's ``task_id`` (unindexed) to join
+back on ``(username, id)``; the implicit ``rowid`` of ``tasks`` is not used
+because VACUUM may renumber it. Triggers on ``tasks`` keep it in step with
+every insert, update and delete. User input is turned into quoted FTS5 terms
+(``build_match_query``), so operators and punctuation cannot break the query;
+a trailing ``*`` makes a term a prefix query. Results are ranked by BM25 with
+title matches weighted highest. Snippets are HTML: the task text is escaped
+and only the match markers are inserted as markup.
+"""
+import html
+import logging
+import re
+import sqlite3
+from typing import List
+
+logger = logging.getLogger("TodoSearch")
+
+_TERM = re.compile(r"\w+\*?")
+# BM25 weights for owner, title, description, tags
+_BM25 = "bm25(tasks_fts, 0.0, 10.0, 2.0, 5.0)"
+# Placed around matches by SQLite and swapped for the real markers after escaping the text
+_START, _END = "\x02", "\x03"
+
+
+class SearchUnavailableError(Exception):
+    """Raised when the storage engine has no full-text index to search."""
+
+
+def _to_html(text: str, mark_start: str, mark_end: str) -> str:
+    return html.escape(text).replace(_START, mark_start).replace(_END, mark_end)
+
+
+def _indexed_values(row: str) -> str:
+    """SQL for the indexed columns of tasks row ``row``; tags are stored as JSON, so index them as plain words"""
+    tags = f"replace(replace(replace(replace({row}.tags, '[', ''), ']', ''), '\"', ''), ',', ' ')"
+    return f"'u' || hex({row}.username), {row}.title, COALESCE({row}.description, ''), {tags}"
+
+
+def owner_token(username: str) -> str:
+    """Single FTS token for a username, as written by the triggers (the tokenizer folds case)"""
+    return "u" + username.encode().hex()
+
+
+def build_match_query(username: str, text: str) -> str:
+    """FTS5 MATCH expression for the user's tasks containing every term in text"""
+    terms = [f'"{term[:-1]}"*' if term.endswith("*") else f'"{term}"' for term in _TERM.findall(text)]
+    if not terms:
+        raise ValueError("Search query has no searchable terms")
+    return f"owner : {owner_token(username)} AND {{title description tags}} : ({' AND '.join(terms)})"
+
+
+def ensure_schema(conn: sqlite3.Connection) -> bool:
+    """Create the index and its triggers; False if this SQLite build lacks FTS5"""
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks_fts)")}
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Todo search disabled, FTS5 is unavailable: {e}")
+        return False
+    if columns and "task_id" not in columns:
+        # Indexes created before task_id was stored are keyed on tasks.rowid; rebuild them
+        conn.execute("DROP TABLE tasks_fts")
+        for trigger in ("insert", "delete", "update"):
+            conn.execute(f"DROP TRIGGER IF EXISTS tasks_fts_{trigger}")
+        columns = set()
+    try:
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+            "owner, title, description, tags, task_id UNINDEXED, "
+            "prefix = '2 3', tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Todo search disabled, FTS5 is unavailable: {e}")
+        return False
+    insert = f"INSERT INTO tasks_fts (owner, title, description, tags, task_id) VALUES ({_indexed_values('new')}, new.id);"
+    # The owner match narrows the scan to the user's own rows before task_id is compared
+    delete = "DELETE FROM tasks_fts WHERE tasks_fts MATCH 'owner : u' || hex(old.username) AND task_id = old.id;"
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN {insert} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN {delete} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE ON tasks BEGIN {delete} {insert} END")
+    if not columns:
+        # Index tasks stored before search existed
+        conn.execute(f"INSERT INTO tasks_fts (owner, title, description, tags, task_id) SELECT {_indexed_values('tasks')}, tasks.id FROM tasks")
+    return True
+
+
+def search(
+    conn: sqlite3.Connection,
+    username: str,
+    text: str,
+    columns: str,
+    limit: int = 20,
+    mark_start: str = "<mark>",
+    mark_end: str = "</mark>",
+) -> List[tuple]:
+    """
+    Best-ranked matches as rows of ``columns`` (selected from ``tasks``),
+    followed by an HTML-escaped snippet with matches wrapped in the markers
+    and the score (higher is better).
+    """
+    # snippet() over all columns would pick the owner column, which every match hits
+    rows = conn.execute(
+        f"SELECT {columns}, highlight(tasks_fts, 1, ?1, ?2), snippet(tasks_fts, 2, ?1, ?2, '…', 12), "
+        f"highlight(tasks_fts, 3, ?1, ?2), -{_BM25} "
+        "FROM tasks_fts JOIN tasks ON tasks.username = ?5 AND tasks.id = tasks_fts.task_id "
+        f"WHERE tasks_fts MATCH ?3 ORDER BY {_BM25} LIMIT ?4",
+        (_START, _END, build_match_query(username, text), limit, username)
+    ).fetchall()
+    results = []
+    for row in rows:
+        title, description, tags, score = row[-4:]
+        snippet = next((part for part in (title, description, tags) if _START in part), title)
+        results.append(row[:-4] + (_to_html(snippet, mark_start, mark_end), score))
+    return results
@@ -0,0 +1,678 @@
+"""
+Storage engines for TodoManager.
+
+Engines store tasks as plain dicts in the ``Task.to_dict()`` format and are
+synchronous. ``add_task`` checks for a duplicate title in the same write that
+stores the task, and returns None instead of storing a duplicate.
+``transact(username, plan)`` runs a ``Plan`` over a working copy
+of the user's tasks and stores the changes it returns in one write. TodoManager reaches them via ``AsyncTodoStore`` (one worker-thread
+call per operation) or ``WriteBackTodoCache`` (see utils.todo_cache).
+
+- ``JsonTodoStore``: one JSON file per user (the original format, now written
+  compactly with orjson; indented files still load). Every mutation rewrites
+  the user's whole file.
+
+Every engine keeps a per-user ID counter that only grows, so the ID of a
+deleted task is never handed out again, even after a restart.
+- ``JournalTodoStore``: a per-user JSON snapshot plus an append-only log of
+  operations. A mutation appends one record; logs are folded into the
+  snapshot in the background once they grow past a threshold.
+- ``SqliteTodoStore``: a single WAL-mode SQLite database shared by all workers,
+  with indexed single-row mutations, indexed queries (see utils.todo_query)
+  and full-text search (see utils.todo_search).
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+from utils import todo_search
+from utils.todo_query import NO_DUE_DATE, PRIORITY_RANK, TaskIndex, TaskQuery
+
+logger = logging.getLogger("TodoStore")
+
+# Key of the ID counter in a JsonTodoStore file; task keys are always numeric
+NEXT_ID_KEY = "next_id"
+
+# Given a working copy of a user's tasks (which it may modify, but not the task
+# dicts in it) and the next free ID, returns (upserted tasks, deleted IDs, result)
+Plan = Callable[[Dict[int, dict], int], Tuple[List[dict], List[int], Any]]
+
+
+def title_key(title: str) -> str:
+    """Normalized title used for duplicate detection"""
+    return title.strip().lower()
+
+
+class JsonTodoStore:
+    """
+    One JSON file per user. Read-modify-write calls are serialized per user
+    within this process (they run on worker threads), not across processes.
+    """
+
+    def __init__(self, base_dir: str = "data/todos"):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, username: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(username, threading.Lock())
+
+    def _get_user_file(self, username: str) -> Path:
+        return self.base_dir / f"{username}.json"
+
+    def _read(self, username: str) -> Tuple[Dict[int, dict], int]:
+        """The user's tasks and next free ID"""
+        user_file = self._get_user_file(username)
+        if not user_file.exists():
+            return {}, 1
+        with open(user_file, 'rb') as f:
+            data = orjson.loads(f.read())
+        # Files written before the counter was stored derive it from the tasks
+        stored_next_id = data.pop(NEXT_ID_KEY, 1)
+        tasks = {int(task_id): task for task_id, task in data.items()}
+        return tasks, max(stored_next_id, max(tasks.keys(), default=0) + 1)
+
+    def load_tasks(self, username: str) -> Dict[int, dict]:
+        return self._read(username)[0]
+
+    def next_id(self, username: str) -> int:
+        return self._read(username)[1]
+
+    def _save_tasks(self, username: str, tasks: Dict[int, dict], next_id: int) -> None:
+        # Write to a temp file and rename, so a crash never leaves a truncated file
+        user_file = self._get_user_file(username)
+        fd, tmp_name = tempfile.mkstemp(dir=self.base_dir, prefix=f".{user_file.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(orjson.dumps({**tasks, NEXT_ID_KEY: next_id}, option=orjson.OPT_NON_STR_KEYS))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, user_file)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def add_task(self, username: str, task: dict) -> Optional[dict]:
+        with self._lock(username):
+            tasks, next_id = self._read(username)
+            key = title_key(task["title"])
+            if any(title_key(existing["title"]) == key for existing in tasks.values()):
+                return None
+            task = {**task, "id": next_id}
+            tasks[task["id"]] = task
+            self._save_tasks(username, tasks, next_id + 1)
+        return task
+
+    def set_completed(self, username: str, task_id: int, completed: bool = True) -> bool:
+        with self._lock(username):
+            tasks, next_id = self._read(username)
+            if task_id not in tasks:
+                return False
+            tasks[task_id]["completed"] = completed
+            self._save_tasks(username, tasks, next_id)
+        return True
+
+    def delete_task(self, username: str, task_id: int) -> bool:
+        with self._lock(username):
+            tasks, next_id = self._read(username)
+            if task_id not in tasks:
+                return False
+            del tasks[task_id]
+            self._save_tasks(username, tasks, next_id)
+        return True
+
+    def usernames(self) -> List[str]:
+        return sorted(path.stem for path in self.base_dir.glob("*.json"))
+
+    def open_due_tasks(self) -> Iterator[Tuple[str, dict]]:
+        """(username, task) for every open task with a due date, across all users"""
+        for username in self.usernames():
+            for task in self.load_tasks(username).values():
+                if task.get("due_date") and not task.get("completed"):
+                    yield username, task
+
+    def apply_changes(self, username: str, upserts: List[dict], deleted_ids: List[int]) -> None:
+        """Write a batch of upserted and deleted tasks in one file rewrite"""
+        self.transact(username, lambda tasks, next_id: (upserts, deleted_ids, None))
+
+    def transact(self, username: str, plan: Plan) -> Any:
+        with self._lock(username):
+            tasks, next_id = self._read(username)
+            upserts, deleted_ids, result = plan(dict(tasks), next_id)
+            if upserts or deleted_ids:
+                for task_id in deleted_ids:
+                    tasks.pop(task_id, None)
+                for task in upserts:
+                    tasks[task["id"]] = task
+                # A cached task may be added and deleted before it was ever written; its ID stays used
+                next_id = max([next_id] + [task["id"] + 1 for task in upserts] + [task_id + 1 for task_id in deleted_ids])
+                self._save_tasks(username, tasks, next_id)
+        return result
+
+
+class JournalTodoStore(JsonTodoStore):
+    """
+    Snapshot (``<username>.json``, the JsonTodoStore format) plus an
+    append-only log (``<username>.log``) of one JSON record per line:
+
+    - ``{"op": "put", "task": {...}}``: add or replace a task
+    - ``{"op": "patch", "id": 3, "fields": {"completed": true}}``
+    - ``{"op": "del", "id": 3}``
+
+    Records are idempotent, so replaying a log over a snapshot that already
+    contains some of it is harmless. The snapshot stores the ID counter and
+    every ``put`` or ``del`` record advances it on replay, so deleted IDs stay
+    used after compaction and restarts. A torn record left by a crash mid-append
+    is dropped on the next load. Each call appends and fsyncs its records as
+    one batch. Appends are serialized per user within this process only, so
+    the engine assumes a single app worker.
+
+    A user's replayed tasks stay in memory after the first load and every
+    append is applied to them, so a mutation costs one ``stat`` of the log
+    (to notice a log that changed underneath, e.g. a torn tail) plus the
+    append, not a re-read of the snapshot and log.
+    """
+
+    def __init__(self, base_dir: str = "data/todos/journal", compact_bytes: int = 256 * 1024):
+        super().__init__(base_dir)
+        self.compact_bytes = compact_bytes
+        self._states: Dict[str, _JournalState] = {}
+        # Touched by caller threads and the compactor thread
+        self._compacting = set()
+        self._compacting_guard = threading.Lock()
+        self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="todo-compact")
+        self.counters = {"appends": 0, "records": 0, "compactions": 0, "torn_records": 0}
+
+    def _get_log_file(self, username: str) -> Path:
+        return self.base_dir / f"{username}.log"
+
+    def usernames(self) -> List[str]:
+        # A user's tasks may so far exist only in the log
+        return sorted({path.stem for pattern in ("*.json", "*.log") for path in self.base_dir.glob(pattern)})
+
+    def _log_size(self, username: str) -> int:
+        try:
+            return self._get_log_file(username).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _replay(tasks: Dict[int, dict], record: dict) -> None:
+        op = record["op"]
+        if op == "put":
+            tasks[record["task"]["id"]] = record["task"]
+        elif op == "patch":
+            if record["id"] in tasks:
+                tasks[record["id"]] = {**tasks[record["id"]], **record["fields"]}
+        elif op == "del":
+            tasks.pop(record["id"], None)
+
+    def _state(self, username: str) -> "_JournalState":
+        """The user's replayed tasks, loaded on first use; call with the user's lock held"""
+        state = self._states.get(username)
+        if state is None or state.log_size != self._log_size(username):
+            state = self._states[username] = self._load_locked(username)
+        return state
+
+    def _load_locked(self, username: str) -> "_JournalState":
+        state = _JournalState(*self._read(username))
+        log_file = self._get_log_file(username)
+        if not log_file.exists():
+            return state
+        valid_bytes = 0
+        with open(log_file, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    state.apply(orjson.loads(line))
+                except ValueError:
+                    # Only the last record can be torn; cut it so later appends start on a fresh line
+                    logger.warning(f"Dropping torn record at byte {valid_bytes} of {log_file}")
+                    self.counters["torn_records"] += 1
+                    os.truncate(log_file, valid_bytes)
+                    break
+                valid_bytes += len(line)
+        state.log_size = valid_bytes
+        return state
+
+    def _append(self, username: str, records: List[dict]) -> None:
+        """Append records and fsync them as one batch; call with the user's lock held"""
+        if not records:
+            return
+        log_file = self._get_log_file(username)
+        with open(log_file, 'ab') as f:
+            f.write(b"".join(orjson.dumps(record) + b"\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        state = self._states.get(username)
+        if state is not None:
+            for record in records:
+                state.apply(record)
+            state.log_size = size
+        self.counters["appends"] += 1
+        self.counters["records"] += len(records)
+        if size >= self.compact_bytes:
+            with self._compacting_guard:
+                if username in self._compacting:
+                    return
+                self._compacting.add(username)
+            self._compactor.submit(self._compact_in_background, username)
+
+    def _compact_in_background(self, username: str) -> None:
+        try:
+            self.compact(username)
+        except Exception as e:
+            logger.error(f"Failed to compact todo journal for {username}: {e}")
+        finally:
+            with self._compacting_guard:
+                self._compacting.discard(username)
+
+    def compact(self, username: str) -> None:
+        """Fold the user's log into a new snapshot and empty the log"""
+        with self._lock(username):
+            log_file = self._get_log_file(username)
+            if not log_file.exists():
+                return
+            # The snapshot is durable before the log is emptied; a crash in between only replays records again
+            state = self._state(username)
+            self._save_tasks(username, state.tasks, state.next_id)
+            log_file.unlink()
+            state.log_size = 0
+        self.counters["compactions"] += 1
+        logger.info(f"Compacted todo journal for {username}")
+
+    def load_tasks(self, username: str) -> Dict[int, dict]:
+        with self._lock(username):
+            # Copies, since callers may annotate the task dicts (e.g. with a status)
+            return {task_id: dict(task) for task_id, task in self._state(username).tasks.items()}
+
+    def next_id(self, username: str) -> int:
+        with self._lock(username):
+            return self._state(username).next_id
+
+    def add_task(self, username: str, task: dict) -> Optional[dict]:
+        with self._lock(username):
+            state = self._state(username)
+            if title_key(task["title"]) in state.titles:
+                return None
+            task = {**task, "id": state.next_id}
+            self._append(username, [{"op": "put", "task": task}])
+        return dict(task)
+
+    def set_completed(self, username: str, task_id: int, completed: bool = True) -> bool:
+        with self._lock(username):
+            if task_id not in self._state(username).tasks:
+                return False
+            self._append(username, [{"op": "patch", "id": task_id, "fields": {"completed": completed}}])
+        return True
+
+    def delete_task(self, username: str, task_id: int) -> bool:
+        with self._lock(username):
+            if task_id not in self._state(username).tasks:
+                return False
+            self._append(username, [{"op": "del", "id": task_id}])
+        return True
+
+    def apply_changes(self, username: str, upserts: List[dict], deleted_ids: List[int]) -> None:
+        """Append a batch of upserted and deleted tasks with a single fsync"""
+        self.transact(username, lambda tasks, next_id: (upserts, deleted_ids, None))
+
+    def transact(self, username: str, plan: Plan) -> Any:
+        with self._lock(username):
+            state = self._state(username)
+            upserts, deleted_ids, result = plan(dict(state.tasks), state.next_id)
+            records = [{"op": "del", "id": task_id} for task_id in deleted_ids]
+            # The state keeps its own copies; the plan's task dicts also end up in its result
+            records += [{"op": "put", "task": dict(task)} for task in upserts]
+            self._append(username, records)
+        return result
+
+    def close(self) -> None:
+        """Wait for queued compactions"""
+        self._compactor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counters)
+
+
+class _JournalState:
+    """One user's replayed tasks, with a title index and the next free ID"""
+    __slots__ = ("tasks", "titles", "next_id", "log_size")
+
+    def __init__(self, tasks: Dict[int, dict], next_id: int, log_size: int = 0):
+        self.tasks = tasks
+        self.titles = {title_key(task["title"]): task_id for task_id, task in tasks.items()}
+        self.next_id = max(next_id, max(tasks.keys(), default=0) + 1)
+        self.log_size = log_size
+
+    def _drop_title(self, task_id: int) -> None:
+        task = self.tasks.get(task_id)
+        if task is not None and self.titles.get(title_key(task["title"])) == task_id:
+            del self.titles[title_key(task["title"])]
+
+    def apply(self, record: dict) -> None:
+        task_id = record["task"]["id"] if record["op"] == "put" else record["id"]
+        if record["op"] == "patch" and "title" not in record["fields"]:
+            JournalTodoStore._replay(self.tasks, record)
+            return
+        self._drop_title(task_id)
+        JournalTodoStore._replay(self.tasks, record)
+        if task_id in self.tasks:
+            self.titles[title_key(self.tasks[task_id]["title"])] = task_id
+        # IDs are not handed out again, even after a delete
+        self.next_id = max(self.next_id, task_id + 1)
+
+
+class SqliteTodoStore:
+    _COLUMNS = "id, title, description, created_at, due_date, completed, tags, priority"
+    # Must match utils.todo_query.sort_key; queries repeat these expressions so the indexes below apply
+    _SORT_EXPRESSIONS = {
+        "id": "id",
+        "created_at": "created_at",
+        "due_date": f"COALESCE(due_date, '{NO_DUE_DATE}')",
+        "priority": "CASE priority "
+        + " ".join(f"WHEN '{name}' THEN {rank}" for name, rank in PRIORITY_RANK.items())
+        + f" ELSE {len(PRIORITY_RANK)} END",
+    }
+
+    def __init__(self, db_path: str = "data/todos.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                username TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                title_key TEXT NOT NULL,
+                description TEXT,
+                created_at TEXT NOT NULL,
+                due_date TEXT,
+                completed INTEGER NOT NULL DEFAULT 0,
+                tags TEXT NOT NULL DEFAULT '[]',
+                priority TEXT,
+                PRIMARY KEY (username, id)
+            )
+            ''')
+            has_tag_table = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_tags'").fetchone()
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS task_tags (
+                username TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                PRIMARY KEY (username, tag, id)
+            )
+            ''')
+            if not has_tag_table:
+                # Databases created before tag queries existed
+                conn.executemany(
+                    "INSERT OR IGNORE INTO task_tags (username, tag, id) VALUES (?, ?, ?)",
+                    [(username, tag, task_id) for username, task_id, tags in conn.execute("SELECT username, id, tags FROM tasks")
+                     for tag in orjson.loads(tags)]
+                )
+            has_counter_table = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_counters'").fetchone()
+            # Next ID per user; only ever grows, so IDs of deleted tasks are not reused
+            conn.execute("CREATE TABLE IF NOT EXISTS task_counters (username TEXT PRIMARY KEY, next_id INTEGER NOT NULL)")
+            if not has_counter_table:
+                conn.execute("INSERT OR IGNORE INTO task_counters (username, next_id) SELECT username, MAX(id) + 1 FROM tasks GROUP BY username")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user_completed ON tasks (username, completed)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user_title ON tasks (username, title_key)")
+            # Per-user sort orders; these replace the earlier global due_date/priority indexes
+            conn.execute("DROP INDEX IF EXISTS idx_tasks_due_date")
+            conn.execute("DROP INDEX IF EXISTS idx_tasks_priority")
+            for sort in ("created_at", "due_date", "priority"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_user_{sort} ON tasks (username, {self._SORT_EXPRESSIONS[sort]}, id)")
+            self.search_enabled = todo_search.ensure_schema(conn)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_task(row: tuple) -> dict:
+        task_id, title, description, created_at, due_date, completed, tags, priority = row
+        return {
+            "id": task_id,
+            "title": title,
+            "description": description,
+            "created_at": created_at,
+            "due_date": due_date,
+            "completed": bool(completed),
+            "tags": orjson.loads(tags),
+            "priority": priority,
+        }
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, username: str, task: dict) -> None:
+        conn.execute(
+            "INSERT INTO tasks (username, id, title, title_key, description, created_at, due_date, completed, tags, priority) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                username, task["id"], task["title"], title_key(task["title"]), task.get("description"),
+                task["created_at"], task.get("due_date"), int(bool(task.get("completed"))),
+                orjson.dumps(task.get("tags") or []).decode(), task.get("priority"),
+            )
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO task_tags (username, tag, id) VALUES (?, ?, ?)",
+            [(username, tag, task["id"]) for tag in task.get("tags") or []]
+        )
+        SqliteTodoStore._reserve_ids(conn, username, task["id"])
+
+    @staticmethod
+    def _reserve_ids(conn: sqlite3.Connection, username: str, task_id: int) -> None:
+        """Advance the user's counter past task_id"""
+        conn.execute(
+            "INSERT INTO task_counters (username, next_id) VALUES (?, ?) "
+            "ON CONFLICT (username) DO UPDATE SET next_id = MAX(next_id, excluded.next_id)",
+            (username, task_id + 1)
+        )
+
+    @staticmethod
+    def _next_id(conn: sqlite3.Connection, username: str) -> int:
+        row = conn.execute("SELECT next_id FROM task_counters WHERE username = ?", (username,)).fetchone()
+        return row[0] if row else 1
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, username: str, task_ids: List[int]) -> int:
+        params = [(username, task_id) for task_id in task_ids]
+        conn.executemany("DELETE FROM task_tags WHERE username = ? AND id = ?", params)
+        return conn.executemany("DELETE FROM tasks WHERE username = ? AND id = ?", params).rowcount
+
+    def load_tasks(self, username: str) -> Dict[int, dict]:
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT {self._COLUMNS} FROM tasks WHERE username = ? ORDER BY id", (username,)).fetchall()
+        return {row[0]: self._row_to_task(row) for row in rows}
+
+    def add_task(self, username: str, task: dict) -> Optional[dict]:
+        with self._connect() as conn:
+            # Take the write lock before the duplicate check and the counter read, so
+            # concurrent workers can neither both add the same title nor pick the same ID
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute(
+                "SELECT 1 FROM tasks WHERE username = ? AND title_key = ? LIMIT 1", (username, title_key(task["title"]))
+            ).fetchone():
+                return None
+            task = {**task, "id": self._next_id(conn, username)}
+            self._insert(conn, username, task)
+        return task
+
+    def set_completed(self, username: str, task_id: int, completed: bool = True) -> bool:
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE tasks SET completed = ? WHERE username = ? AND id = ?", (int(completed), username, task_id)
+            ).rowcount > 0
+
+    def delete_task(self, username: str, task_id: int) -> bool:
+        with self._connect() as conn:
+            return self._delete(conn, username, [task_id]) > 0
+
+    def apply_changes(self, username: str, upserts: List[dict], deleted_ids: List[int]) -> None:
+        """Write a batch of upserted and deleted tasks in one transaction"""
+        with self._connect() as conn:
+            if deleted_ids:
+                # A cached task may be added and deleted before it was ever written; its ID stays used
+                self._reserve_ids(conn, username, max(deleted_ids))
+            self._delete(conn, username, list(deleted_ids) + [task["id"] for task in upserts])
+            for task in upserts:
+                self._insert(conn, username, task)
+
+    def transact(self, username: str, plan: Plan) -> Any:
+        with self._connect() as conn:
+            # Hold the write lock from the read through the write, so the plan sees current state
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(f"SELECT {self._COLUMNS} FROM tasks WHERE username = ? ORDER BY id", (username,)).fetchall()
+            upserts, deleted_ids, result = plan({row[0]: self._row_to_task(row) for row in rows}, self._next_id(conn, username))
+            if deleted_ids:
+                self._reserve_ids(conn, username, max(deleted_ids))
+            self._delete(conn, username, list(deleted_ids) + [task["id"] for task in upserts])
+            for task in upserts:
+                self._insert(conn, username, task)
+        return result
+
+    def search_tasks(self, username: str, text: str, limit: int = 20) -> List[dict]:
+        """Ranked full-text matches: {"task", "snippet", "score"} dicts, best first"""
+        if not self.search_enabled:
+            raise todo_search.SearchUnavailableError("Todo search needs SQLite with FTS5")
+        columns = ", ".join(f"tasks.{column}" for column in self._COLUMNS.split(", "))
+        with self._connect() as conn:
+            rows = todo_search.search(conn, username, text, columns, limit)
+        return [{"task": self._row_to_task(row[:-2]), "snippet": row[-2], "score": row[-1]} for row in rows]
+
+    def next_id(self, username: str) -> int:
+        with self._connect() as conn:
+            return self._next_id(conn, username)
+
+    def open_due_tasks(self) -> Iterator[Tuple[str, dict]]:
+        """(username, task) for every open task with a due date, across all users"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT username, {self._COLUMNS} FROM tasks WHERE completed = 0 AND due_date IS NOT NULL"
+            ).fetchall()
+        for row in rows:
+            yield row[0], self._row_to_task(row[1:])
+
+    def query_tasks(self, username: str, query: TaskQuery) -> Dict[str, object]:
+        """One page of a user's tasks, answered from the per-user indexes"""
+        sort_expression = self._SORT_EXPRESSIONS[query.sort]
+        conditions = ["username = ?"]
+        params: list = [username]
+        if query.completed is not None:
+            conditions.append("completed = ?")
+            params.append(int(query.completed))
+        if query.status is not None:
+            conditions.append("completed = ?")
+            params.append(int(query.status == "completed"))
+        if query.priority is not None:
+            conditions.append("priority = ?")
+            params.append(query.priority)
+        if query.tag is not None:
+            conditions.append("id IN (SELECT id FROM task_tags WHERE username = ? AND tag = ?)")
+            params += [username, query.tag]
+        due_expression = self._SORT_EXPRESSIONS["due_date"]
+        if query.has_due_bounds:
+            if query.due_min:
+                conditions.append(f"{due_expression} >= ?")
+                params.append(query.due_min)
+            conditions.append(f"{due_expression} < ?")
+            params.append(query.due_max or NO_DUE_DATE)
+        if query.status == "pending":
+            # No due date sorts as NO_DUE_DATE, after every real date
+            conditions.append(f"{due_expression} >= ?")
+            params.append(query.soon)
+        if query.position is not None:
+            conditions.append(f"({sort_expression}, id) {'<' if query.descending else '>'} (?, ?)")
+            params += list(query.position)
+        direction = "DESC" if query.descending else "ASC"
+        sql = (
+            f"SELECT {self._COLUMNS} FROM tasks WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {sort_expression} {direction}, id {direction} LIMIT ?"
+        )
+        params.append(-1 if query.limit is None else query.limit + 1)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return query.page([self._row_to_task(row) for row in rows])
+
+    def import_json_dir(self, json_dir: str) -> int:
+        """
+        Migrate ``<username>.json`` files written by JsonTodoStore. Each file is
+        imported in one transaction and renamed to ``.json.migrated``, so the
+        migration is safe to re-run. Returns the number of tasks imported.
+        """
+        source = JsonTodoStore(json_dir)
+        imported = 0
+        for user_file in sorted(Path(json_dir).glob("*.json")):
+            username = user_file.stem
+            try:
+                tasks, next_id = source._read(username)
+            except (OSError, ValueError) as e:
+                logger.error(f"Skipping unreadable todo file {user_file}: {e}")
+                continue
+            with self._connect() as conn:
+                self._delete(conn, username, list(tasks))
+                for task in tasks.values():
+                    self._insert(conn, username, task)
+                self._reserve_ids(conn, username, next_id - 1)
+            user_file.rename(user_file.with_name(user_file.name + ".migrated"))
+            imported += len(tasks)
+            logger.info(f"Migrated {len(tasks)} todos for {username} from {user_file}")
+        return imported
+
+
+class AsyncTodoStore:
+    """Uncached async access to a storage engine; every call runs in a worker thread."""
+
+    def __init__(self, store):
+        self.store = store
+
+    async def load_tasks(self, username: str) -> Dict[int, dict]:
+        return await asyncio.to_thread(self.store.load_tasks, username)
+
+    async def add_task(self, username: str, task: dict) -> Optional[dict]:
+        return await asyncio.to_thread(self.store.add_task, username, task)
+
+    async def set_completed(self, username: str, task_id: int, completed: bool = True) -> bool:
+        return await asyncio.to_thread(self.store.set_completed, username, task_id, completed)
+
+    async def delete_task(self, username: str, task_id: int) -> bool:
+        return await asyncio.to_thread(self.store.delete_task, username, task_id)
+
+    async def transact(self, username: str, plan: Plan) -> Any:
+        return await asyncio.to_thread(self.store.transact, username, plan)
+
+    async def search_tasks(self, username: str, text: str, limit: int = 20) -> List[dict]:
+        if not hasattr(self.store, "search_tasks"):
+            raise todo_search.SearchUnavailableError("Todo search needs TODO_STORAGE=sqlite")
+        return await asyncio.to_thread(self.store.search_tasks, username, text, limit)
+
+    async def query_tasks(self, username: str, query: TaskQuery) -> Dict[str, object]:
+        if hasattr(self.store, "query_tasks"):
+            return await asyncio.to_thread(self.store.query_tasks, username, query)
+        # The file engines load the whole list anyway; index it for this one query
+        return await asyncio.to_thread(lambda: TaskIndex(self.store.load_tasks(username)).query(query))
+
+    def peek(self, username: str) -> Optional[Dict[int, dict]]:
+        """Tasks already in memory for a user; never for an uncached store"""
+        return None
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,179 @@
+"""
+Content-addressed storage for uploaded files.
+
+Uploads are streamed to a temporary file in fixed-size chunks while being
+hashed, so memory per upload stays constant regardless of file size. The
+finished file is stored once per distinct content under its SHA-256
+(``blobs/ab/abcdef...``). A SQLite index maps the names handed back to clients
+to content hashes. Names are scoped to the uploading user: the name prefix is
+derived from the owner as well as the content, and a name only resolves for
+the owner set in ``upload_owner`` for the current request. Blobs that no name references anymore are removed by
+``collect_garbage``.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+logger = logging.getLogger("UploadStore")
+
+CHUNK_SIZE = 1024 * 1024
+_UNSAFE_NAME_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+# Set per request to the authenticated user; stored names only resolve for the user who uploaded them
+upload_owner: ContextVar[Optional[str]] = ContextVar("upload_owner", default=None)
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the store's size limit."""
+
+
+def safe_name(filename: str) -> str:
+    """Strip directories and unusual characters from a client-supplied file name"""
+    name = _UNSAFE_NAME_CHARS.sub("_", os.path.basename(filename or "")).strip("._")
+    return name or "upload"
+
+
+class ContentAddressedStore:
+    def __init__(self, root: str = "data/uploads", max_upload_bytes: Optional[int] = None, gc_grace_seconds: float = 3600):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.tmp_dir = self.root / "tmp"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.max_upload_bytes = max_upload_bytes
+        # Unreferenced blobs younger than this are kept; a concurrent upload may be about to reference them
+        self.gc_grace_seconds = gc_grace_seconds
+        self.counters = {"uploads": 0, "deduplicated": 0, "bytes_stored": 0, "bytes_deduplicated": 0}
+        self.db_path = self.root / "index.db"
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS uploads (
+                name TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                content_type TEXT,
+                owner TEXT,
+                created_at REAL NOT NULL
+            )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_uploads_hash ON uploads (content_hash)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def blob_path(self, content_hash: str) -> Path:
+        return self.blob_dir / content_hash[:2] / content_hash
+
+    async def save_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        content_type: Optional[str] = None,
+        owner: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Store an upload from an async iterator of byte chunks. Returns the
+        stored ``name`` (to pass as ``parameters.filename``), hash and size.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir)
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if self.max_upload_bytes is not None and size > self.max_upload_bytes:
+                        raise UploadTooLargeError(f"Upload exceeds {self.max_upload_bytes} bytes")
+                    digest.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+            content_hash = digest.hexdigest()
+            blob = self.blob_path(content_hash)
+            deduplicated = blob.exists()
+            if deduplicated:
+                tmp_path.unlink()
+                # Restart the GC grace period before the new name references this blob
+                os.utime(blob)
+            else:
+                blob.parent.mkdir(exist_ok=True)
+                os.replace(tmp_path, blob)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        name = f"{self._name_prefix(content_hash, owner)}_{safe_name(filename)}"
+        await asyncio.to_thread(self._index, name, content_hash, size, content_type, owner)
+        self.counters["uploads"] += 1
+        if deduplicated:
+            self.counters["deduplicated"] += 1
+            self.counters["bytes_deduplicated"] += size
+        else:
+            self.counters["bytes_stored"] += size
+        logger.info(f"Stored upload {name} ({size} bytes, deduplicated={deduplicated})")
+        return {"filename": name, "content_hash": content_hash, "size": size, "deduplicated": deduplicated}
+
+    @staticmethod
+    def _name_prefix(content_hash: str, owner: Optional[str]) -> str:
+        """Per-owner prefix, so one user's upload can never replace another's index entry"""
+        if owner is None:
+            return content_hash[:16]
+        return hashlib.sha256(f"{owner}\0{content_hash}".encode()).hexdigest()[:16]
+
+    def _index(self, name: str, content_hash: str, size: int, content_type: Optional[str], owner: Optional[str]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO uploads (name, content_hash, size, content_type, owner, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, content_hash, size, content_type, owner, time.time())
+            )
+
+    def resolve(self, name: str) -> Optional[Path]:
+        """Path of the blob behind a name stored by the current owner, or None if there is no such name"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT content_hash FROM uploads WHERE name = ? AND owner IS ?", (name, upload_owner.get())).fetchone()
+        if row is None:
+            return None
+        path = self.blob_path(row[0])
+        return path if path.is_file() else None
+
+    def remove(self, name: str) -> bool:
+        """Drop a name stored by the current owner; its blob is reclaimed by the next collect_garbage"""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM uploads WHERE name = ? AND owner IS ?", (name, upload_owner.get())).rowcount > 0
+
+    def collect_garbage(self) -> Dict[str, int]:
+        """Delete blobs no name references, plus stale temp files from interrupted uploads"""
+        with self._connect() as conn:
+            referenced = {row[0] for row in conn.execute("SELECT DISTINCT content_hash FROM uploads")}
+        cutoff = time.time() - self.gc_grace_seconds
+        removed = freed = 0
+        for path in list(self.blob_dir.glob("*/*")) + list(self.tmp_dir.iterdir()):
+            try:
+                stat = path.stat()
+                if path.name in referenced or stat.st_mtime > cutoff:
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+            freed += stat.st_size
+        logger.info(f"Upload store GC removed {removed} files ({freed} bytes)")
+        return {"removed": removed, "bytes_freed": freed}
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counters)